@@ -0,0 +1,6 @@
+from fastapi import Request
+from app.services.domain_validator import DomainValidator
+
+# The validator is created once per process by the lifespan hook in app.main
+def get_validator(request: Request) -> DomainValidator:
+    return request.app.state.validator
@@ -4,6 +4,7 @@ from typing import List
 from pydantic import BaseModel
 from app.models.database import get_db, Domain, DomainType, ValidationStatus
 from app.services.domain_validator import DomainValidator
+from app.api.dependencies import get_validator
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -20,12 +21,6 @@ class DomainOverrideRequest(BaseModel):
     domain_type: DomainType
     notes: str = ""
 
-async def get_validator() -> DomainValidator:
-    validator = DomainValidator()
-    await validator.cache_service.connect()
-    await validator.domain_lists.initialize()
-    return validator
-
 @router.post("/whitelist")
 async def add_to_whitelist(
     request: WhitelistRequest, 
@@ -57,9 +52,8 @@ async def add_to_whitelist(
             db.add(new_domain)
         
         db.commit()
-        
-        # Invalidate cache
-        await validator.cache_service.invalidate_domain_cache(request.domain)
+        # Every worker picks the change up and drops its cached results
+        await validator.apply_override(request.domain, existing_domain or new_domain)
         
         return {"message": f"Domain {request.domain} added to whitelist"}
     
@@ -101,9 +95,8 @@ async def add_to_blacklist(
             db.add(new_domain)
         
         db.commit()
-        
-        # Invalidate cache
-        await validator.cache_service.invalidate_domain_cache(request.domain)
+        # Every worker picks the change up and drops its cached results
+        await validator.apply_override(request.domain, existing_domain or new_domain)
         
         return {"message": f"Domain {request.domain} added to blacklist"}
     
@@ -126,9 +119,8 @@ async def remove_from_whitelist(
         existing_domain.is_whitelisted = False
         existing_domain.manual_classification = False
         db.commit()
-        
-        # Invalidate cache
-        await validator.cache_service.invalidate_domain_cache(domain)
+        # Every worker picks the change up and drops its cached results
+        await validator.apply_override(domain, existing_domain)
         
         return {"message": f"Domain {domain} removed from whitelist"}
     
@@ -151,9 +143,8 @@ async def remove_from_blacklist(
         existing_domain.is_blacklisted = False
         existing_domain.manual_classification = False
         db.commit()
-        
-        # Invalidate cache
-        await validator.cache_service.invalidate_domain_cache(domain)
+        # Every worker picks the change up and drops its cached results
+        await validator.apply_override(domain, existing_domain)
         
         return {"message": f"Domain {domain} removed from blacklist"}
     
@@ -197,9 +188,8 @@ async def override_domain_classification(
             db.add(new_domain)
         
         db.commit()
-        
-        # Invalidate cache
-        await validator.cache_service.invalidate_domain_cache(request.domain)
+        # Every worker picks the change up and drops its cached results
+        await validator.apply_override(request.domain, existing_domain or new_domain)
         
         return {"message": f"Domain {request.domain} classification overridden to {request.domain_type}"}
     
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List
 import time
 from app.services.domain_validator import DomainValidator
+from app.api.dependencies import get_validator
 from app.models.schemas import (
     DomainValidationRequest, DomainValidationResponse, 
     BatchValidationRequest, BatchValidationResponse
@@ -10,20 +11,15 @@ from app.models.schemas import (
 
 router = APIRouter(prefix="/domain", tags=["domain"])
 
-# Dependency to get validator instance
-async def get_validator() -> DomainValidator:
-    validator = DomainValidator()
-    await validator.cache_service.connect()
-    await validator.domain_lists.initialize()
-    return validator
-
 @router.post("/validate", response_model=DomainValidationResponse)
 async def validate_domain(
     request: DomainValidationRequest,
     validator: DomainValidator = Depends(get_validator)
 ):
     try:
-        result = await validator.validate_domain(request.domain)
+        result = await validator.validate_domain(
+            request.domain, profile=request.profile, deadline_ms=request.deadline_ms
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
@@ -35,15 +31,13 @@ async def validate_domains_batch(
 ):
     try:
         start_time = time.time()
-        results = []
-        
-        for domain in request.domains:
-            try:
-                result = await validator.validate_domain(domain)
-                results.append(result)
-            except Exception as domain_error:
-                # Continue processing other domains even if one fails
-                continue
+        # Domains that failed are left out; the rest of the batch still counts
+        results = [
+            result for result in await validator.validate_many(
+                request.domains, profile=request.profile, deadline_ms=request.deadline_ms
+            )
+            if result is not None
+        ]
         
         processing_time = time.time() - start_time
         
@@ -63,6 +57,8 @@ async def health_check():
 async def get_cache_stats(validator: DomainValidator = Depends(get_validator)):
     try:
         stats = await validator.cache_service.get_cache_stats()
+        stats["dns_cache"] = validator.dns_checker.cache.stats()
+        stats["http_probes"] = validator.http_checker.stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cache stats error: {str(e)}")
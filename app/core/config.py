@@ -9,8 +9,49 @@ class Settings(BaseSettings):
     
     # Performance settings
     cache_ttl: int = 3600  # 1 hour
+    cache_ttl_list_decided: int = 86400  # educational, government and public provider results
+    cache_ttl_nxdomain: int = 300  # capped further by the zone's negative TTL
+    cache_ttl_no_records: int = 900  # the name exists but has no MX, A or AAAA
+    cache_ttl_probe_failure: int = 600  # the website probe failed or the status is unknown
+    cache_ttl_dns_floor: int = 300  # DNS TTLs shorter than this do not shorten a cache entry further
+    cache_stale_window: int = 3600  # past its TTL, an entry is served stale while refreshed for up to this long (at most its TTL again)
+    cache_l1_size: int = 10000  # results held in process in front of Redis; 0 disables
+    cache_l1_ttl: int = 60  # seconds a result stays in process at most
+    cache_compress_mx: bool = True  # zlib long MX lists in cache entries
     batch_size: int = 100
     request_timeout: int = 5
+    lists_refresh_interval: int = 3600  # seconds between disposable list refreshes
+    lists_snapshot_path: str = os.getenv("LISTS_SNAPSHOT_PATH", "domain_lists.snapshot")
+    lists_snapshot_check_interval: int = 60  # seconds between checks for a snapshot another worker rewrote
+    psl_path: str = os.getenv("PSL_PATH", "")  # empty: bundled app/data/public_suffix_list.dat
+    psl_cache_size: int = 65536
+    dns_timeout: float = 2.0  # seconds per query attempt
+    dns_retries: int = 1  # extra attempts after a timeout or SERVFAIL
+    dns_retry_backoff: float = 0.1  # seconds; retry n waits up to backoff * 2**n, jittered
+    dns_cache_size: int = 100000  # cached (name, type) answers; 0 disables
+    dns_bulk_sockets: int = 0  # UDP sockets shared by all queries; 0: one socket per query
+    dns_max_in_flight: int = 256  # outstanding queries per upstream nameserver, at most
+    dns_initial_in_flight: int = 32  # starting point of the adaptive per-upstream limit
+    http_connection_limit: int = 100  # open connections across all website probes and list fetches
+    http_per_host_limit: int = 8  # open connections to any one host
+    http_dns_cache_ttl: int = 300  # seconds aiohttp keeps a resolved host
+    http_keepalive_timeout: float = 15.0  # seconds an idle connection stays in the pool
+    http_probe_mode: str = "head"  # head: HEAD, falling back to a ranged GET; get: ranged GET only
+    http_max_redirects: int = 5  # redirects a website probe follows before settling on the last answer
+    http_probe_max_bytes: int = 16384  # Range asked for and read buffer of a probe's GET
+    http_scheme_stagger: float = 0.25  # seconds https:// runs alone before http:// is raced against it
+    http_probe_max_in_flight: int = 64  # website probes running at once
+    http_probe_max_per_ip: int = 4  # website probes running at once against one resolved IP
+    http_parking_ttl: int = 300  # seconds an IP stays known as a parking host; 0 disables sharing
+    http_parking_min_domains: int = 10  # domains showing one IP's identical parking page before it counts; CDN IPs never do
+    mx_index_learn_limit: int = 20000  # disposable domains whose MX hosts are indexed; 0 disables
+    mx_index_learn_max_in_flight: int = 8  # MX queries the learning runs at once, apart from validations
+    dns_nameservers: str = os.getenv("DNS_NAMESERVERS", "")  # comma-separated; empty: /etc/resolv.conf
+    
+    # Default latency budgets per validation profile, in milliseconds (0: no deadline)
+    fast_profile_deadline_ms: int = 100
+    standard_profile_deadline_ms: int = 3000
+    full_profile_deadline_ms: int = 0
     
     class Config:
         env_file = ".env"
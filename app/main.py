@@ -1,13 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.endpoints import domain, web, admin
 from app.core.config import settings
+from app.services.domain_validator import DomainValidator
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One validator per process: Redis connection and domain lists are set up once
+    validator = DomainValidator()
+    await validator.startup()
+    app.state.validator = validator
+    try:
+        yield
+    finally:
+        await validator.shutdown()
 
 app = FastAPI(
     title="Email Domain Validator",
     description="Service for automatic email domain validation and classification",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -23,8 +23,15 @@ class Recommendation(str, Enum):
     REJECT = "reject"
     MANUAL_REVIEW = "manual_review"
 
+class ValidationProfile(str, Enum):
+    FAST = "fast"          # lists and DNS only
+    STANDARD = "standard"  # plus website reachability
+    FULL = "full"          # plus TLS certificate check
+
 class DomainValidationRequest(BaseModel):
     domain: str
+    profile: ValidationProfile = ValidationProfile.FULL
+    deadline_ms: Optional[int] = Field(None, gt=0)
     
     @validator('domain')
     def validate_domain(cls, v):
@@ -37,23 +44,35 @@ class DomainMetadata(BaseModel):
     has_mx_record: bool = False
     has_a_record: bool = False
     mx_servers: Optional[List[str]] = None
+    dns_status: Optional[str] = None  # noerror, nodata, nxdomain, servfail, timeout or invalid
+    mail_provider: Optional[str] = None  # platform or disposable service behind the MX hosts
     website_accessible: bool = False
     has_ssl_certificate: bool = False
+    ssl_issuer: Optional[str] = None
+    ssl_expiry_date: Optional[datetime] = None
+    parked: bool = False  # the website is a domain parking page
     whois_registrar: Optional[str] = None
     whois_creation_date: Optional[datetime] = None
     whois_country: Optional[str] = None
 
 class DomainValidationResponse(BaseModel):
     domain: str
+    registrable_domain: Optional[str] = None
     domain_type: DomainType
     validation_status: ValidationStatus
     quality_score: float
     recommendation: Recommendation
     metadata: DomainMetadata
+    stages: List[str] = []  # validation stages that ran, in order
+    profile: ValidationProfile = ValidationProfile.FULL
+    partial: bool = False  # the deadline or resolver failures cut some checks of the profile short
+    stale: bool = False  # served from an expired cache entry while a refresh runs in the background
     checked_at: datetime
     
 class BatchValidationRequest(BaseModel):
     domains: List[str]
+    profile: ValidationProfile = ValidationProfile.FULL
+    deadline_ms: Optional[int] = Field(None, gt=0)  # per domain
     
 class BatchValidationResponse(BaseModel):
     results: List[DomainValidationResponse]
@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.models.schemas import DomainType, DomainValidationResponse, ValidationStatus
+
+# Types the public suffix / domain lists decide on their own; the records only add detail
+LIST_DECIDED_TYPES = (DomainType.EDUCATIONAL, DomainType.GOVERNMENT, DomainType.PUBLIC_PROVIDER)
+
+class CacheTTLPolicy:
+    """
+    How long a validation result may be cached, by what decided it. Negative
+    outcomes (NXDOMAIN, no records, a website probe that failed) expire soon
+    so a transient failure recovers quickly; list-decided results keep for a
+    day. Anything drawn from DNS records expires with them, though never
+    sooner than dns_ttl_floor.
+    """
+
+    def __init__(
+        self,
+        default_ttl: Optional[int] = None,
+        list_decided_ttl: Optional[int] = None,
+        nxdomain_ttl: Optional[int] = None,
+        no_records_ttl: Optional[int] = None,
+        probe_failure_ttl: Optional[int] = None,
+        dns_ttl_floor: Optional[int] = None
+    ):
+        self.ttls = {
+            'default': default_ttl or settings.cache_ttl,
+            'list_decided': list_decided_ttl or settings.cache_ttl_list_decided,
+            'nxdomain': nxdomain_ttl or settings.cache_ttl_nxdomain,
+            'no_records': no_records_ttl or settings.cache_ttl_no_records,
+            'probe_failure': probe_failure_ttl or settings.cache_ttl_probe_failure
+        }
+        self.dns_ttl_floor = settings.cache_ttl_dns_floor if dns_ttl_floor is None else dns_ttl_floor
+        self.decisions: Dict[str, int] = {reason: 0 for reason in self.ttls}
+
+    def reason(self, result: DomainValidationResponse) -> str:
+        metadata = result.metadata
+        if result.domain_type == DomainType.UNREACHABLE or result.validation_status == ValidationStatus.INVALID:
+            return 'nxdomain' if metadata.dns_status == 'nxdomain' else 'no_records'
+        if result.domain_type in LIST_DECIDED_TYPES:
+            return 'list_decided'
+        if 'http' in result.stages and not metadata.website_accessible:
+            # Timeouts and refused connections come and go; a site that is down today may be up tomorrow
+            return 'probe_failure'
+        if result.validation_status == ValidationStatus.UNKNOWN and result.domain_type != DomainType.DISPOSABLE:
+            return 'probe_failure'
+        return 'default'
+
+    def ttl(self, result: DomainValidationResponse, dns_ttl: Optional[int] = None) -> int:
+        """Seconds to cache result for; dns_ttl is the shortest TTL among the DNS answers it was drawn from"""
+        reason = self.reason(result)
+        self.decisions[reason] += 1
+        ttl = self.ttls[reason]
+        if reason != 'list_decided' and dns_ttl is not None:
+            if reason == 'nxdomain':
+                # The zone's negative TTL says how long the name is known to be missing
+                ttl = min(ttl, max(dns_ttl, 1))
+            else:
+                ttl = min(ttl, max(dns_ttl, self.dns_ttl_floor))
+        return ttl
+
+    def stats(self) -> Dict[str, Any]:
+        return {'ttls': dict(self.ttls), 'dns_ttl_floor': self.dns_ttl_floor, 'decisions': dict(self.decisions)}
@@ -1,68 +1,263 @@
 import redis.asyncio as aioredis
-import json
+import asyncio
 import hashlib
-from typing import Optional, Dict, Any
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List, Deque, Tuple
 from datetime import datetime, timedelta
 from app.core.config import settings
-from app.models.schemas import DomainValidationResponse
+from app.models.schemas import DomainValidationResponse, ValidationProfile
+from app.services.cache_policy import CacheTTLPolicy
+from app.services.local_cache import LocalCache
+from app.services.public_suffix import get_public_suffix_list, normalize_domain
+from app.services.result_codec import encode_result, decode_entry
+
+# Least to most complete: an entry can serve its own profile and every one before it
+PROFILE_ORDER = [ValidationProfile.FAST, ValidationProfile.STANDARD, ValidationProfile.FULL]
+
+# Workers announce invalidated keys here so every in-process tier drops them
+INVALIDATION_CHANNEL = "domain_validation:invalidate"
+# ... and domains whose manual override changed, so every worker reloads it
+OVERRIDE_CHANNEL = "domain_validation:override"
+
+class _LatencySamples:
+    """Recent lookup latencies of one outcome, for percentiles"""
+    
+    def __init__(self, size: int = 2048):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+    
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+    
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
 
 class CacheService:
+    """
+    Two tiers: a bounded in-process LRU of ready-to-serve results (L1) in
+    front of Redis (L2). L1 entries live at most cache_l1_ttl seconds and
+    are dropped in every worker when a domain is invalidated, via Redis
+    pub/sub. Without Redis nothing is cached, so workers never disagree.
+    
+    Each entry is fresh for its policy TTL (the soft expiry, kept in the
+    entry) and stays in Redis for up to as long again (the hard expiry), so
+    a hot domain can be answered stale while it is revalidated.
+    """
+    
     def __init__(self):
         self.redis_client: Optional[aioredis.Redis] = None
-        self.ttl = settings.cache_ttl
+        self.ttl_policy = CacheTTLPolicy()
+        self.local = LocalCache(settings.cache_l1_size)
+        self.local_ttl = settings.cache_l1_ttl
+        self.compress_mx = settings.cache_compress_mx
+        self.stale_window = settings.cache_stale_window
+        self.clock = time.time
+        self.stale_served = 0
+        self._invalidation_task: Optional[asyncio.Task] = None
+        # Called with a domain whose override another worker changed, or None when some may have been missed
+        self.override_listener: Optional[Callable[[Optional[str]], None]] = None
+        self._latencies = {tier: _LatencySamples() for tier in ('l1', 'l2', 'miss')}
         
     async def connect(self):
         try:
             self.redis_client = aioredis.from_url(
                 settings.redis_url,
-                decode_responses=True,
+                # Entries are binary (see result_codec)
+                decode_responses=False,
                 retry_on_timeout=True
             )
             # Test connection
             await self.redis_client.ping()
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
         except Exception as e:
             print(f"Redis connection failed: {e}")
             self.redis_client = None
     
     async def disconnect(self):
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
         if self.redis_client:
             await self.redis_client.close()
+        self.local.clear()
+    
+    async def _listen_for_invalidations(self):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL, OVERRIDE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    channel = message['channel']
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    if channel == OVERRIDE_CHANNEL:
+                        if self.override_listener:
+                            self.override_listener(message['data'].decode())
+                    else:
+                        self.local.delete(*message['data'].decode().split())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+                # Invalidations sent while we were not listening are lost: start L1 and the overrides over
+                self.local.clear()
+                if self.override_listener:
+                    self.override_listener(None)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
     
-    def _generate_cache_key(self, domain: str) -> str:
-        return f"domain_validation:{domain.lower()}"
+    def _generate_cache_key(self, domain: str, profile: ValidationProfile = ValidationProfile.FULL) -> str:
+        # Keyed by registrable domain so every subdomain shares one entry
+        domain = normalize_domain(domain)
+        registrable = get_public_suffix_list().registrable_domain(domain) or domain
+        return f"domain_validation:{profile.value}:{registrable}"
     
-    async def get_cached_validation(self, domain: str) -> Optional[DomainValidationResponse]:
+    def _covering_keys(self, domain: str, profile: ValidationProfile) -> List[str]:
+        """Keys that may answer a request for ``profile``, most complete first"""
+        covering = PROFILE_ORDER[PROFILE_ORDER.index(profile):]
+        return [self._generate_cache_key(domain, p) for p in reversed(covering)]
+    
+    async def get_cached_validation(
+        self, domain: str, profile: ValidationProfile = ValidationProfile.FULL
+    ) -> Optional[DomainValidationResponse]:
+        return (await self.get_many([domain], profile)).get(domain)
+    
+    async def get_many(
+        self, domains: List[str], profile: ValidationProfile = ValidationProfile.FULL
+    ) -> Dict[str, DomainValidationResponse]:
+        """
+        Cached results for any of ``domains``, with a single MGET for everything
+        L1 cannot answer. Results past their soft expiry come back with stale set,
+        and only when no covering entry is fresh.
+        """
         if not self.redis_client:
-            return None
-            
+            return {}
+        
+        started = time.perf_counter()
+        found: Dict[str, DomainValidationResponse] = {}
+        # A full result can answer a fast request, never the other way round
+        remote: Dict[str, Tuple[List[str], Dict[str, Tuple]]] = {}
+        for domain in dict.fromkeys(domains):
+            keys = self._covering_keys(domain, profile)
+            local = {}
+            for key in keys:
+                entry = self.local.get(key)
+                if entry is not None:
+                    local[key] = entry
+            chosen = self._choose(keys, local)
+            # A stale entry is only good enough once Redis has had a chance to offer a fresh one
+            if chosen is not None and (self._is_fresh(chosen[1]) or len(local) == len(keys)):
+                found[domain] = self._serve(*chosen)
+                self._latencies['l1'].add(time.perf_counter() - started)
+            else:
+                remote[domain] = (keys, local)
+        if not remote:
+            return found
+        
         try:
-            cache_key = self._generate_cache_key(domain)
-            cached_data = await self.redis_client.get(cache_key)
-            
-            if cached_data:
-                data = json.loads(cached_data)
-                # Convert back to Pydantic model
-                return DomainValidationResponse(**data)
-                
+            keys = [key for covering, local in remote.values() for key in covering if key not in local]
+            values = dict(zip(keys, await self.redis_client.mget(keys)))
         except Exception as e:
             print(f"Cache get error: {e}")
-            
-        return None
+            values = {}
+        
+        for domain, (covering, local) in remote.items():
+            entries = dict(local)
+            for key in covering:
+                cached_data = values.get(key)
+                if key in local or not cached_data:
+                    continue
+                try:
+                    entry = decode_entry(cached_data)
+                except Exception as e:
+                    print(f"Cache get error: {e}")
+                    continue
+                # The Redis entry's remaining TTL is unknown; L1 keeps it briefly at most
+                self.local.set(key, entry, self.local_ttl)
+                entries[key] = entry
+            chosen = self._choose(covering, entries)
+            if chosen is None:
+                self._latencies['miss'].add(time.perf_counter() - started)
+                continue
+            found[domain] = self._serve(*chosen)
+            tier = 'l1' if any(chosen is entry for entry in local.values()) else 'l2'
+            self._latencies[tier].add(time.perf_counter() - started)
+        return found
+    
+    def _choose(self, keys: List[str], entries: Dict[str, Tuple]) -> Optional[Tuple]:
+        """The most complete fresh entry among keys, else the most complete stale one"""
+        present = [entries[key] for key in keys if key in entries]
+        for entry in present:
+            if self._is_fresh(entry[1]):
+                return entry
+        return present[0] if present else None
     
-    async def cache_validation_result(self, domain: str, result: DomainValidationResponse):
+    def _is_fresh(self, fresh_until: Optional[int]) -> bool:
+        return fresh_until is None or self.clock() < fresh_until
+    
+    def _serve(self, result: DomainValidationResponse, fresh_until: Optional[int]) -> DomainValidationResponse:
+        if self._is_fresh(fresh_until):
+            return result
+        self.stale_served += 1
+        return result.model_copy(update={'stale': True})
+    
+    def _entry(
+        self, domain: str, result: DomainValidationResponse, profile: Optional[ValidationProfile],
+        dns_ttl: Optional[int]
+    ) -> Tuple[str, int, Tuple[DomainValidationResponse, int], bytes]:
+        """Key, hard TTL, L1 value and payload for a result"""
+        # The policy's TTL is the soft expiry; the entry may be served stale for as long again at most
+        ttl = self.ttl_policy.ttl(result, dns_ttl)
+        fresh_until = int(self.clock()) + ttl
+        payload = encode_result(result, compress_mx=self.compress_mx, fresh_until=fresh_until)
+        return (
+            self._generate_cache_key(domain, profile or result.profile),
+            ttl + min(self.stale_window, ttl),
+            (result, fresh_until),
+            payload
+        )
+    
+    async def cache_validation_result(
+        self, domain: str, result: DomainValidationResponse, profile: Optional[ValidationProfile] = None,
+        dns_ttl: Optional[int] = None
+    ):
         if not self.redis_client:
             return
             
         try:
-            cache_key = self._generate_cache_key(domain)
-            # Convert Pydantic model to dict for JSON serialization
-            data = result.model_dump(mode='json')
+            cache_key, ttl, local_entry, payload = self._entry(domain, result, profile, dns_ttl)
+            await self.redis_client.setex(cache_key, ttl, payload)
+            self.local.set(cache_key, local_entry, min(ttl, self.local_ttl))
             
-            await self.redis_client.setex(
-                cache_key,
-                self.ttl,
-                json.dumps(data, default=str)
-            )
+        except Exception as e:
+            print(f"Cache set error: {e}")
+    
+    async def set_many(
+        self, entries: List[Tuple[str, DomainValidationResponse, Optional[ValidationProfile], Optional[int]]]
+    ):
+        """Store (domain, result, profile, dns_ttl) entries with one pipelined round trip"""
+        if not self.redis_client or not entries:
+            return
+        
+        try:
+            stored = [self._entry(*entry) for entry in entries]
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for cache_key, ttl, _, payload in stored:
+                    pipe.setex(cache_key, ttl, payload)
+                await pipe.execute()
+            for cache_key, ttl, local_entry, _ in stored:
+                self.local.set(cache_key, local_entry, min(ttl, self.local_ttl))
             
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -71,12 +266,52 @@ class CacheService:
         if not self.redis_client:
             return
             
+        keys = self._covering_keys(domain, PROFILE_ORDER[0])
+        self.local.delete(*keys)
         try:
-            cache_key = self._generate_cache_key(domain)
-            await self.redis_client.delete(cache_key)
+            await self.redis_client.delete(*keys)
+            await self.redis_client.publish(INVALIDATION_CHANNEL, " ".join(keys))
         except Exception as e:
             print(f"Cache invalidation error: {e}")
     
+    async def announce_override(self, domain: str):
+        """Tell every worker, this one included, that domain's manual override changed"""
+        if not self.redis_client:
+            return
+        
+        try:
+            await self.redis_client.publish(OVERRIDE_CHANNEL, domain)
+        except Exception as e:
+            print(f"Override announcement error: {e}")
+    
+    def tier_stats(self) -> Dict[str, Any]:
+        l1, l2, miss = (self._latencies[tier] for tier in ('l1', 'l2', 'miss'))
+        lookups = l1.count + l2.count + miss.count
+        reached_l2 = l2.count + miss.count
+        return {
+            "lookups": lookups,
+            "stale_served": self.stale_served,
+            "l1": {
+                "hits": l1.count,
+                "hit_ratio": l1.count / lookups if lookups else 0.0,
+                "entries": len(self.local),
+                "evictions": self.local.evictions,
+                "p50_ms": l1.percentile(0.5),
+                "p99_ms": l1.percentile(0.99)
+            },
+            "l2": {
+                "hits": l2.count,
+                "hit_ratio": l2.count / reached_l2 if reached_l2 else 0.0,
+                "p50_ms": l2.percentile(0.5),
+                "p99_ms": l2.percentile(0.99)
+            },
+            "miss": {
+                "count": miss.count,
+                "p50_ms": miss.percentile(0.5),
+                "p99_ms": miss.percentile(0.99)
+            }
+        }
+    
     async def get_cache_stats(self) -> Dict[str, Any]:
         if not self.redis_client:
             return {"status": "disconnected"}
@@ -89,7 +324,9 @@ class CacheService:
                 "connected_clients": info.get("connected_clients", 0),
                 "total_commands_processed": info.get("total_commands_processed", 0),
                 "keyspace_hits": info.get("keyspace_hits", 0),
-                "keyspace_misses": info.get("keyspace_misses", 0)
+                "keyspace_misses": info.get("keyspace_misses", 0),
+                "tiers": self.tier_stats(),
+                "ttl_policy": self.ttl_policy.stats()
             }
         except Exception as e:
             return {"status": "error", "error": str(e)}
\ No newline at end of file
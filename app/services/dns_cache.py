@@ -0,0 +1,37 @@
+import time
+from typing import Any, Optional
+
+import dns.message
+import dns.rdatatype
+
+from app.services.local_cache import LocalCache
+
+
+def negative_ttl(response: Optional[dns.message.Message]) -> Optional[int]:
+    """
+    How long an NXDOMAIN / NODATA answer may be cached (RFC 2308): the lower
+    of the SOA record's TTL and its MINIMUM field. None without an SOA, in
+    which case the answer must not be cached.
+    """
+    if response is None:
+        return None
+    for rrset in response.authority:
+        if rrset.rdtype == dns.rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+class DNSCache(LocalCache):
+    """LRU cache of DNS answers keyed by (name, rdtype), honouring record TTLs"""
+
+    def __init__(self, max_entries: int = 100000, clock=time.monotonic):
+        super().__init__(max_entries, clock)
+
+    def get(self, name: str, rdtype: str) -> Optional[Any]:
+        return super().get((name, rdtype))
+
+    def set(self, name: str, rdtype: str, value: Any, ttl: Optional[int]):
+        super().set((name, rdtype), value, ttl)
+
+    def remaining_ttl(self, name: str, rdtype: str) -> Optional[int]:
+        return super().remaining_ttl((name, rdtype))
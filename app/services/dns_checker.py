@@ -1,45 +1,582 @@
+import asyncio
+import ipaddress
+import logging
+import random
 import socket
-import dns.resolver
+import dns.asyncquery
+import dns.asyncresolver
 import dns.exception
-from typing import List, Optional
-import asyncio
-import aiohttp
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.resolver
+from collections import deque
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from aiohttp.abc import AbstractResolver
+from app.core.config import settings
+from app.services.dns_cache import DNSCache, negative_ttl
 
-class DNSChecker:
-    def __init__(self, timeout: int = 5):
+logger = logging.getLogger(__name__)
+
+LOOKUP_TYPES = ('MX', 'A', 'AAAA')
+
+class DNSStatus(str, Enum):
+    NOERROR = "noerror"    # records found
+    NODATA = "nodata"      # the name exists but has no records of the type
+    NXDOMAIN = "nxdomain"  # the name does not exist
+    SERVFAIL = "servfail"  # the resolver failed; says nothing about the name
+    TIMEOUT = "timeout"
+    INVALID = "invalid"    # not a valid DNS name (empty or over-long labels), so it cannot exist
+
+# Resolver trouble rather than a fact about the name: retried, never cached
+TRANSIENT_STATUSES = (DNSStatus.SERVFAIL, DNSStatus.TIMEOUT)
+
+@dataclass(frozen=True)
+class DNSAnswer:
+    status: DNSStatus
+    records: Tuple[str, ...] = ()
+    # Seconds the answer stays valid, as far as the resolver or our cache knows
+    ttl: Optional[int] = field(default=None, compare=False)
+
+def _record_texts(rrset, rdtype: str) -> Tuple[str, ...]:
+    if rdtype == 'MX':
+        return tuple(str(record.exchange) for record in rrset)
+    return tuple(str(record) for record in rrset)
+
+def answer_from_response(response: dns.message.Message, rdtype: str) -> Tuple[DNSAnswer, Optional[int]]:
+    """DNSAnswer for a raw response, plus how long it may be cached (None: not at all)"""
+    rcode = response.rcode()
+    if rcode == dns.rcode.NXDOMAIN:
+        return DNSAnswer(DNSStatus.NXDOMAIN), negative_ttl(response)
+    if rcode != dns.rcode.NOERROR:
+        return DNSAnswer(DNSStatus.SERVFAIL), None
+    try:
+        chain = response.resolve_chaining()
+    except dns.exception.DNSException:
+        return DNSAnswer(DNSStatus.SERVFAIL), None
+    if chain.answer is None:
+        return DNSAnswer(DNSStatus.NODATA), negative_ttl(response)
+    return DNSAnswer(DNSStatus.NOERROR, _record_texts(chain.answer, rdtype)), chain.minimum_ttl
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one upstream. Every clean answer raises the
+    limit by 1/limit, about one slot per limit's worth of answers; it halves
+    when timeouts and SERVFAILs make up more than failure_rate of the last
+    window outcomes. A single broken domain fails however lightly the
+    upstream is loaded, so a few failures never cut it, and neither do the
+    retries of one. Only queries sent since the last cut count towards the
+    next, so one overload episode counts once however many queries it hit.
+    """
+
+    def __init__(
+        self, initial: int = 32, minimum: int = 1, maximum: int = 256, decrease: float = 0.5,
+        window: int = 50, failure_rate: float = 0.2, min_samples: int = 10
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.failure_rate = failure_rate
+        self.min_samples = min_samples
+        # Outcomes of this generation's queries, True for a failure
+        self._window: Deque[bool] = deque(maxlen=window)
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.generation = 0
+        self.successes = 0
+        self.failures = 0
+        self.decreases = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> int:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                # A wakeup meant for us goes to the next waiter instead
+                self._wake()
+                raise
+        self.in_flight += 1
+        return self.generation
+
+    def release(self, generation: int, failed: Optional[bool], retry: bool = False):
+        """
+        failed: True for timeout / SERVFAIL, False for an answer, None when
+        abandoned. A retry's failure adds to the rate but never cuts the
+        limit itself: the attempt before it already had that chance.
+        """
+        self.in_flight -= 1
+        if failed:
+            self.failures += 1
+            if generation == self.generation:
+                self._window.append(True)
+                if not retry:
+                    self._maybe_decrease()
+        elif failed is not None:
+            self.successes += 1
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if generation == self.generation:
+                self._window.append(False)
+        self._wake()
+
+    def _maybe_decrease(self):
+        samples = len(self._window)
+        if samples < self.min_samples or sum(self._window) <= self.failure_rate * samples:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.generation += 1
+        self.decreases += 1
+        self._window.clear()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'successes': self.successes,
+            'failures': self.failures,
+            'decreases': self.decreases
+        }
+
+@dataclass
+class Upstream:
+    address: str
+    port: int
+    limiter: AdaptiveLimiter
+    resolver: Optional[dns.asyncresolver.Resolver] = None
+
+class _DNSChannel(asyncio.DatagramProtocol):
+    """One UDP socket carrying many outstanding queries, told apart by query ID"""
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, Tuple[asyncio.Future, dns.message.Message, Tuple[str, int]]] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, query: dns.message.Message, address: Tuple[str, int]) -> asyncio.Future:
+        query.id = random.getrandbits(16)
+        while query.id in self.pending:
+            query.id = random.getrandbits(16)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[query.id] = (future, query, address)
+        try:
+            self.transport.sendto(query.to_wire(), address)
+        except Exception:
+            del self.pending[query.id]
+            raise
+        return future
+
+    def forget(self, query_id: int, future: asyncio.Future):
+        entry = self.pending.get(query_id)
+        if entry is not None and entry[0] is future:
+            del self.pending[query_id]
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            response = dns.message.from_wire(data)
+        except Exception:
+            return
+        entry = self.pending.get(response.id)
+        # Same ID, same upstream and same question, or it is not our answer
+        if entry is None or tuple(addr[:2]) != entry[2] or not entry[1].is_response(response):
+            return
+        del self.pending[response.id]
+        if not entry[0].done():
+            entry[0].set_result(response)
+
+    def error_received(self, exc):
+        logger.debug(f"DNS socket error: {exc}")
+
+    def connection_lost(self, exc):
+        for future, _, _ in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("DNS socket closed"))
+        self.pending.clear()
+
+# Wildcard address each family's sockets bind to
+BIND_ADDRESSES = {socket.AF_INET: '0.0.0.0', socket.AF_INET6: '::'}
+
+class BulkDNSEngine:
+    """
+    Pipelines queries over a few long-lived UDP sockets per address family
+    instead of opening one per query, opened when the first nameserver of
+    that family is asked. Truncated answers are fetched again over TCP. A
+    query that cannot be sent comes back as SERVFAIL. Retries and
+    per-upstream limits are left to the caller.
+    """
+
+    def __init__(self, sockets: int = 4, timeout: float = 2.0):
+        self.sockets = sockets
         self.timeout = timeout
+        self._channels: Dict[int, List[_DNSChannel]] = {}
+        self._start_lock = asyncio.Lock()
+        self.sent = 0
+        self.timeouts = 0
+        self.send_errors = 0
+        self.tcp_fallbacks = 0
+
+    async def _channels_for(self, address: str) -> List[_DNSChannel]:
+        family = socket.AF_INET6 if ipaddress.ip_address(address).version == 6 else socket.AF_INET
+        channels = self._channels.get(family)
+        if channels:
+            return channels
+        async with self._start_lock:
+            if family not in self._channels:
+                loop = asyncio.get_running_loop()
+                channels = []
+                try:
+                    for _ in range(self.sockets):
+                        _, channel = await loop.create_datagram_endpoint(
+                            _DNSChannel, local_addr=(BIND_ADDRESSES[family], 0), family=family
+                        )
+                        channels.append(channel)
+                except OSError:
+                    for channel in channels:
+                        channel.transport.close()
+                    raise
+                self._channels[family] = channels
+            return self._channels[family]
+
+    async def close(self):
+        channels, self._channels = self._channels, {}
+        for family_channels in channels.values():
+            for channel in family_channels:
+                channel.transport.close()
+
+    async def query(self, name: str, rdtype: str, nameserver: Tuple[str, int]) -> Tuple[DNSAnswer, Optional[int]]:
+        try:
+            channels = await self._channels_for(nameserver[0])
+            response = await self._exchange(channels, dns.message.make_query(name, rdtype), nameserver)
+        except (OSError, ValueError) as e:
+            # No socket for the family, an unroutable or malformed address: the query never left
+            self.send_errors += 1
+            logger.debug(f"Could not send {rdtype} query for {name} to {nameserver[0]}: {e}")
+            return DNSAnswer(DNSStatus.SERVFAIL), None
+        if response is None:
+            return DNSAnswer(DNSStatus.TIMEOUT), None
+        return answer_from_response(response, rdtype)
+
+    async def _exchange(
+        self, channels: List[_DNSChannel], query: dns.message.Message, nameserver: Tuple[str, int]
+    ) -> Optional[dns.message.Message]:
+        channel = min(channels, key=lambda channel: len(channel.pending))
+        future = channel.send(query, nameserver)
+        self.sent += 1
+        try:
+            response = await asyncio.wait_for(future, self.timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.timeouts += 1
+            return None
+        finally:
+            channel.forget(query.id, future)
+
+        if response.flags & dns.flags.TC:
+            self.tcp_fallbacks += 1
+            try:
+                response = await dns.asyncquery.tcp(query, nameserver[0], timeout=self.timeout, port=nameserver[1])
+            except (dns.exception.DNSException, OSError):
+                self.timeouts += 1
+                return None
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        channels = [channel for family_channels in self._channels.values() for channel in family_channels]
+        return {
+            'sockets': len(channels),
+            'in_flight': sum(len(channel.pending) for channel in channels),
+            'sent': self.sent,
+            'timeouts': self.timeouts,
+            'send_errors': self.send_errors,
+            'tcp_fallbacks': self.tcp_fallbacks
+        }
+
+class DNSChecker:
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        nameservers: Optional[List[str]] = None,
+        port: int = 53,
+        cache: Optional[DNSCache] = None,
+        bulk_sockets: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        retry_backoff: Optional[float] = None
+    ):
+        self.timeout = timeout if timeout is not None else settings.dns_timeout
+        self.retries = retries if retries is not None else settings.dns_retries
+        if nameservers is None:
+            nameservers = [ns.strip() for ns in settings.dns_nameservers.split(',') if ns.strip()]
+        self.resolver = self._make_resolver(nameservers, port)
+        self.cache = cache if cache is not None else DNSCache(settings.dns_cache_size)
         
-    async def check_mx_records(self, domain: str) -> tuple[bool, List[str]]:
+        self.retry_backoff = settings.dns_retry_backoff if retry_backoff is None else retry_backoff
+        self.max_in_flight = max_in_flight or settings.dns_max_in_flight
+        
+        bulk_sockets = bulk_sockets if bulk_sockets is not None else settings.dns_bulk_sockets
+        self.bulk: Optional[BulkDNSEngine] = BulkDNSEngine(bulk_sockets, self.timeout) if bulk_sockets else None
+        
+        # Each upstream gets its own concurrency limit (and, without the bulk engine, its own resolver)
+        self.upstreams = [
+            Upstream(
+                nameserver, self.resolver.port,
+                AdaptiveLimiter(min(settings.dns_initial_in_flight, self.max_in_flight), maximum=self.max_in_flight),
+                None if self.bulk else self._upstream_resolver(nameserver)
+            )
+            for nameserver in self.resolver.nameservers
+        ]
+        self._next_upstream = 0
+
+    def _make_resolver(self, nameservers: List[str], port: int) -> dns.asyncresolver.Resolver:
+        # One resolver shared by every lookup: resolv.conf is read once, not per query
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self._get_mx_records, domain)
-            return True, result
-        except Exception:
-            return False, []
-    
-    def _get_mx_records(self, domain: str) -> List[str]:
+            resolver = dns.asyncresolver.Resolver(configure=not nameservers)
+        except dns.resolver.NoResolverConfiguration:
+            logger.warning("No system resolver configuration; set DNS_NAMESERVERS")
+            resolver = dns.asyncresolver.Resolver(configure=False)
+        if nameservers:
+            resolver.nameservers = nameservers
+            resolver.port = port
+        # Retries are ours, so a single attempt may use the whole per-query timeout
+        resolver.timeout = self.timeout
+        resolver.lifetime = self.timeout
+        return resolver
+
+    def _upstream_resolver(self, nameserver: str) -> dns.asyncresolver.Resolver:
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = [nameserver]
+        resolver.port = self.resolver.port
+        resolver.timeout = self.timeout
+        resolver.lifetime = self.timeout
+        return resolver
+
+    async def query(self, name: str, rdtype: str) -> DNSAnswer:
+        name = name.lower().rstrip('.')
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            return [str(record.exchange) for record in mx_records]
+            dns.name.from_text(name)
         except dns.exception.DNSException:
-            return []
-    
-    async def check_a_records(self, domain: str) -> bool:
-        try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self._get_a_records, domain)
-            return len(result) > 0
-        except Exception:
-            return False
-    
-    def _get_a_records(self, domain: str) -> List[str]:
+            # Settled without asking anyone: not resolver trouble, and nothing to retry
+            return DNSAnswer(DNSStatus.INVALID)
+        cached = self.cache.get(name, rdtype)
+        if cached is not None:
+            return replace(cached, ttl=self.cache.remaining_ttl(name, rdtype))
+
+        answer, ttl = await self._resolve(name, rdtype)
+        answer = replace(answer, ttl=ttl)
+
+        if answer.status == DNSStatus.NXDOMAIN:
+            # A missing name is missing for every type, so answer the sibling queries too
+            for lookup_type in set(LOOKUP_TYPES) | {rdtype}:
+                self.cache.set(name, lookup_type, answer, ttl)
+        elif answer.status not in TRANSIENT_STATUSES:
+            # SERVFAIL and timeouts say nothing about the domain and are never cached
+            self.cache.set(name, rdtype, answer, ttl)
+        return answer
+
+    async def _resolve(self, name: str, rdtype: str) -> Tuple[DNSAnswer, Optional[int]]:
+        answer, ttl = DNSAnswer(DNSStatus.SERVFAIL), None
+        if not self.upstreams:
+            return answer, ttl
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter, so retries from a burst of failures do not arrive together
+                await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+            # Attempts take the upstreams in turn, so load spreads over them and a retry goes to the next one
+            upstream = self.upstreams[self._next_upstream % len(self.upstreams)]
+            self._next_upstream += 1
+            
+            generation = await upstream.limiter.acquire()
+            failed = None
+            try:
+                answer, ttl = await self._attempt(upstream, name, rdtype)
+                failed = answer.status in TRANSIENT_STATUSES
+            finally:
+                upstream.limiter.release(generation, failed, retry=attempt > 0)
+            if not failed:
+                break
+            logger.debug(f"{rdtype} lookup for {name} via {upstream.address}: {answer.status.value} (attempt {attempt + 1})")
+        return answer, ttl
+
+    async def _attempt(self, upstream: Upstream, name: str, rdtype: str) -> Tuple[DNSAnswer, Optional[int]]:
+        if self.bulk is not None:
+            return await self.bulk.query(name, rdtype, (upstream.address, upstream.port))
         try:
-            a_records = dns.resolver.resolve(domain, 'A')
-            return [str(record) for record in a_records]
+            answer = await upstream.resolver.resolve(name, rdtype, lifetime=self.timeout)
+        except dns.exception.Timeout:
+            return DNSAnswer(DNSStatus.TIMEOUT), None
+        except dns.resolver.NXDOMAIN as e:
+            responses = list(e.kwargs.get('responses', {}).values())
+            return DNSAnswer(DNSStatus.NXDOMAIN), negative_ttl(responses[-1] if responses else None)
+        except dns.resolver.NoAnswer as e:
+            return DNSAnswer(DNSStatus.NODATA), negative_ttl(e.response())
         except dns.exception.DNSException:
-            return []
-    
+            # SERVFAIL, refused, no usable nameserver
+            return DNSAnswer(DNSStatus.SERVFAIL), None
+        return DNSAnswer(DNSStatus.NOERROR, _record_texts(answer, rdtype)), answer.rrset.ttl
+
+    async def check_mx_records(self, domain: str) -> tuple[bool, List[str]]:
+        mx_servers = list((await self.query(domain, 'MX')).records)
+        return len(mx_servers) > 0, mx_servers
+
+    async def check_a_records(self, domain: str) -> bool:
+        return len((await self.query(domain, 'A')).records) > 0
+
+    async def check_aaaa_records(self, domain: str) -> bool:
+        return len((await self.query(domain, 'AAAA')).records) > 0
+
+    async def lookup(self, domain: str) -> Dict[str, Any]:
+        """
+        MX, A and AAAA for the domain, queried concurrently. The first
+        NXDOMAIN (or a malformed name) settles it: the other queries are cancelled rather than
+        waited for.
+        """
+        tasks = {rdtype: asyncio.ensure_future(self.query(domain, rdtype)) for rdtype in LOOKUP_TYPES}
+        try:
+            for finished in asyncio.as_completed(list(tasks.values())):
+                if (await finished).status in (DNSStatus.NXDOMAIN, DNSStatus.INVALID):
+                    break
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        answers = {
+            rdtype: task.result() if task.done() and not task.cancelled() else DNSAnswer(DNSStatus.NXDOMAIN)
+            for rdtype, task in tasks.items()
+        }
+        mx_servers = list(answers['MX'].records)
+        has_a = len(answers['A'].records) > 0
+        has_aaaa = len(answers['AAAA'].records) > 0
+        return {
+            'has_mx': len(mx_servers) > 0,
+            'has_a': has_a,
+            'has_aaaa': has_aaaa,
+            'mx_servers': mx_servers,
+            'domain_exists': len(mx_servers) > 0 or has_a or has_aaaa,
+            'dns_status': self._overall_status(answers.values()).value,
+            # The shortest TTL among the answers: how long any conclusion drawn from them holds
+            'dns_ttl': min((answer.ttl for answer in answers.values() if answer.ttl is not None), default=None),
+            'resolver_trouble': self._resolver_trouble(answers, len(mx_servers) > 0 or has_a)
+        }
+
+    def _resolver_trouble(self, answers: Dict[str, DNSAnswer], mail_or_web: bool) -> bool:
+        """
+        Whether an answer lost to the resolver, not the domain, could change
+        the verdict. MX and A feed the type and the score; AAAA only decides
+        whether the domain exists at all, which MX or A already settle.
+        """
+        lost = {rdtype for rdtype, answer in answers.items() if answer.status in TRANSIENT_STATUSES}
+        return bool(lost & {'MX', 'A'}) or ('AAAA' in lost and not mail_or_web)
+
+    def _overall_status(self, answers: Iterable[DNSAnswer]) -> DNSStatus:
+        statuses = {answer.status for answer in answers}
+        for status in (DNSStatus.INVALID, DNSStatus.NXDOMAIN, DNSStatus.NOERROR, DNSStatus.SERVFAIL, DNSStatus.TIMEOUT):
+            if status in statuses:
+                return status
+        return DNSStatus.NODATA
+
     async def check_domain_exists(self, domain: str) -> bool:
-        has_mx, _ = await self.check_mx_records(domain)
-        has_a = await self.check_a_records(domain)
-        return has_mx or has_a
\ No newline at end of file
+        return (await self.lookup(domain))['domain_exists']
+
+    async def resolve_many(
+        self, queries: Iterable[Tuple[str, str]], window: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, str, DNSAnswer]]:
+        """(name, rdtype, answer) for each query, in the order the answers arrive"""
+        async def resolve(item):
+            name, rdtype = item
+            return name, rdtype, await self.query(name, rdtype)
+
+        async for result in self._as_completed(resolve, queries, window):
+            yield result
+
+    async def lookup_many(
+        self, domains: Iterable[str], window: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """(domain, lookup result) for each domain, in the order they complete"""
+        async def lookup(domain):
+            return domain, await self.lookup(domain)
+
+        async for result in self._as_completed(lookup, domains, window):
+            yield result
+
+    async def _as_completed(self, func: Callable, items: Iterable, window: Optional[int]) -> AsyncIterator:
+        # Only a window of the input is scheduled at once, so a million names cost a bounded number of tasks
+        window = window or 2 * self.max_in_flight * max(1, len(self.upstreams))
+        items = iter(items)
+        finished: asyncio.Queue = asyncio.Queue()
+        pending = set()
+        try:
+            while True:
+                for item in items:
+                    task = asyncio.ensure_future(func(item))
+                    task.add_done_callback(finished.put_nowait)
+                    pending.add(task)
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                task = await finished.get()
+                pending.discard(task)
+                yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def upstream_stats(self) -> Dict[str, Any]:
+        return {f"{upstream.address}:{upstream.port}": upstream.limiter.stats() for upstream in self.upstreams}
+
+    async def close(self):
+        if self.bulk is not None:
+            await self.bulk.close()
+
+class DNSCheckerResolver(AbstractResolver):
+    """
+    aiohttp resolver answering from a DNSChecker, so website probes share
+    its asyncresolver, answer cache and upstream limits instead of calling
+    getaddrinfo on the thread pool.
+    """
+
+    def __init__(self, dns_checker: DNSChecker):
+        self.dns_checker = dns_checker
+
+    async def addresses(self, host: str, family: int = socket.AF_INET) -> List[Tuple[int, str]]:
+        try:
+            return [(socket.AF_INET6 if ':' in host else socket.AF_INET, str(ipaddress.ip_address(host)))]
+        except ValueError:
+            pass
+        rdtypes = {socket.AF_INET: ('A',), socket.AF_INET6: ('AAAA',)}.get(family, ('A', 'AAAA'))
+        answers = await asyncio.gather(*(self.dns_checker.query(host, rdtype) for rdtype in rdtypes))
+        return [
+            (socket.AF_INET if rdtype == 'A' else socket.AF_INET6, address)
+            for rdtype, answer in zip(rdtypes, answers)
+            for address in answer.records
+        ]
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        addresses = await self.addresses(host, family)
+        if not addresses:
+            raise OSError(f"No address found for {host}")
+        return [
+            {
+                'hostname': host, 'host': address, 'port': port, 'family': address_family,
+                'proto': 0, 'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+            }
+            for address_family, address in addresses
+        ]
+
+    async def close(self):
+        pass
@@ -2,12 +2,39 @@ import aiohttp
 import asyncio
 import csv
 import io
-from typing import List, Set, Dict
+import os
+from contextlib import asynccontextmanager
+from typing import List, Set, Dict, Optional, Tuple
 from datetime import datetime
 import logging
+try:
+    import fcntl
+except ImportError:  # Not on Windows: every worker refreshes and writes for itself there
+    fcntl = None
+from app.core.config import settings
+from app.services.domain_snapshot import (
+    write_snapshot, open_snapshot, SnapshotError, DomainSnapshot, CompactDomainSet
+)
+from app.services.domain_suffix_index import default_suffix_rules, public_suffix_category, CATEGORY_PRIORITY
+from app.services.public_suffix import get_public_suffix_list, normalize_domain
+
+HUBSPOT_SOURCE = "hubspot_list"
+LIST_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# Seconds between attempts while waiting for the worker refreshing the lists
+SNAPSHOT_LOCK_POLL_INTERVAL = 0.2
 
 logger = logging.getLogger(__name__)
 
+async def _lock_exclusive(fd: int, wait: bool) -> bool:
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if not wait:
+                return False
+        await asyncio.sleep(SNAPSHOT_LOCK_POLL_INTERVAL)
+
 class DomainListsManager:
     def __init__(self):
         self.disposable_sources = [
@@ -24,48 +51,263 @@ class DomainListsManager:
             "tutanota.com", "mailbox.org", "hushmail.com", "lycos.com"
         ]
         
-        self.disposable_domains: Set[str] = set()
-        self.public_provider_domains: Set[str] = set(self.public_providers)
+        # Readers only ever see a fully built set: refreshes swap in new objects.
+        # Once a snapshot is mapped the lists live in the shared file, not on the heap.
+        self.disposable_domains = CompactDomainSet()
+        self.public_provider_domains = CompactDomainSet(extra=self.public_providers)
+        self._compiled: Optional[DomainSnapshot] = None
+        self.suffix_rules = default_suffix_rules()
+        self.public_suffixes = get_public_suffix_list()
         
-    async def update_disposable_lists(self) -> Dict[str, int]:
-        results = {}
+        # Lists not (yet) in a mapped snapshot, and the ETag / Last-Modified each source was last served with
+        self._source_snapshots: Dict[str, frozenset] = {}
+        self._source_validators: Dict[str, Dict[str, str]] = {}
+        self._update_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Long-lived session of the owner (the validator's HTTP checker); without one each refresh opens its own
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self._hubspot_domains: frozenset = frozenset()
         
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-            tasks = []
-            for source in self.disposable_sources:
-                task = self._fetch_domain_list(session, source)
-                tasks.append(task)
-            
-            list_results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.snapshot_path = settings.lists_snapshot_path
+        self.snapshot_check_interval = settings.lists_snapshot_check_interval
+        self.loaded_from_snapshot = False
+        self._mapped_identity: Optional[Tuple[int, int]] = None
+        
+    async def update_disposable_lists(self, wait: bool = False) -> Dict[str, int]:
+        async with self._update_lock:
+            return await self._update_disposable_lists(wait)
+    
+    async def _update_disposable_lists(self, wait: bool = False) -> Dict[str, int]:
+        async with self._snapshot_writer(wait) as writer:
+            # Another worker may have written a newer snapshot since this one last looked
+            remapped = self.remap_if_changed()
+            if not writer:
+                logger.info("Another worker is refreshing the domain lists; serving its last snapshot")
+                return self._source_counts()
+            if wait and remapped:
+                # The worker we waited for has just fetched everything
+                return self._source_counts()
+            return await self._refresh_lists()
+    
+    async def _refresh_lists(self) -> Dict[str, int]:
+        if self.http_session is not None and not self.http_session.closed:
+            list_results = await self._fetch_all_lists(self.http_session)
+        else:
+            async with aiohttp.ClientSession() as session:
+                list_results = await self._fetch_all_lists(session)
+        
+        held = self._source_counts()
+        changed: Dict[str, frozenset] = {}
+        for source, result in zip(self.disposable_sources, list_results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch {source}: {result}")
+                result = []
             
-            for i, result in enumerate(list_results):
-                source = self.disposable_sources[i]
-                if isinstance(result, Exception):
-                    logger.error(f"Failed to fetch {source}: {result}")
-                    results[source] = 0
-                else:
-                    results[source] = len(result)
-                    self.disposable_domains.update(result)
+            if result is None:
+                # Not modified: the copy already held is current
+                continue
+            if result:
+                domains = frozenset(result)
+                if not self._is_current(source, domains):
+                    changed[source] = domains
+            elif held.get(source):
+                # Keep serving the last good copy rather than shrinking the list
+                logger.warning(f"Using last good snapshot for {source}")
         
         # Load HubSpot list if available
-        hubspot_domains = await self._load_hubspot_list()
-        if hubspot_domains:
-            results["hubspot_list"] = len(hubspot_domains)
-            self.public_provider_domains.update(hubspot_domains)
+        hubspot_domains = frozenset(await self._load_hubspot_list())
+        if hubspot_domains and not self._is_current(HUBSPOT_SOURCE, hubspot_domains):
+            changed[HUBSPOT_SOURCE] = hubspot_domains
+        
+        # A snapshot that could not be written last time is retried even when nothing changed
+        unsaved = self.snapshot_path and self._compiled is None and (self._source_snapshots or self._hubspot_domains)
+        if changed or unsaved:
+            self._apply_changes(changed)
         
         logger.info(f"Updated domain lists: {len(self.disposable_domains)} disposable, {len(self.public_provider_domains)} public providers")
-        return results
+        return self._source_counts()
+    
+    def _apply_changes(self, changed: Dict[str, frozenset]):
+        # Lists this refresh left alone come from the heap copies or, failing those, the mapped snapshot
+        sources: Dict[str, frozenset] = dict(self._source_snapshots)
+        if self._hubspot_domains:
+            sources[HUBSPOT_SOURCE] = self._hubspot_domains
+        if self._compiled is not None:
+            kept = set(self.disposable_sources) | {HUBSPOT_SOURCE}
+            wanted = {
+                source['name'] for source in self._compiled.sources
+                if source['name'] in kept and source['name'] not in sources and source['name'] not in changed
+            }
+            for name, domains in self._compiled.domains_by_source(wanted).items():
+                sources[name] = frozenset(domains)
+        sources.update(changed)
+        self._hubspot_domains = sources.pop(HUBSPOT_SOURCE, frozenset())
+        self._source_snapshots = sources
+        
+        if self.save_snapshot() and self._map_snapshot():
+            return
+        # No snapshot to share: this worker serves its own copies until one can be written
+        self._compiled = None
+        disposable_domains: Set[str] = set()
+        for snapshot in self._source_snapshots.values():
+            disposable_domains.update(snapshot)
+        self.disposable_domains = CompactDomainSet(extra=disposable_domains)
+        self.public_provider_domains = CompactDomainSet(extra=set(self.public_providers) | self._hubspot_domains)
+    
+    def _is_current(self, name: str, domains: frozenset) -> bool:
+        """Whether domains is the list already held for the source, checked in place against the snapshot"""
+        held = self._hubspot_domains if name == HUBSPOT_SOURCE else self._source_snapshots.get(name)
+        if held:
+            return held == domains
+        snapshot = self._compiled
+        if snapshot is None:
+            return False
+        for index, source in enumerate(snapshot.sources):
+            if source['name'] == name:
+                bit = 1 << index
+                return source['count'] == len(domains) and all(snapshot.lookup(domain) & bit for domain in domains)
+        return False
+    
+    def _source_counts(self) -> Dict[str, int]:
+        counts = {source: 0 for source in self.disposable_sources}
+        if self._compiled is not None:
+            for source in self._compiled.sources:
+                if source['name'] in counts or source['name'] == HUBSPOT_SOURCE:
+                    counts[source['name']] = source['count']
+        for source, domains in self._source_snapshots.items():
+            counts[source] = len(domains)
+        if self._hubspot_domains:
+            counts[HUBSPOT_SOURCE] = len(self._hubspot_domains)
+        return counts
+    
+    @asynccontextmanager
+    async def _snapshot_writer(self, wait: bool = False):
+        """
+        Yields whether this worker may refresh the lists. With a snapshot
+        file only one worker at a time does, holding a lock file next to it;
+        the others map what it writes. With wait, blocks until it is free.
+        """
+        if not self.snapshot_path or fcntl is None:
+            yield True
+            return
+        try:
+            fd = os.open(f"{self.snapshot_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Cannot open the snapshot lock file, refreshing without it: {e}")
+            yield True
+            return
+        try:
+            yield await _lock_exclusive(fd, wait)
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+    
+    def save_snapshot(self) -> bool:
+        if not self.snapshot_path:
+            return False
+        
+        sources = []
+        for source, domains in self._source_snapshots.items():
+            validators = self._source_validators.get(source, {})
+            sources.append({
+                'name': source,
+                'category': 'disposable',
+                'domains': domains,
+                'etag': validators.get('If-None-Match'),
+                'last_modified': validators.get('If-Modified-Since')
+            })
+        if self._hubspot_domains:
+            sources.append({'name': HUBSPOT_SOURCE, 'category': 'public_provider', 'domains': self._hubspot_domains})
+        
+        try:
+            count = write_snapshot(self.snapshot_path, sources)
+            logger.info(f"Wrote domain list snapshot with {count} domains to {self.snapshot_path}")
+            return True
+        except (OSError, SnapshotError) as e:
+            logger.error(f"Failed to write domain list snapshot: {e}")
+            return False
+    
+    def load_snapshot(self) -> bool:
+        if not self._map_snapshot():
+            return False
+        
+        self.loaded_from_snapshot = True
+        logger.info(f"Loaded domain list snapshot: {len(self.disposable_domains)} disposable, {len(self.public_provider_domains)} public providers")
+        return True
+    
+    def remap_if_changed(self) -> bool:
+        """Map the snapshot again if another worker has replaced the file since"""
+        identity = self._snapshot_identity()
+        if identity is None or identity == self._mapped_identity:
+            return False
+        return self._map_snapshot()
+    
+    def _snapshot_identity(self) -> Optional[Tuple[int, int]]:
+        if not self.snapshot_path:
+            return None
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        # Snapshots are replaced by rename, so a new one is a new inode
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def _map_snapshot(self) -> bool:
+        # Taken before opening: should the file change in between, the next check maps it again
+        identity = self._snapshot_identity()
+        snapshot = self._open_snapshot()
+        if snapshot is None:
+            return False
+        
+        # Replaced snapshots are unmapped once no reader holds them any more
+        self._compiled = snapshot
+        self._mapped_identity = identity
+        # The file holds every list now; heap copies would only shadow it
+        self._source_snapshots = {}
+        self._hubspot_domains = frozenset()
+        for source in snapshot.sources:
+            if source['category'] == 'disposable':
+                validators = {}
+                if source.get('etag'):
+                    validators['If-None-Match'] = source['etag']
+                if source.get('last_modified'):
+                    validators['If-Modified-Since'] = source['last_modified']
+                self._source_validators[source['name']] = validators
+        self.disposable_domains = CompactDomainSet(snapshot, snapshot.category_mask('disposable'))
+        self.public_provider_domains = CompactDomainSet(
+            snapshot, snapshot.category_mask('public_provider'), self.public_providers
+        )
+        return True
+    
+    def _open_snapshot(self):
+        if not self.snapshot_path:
+            return None
+        try:
+            return open_snapshot(self.snapshot_path)
+        except (OSError, ValueError, SnapshotError) as e:
+            logger.warning(f"Ignoring unreadable domain list snapshot: {e}")
+            return None
+    
+    async def _fetch_all_lists(self, session: aiohttp.ClientSession) -> List:
+        tasks = [self._fetch_domain_list(session, source) for source in self.disposable_sources]
+        return await asyncio.gather(*tasks, return_exceptions=True)
     
-    async def _fetch_domain_list(self, session: aiohttp.ClientSession, url: str) -> List[str]:
+    async def _fetch_domain_list(self, session: aiohttp.ClientSession, url: str) -> Optional[List[str]]:
+        """The source's domains, None when unchanged since the copy held, or [] on failure"""
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
+            async with session.get(url, headers=self._source_validators.get(url, {}),
+                                   timeout=LIST_FETCH_TIMEOUT) as response:
+                if response.status == 304:
+                    return None
+                elif response.status == 200:
                     content = await response.text()
                     domains = []
                     for line in content.strip().split('\n'):
                         domain = line.strip().lower()
                         if domain and not domain.startswith('#') and '.' in domain:
                             domains.append(domain)
+                    if domains:
+                        self._remember_validators(url, response.headers)
                     return domains
                 else:
                     logger.warning(f"Failed to fetch {url}: HTTP {response.status}")
@@ -74,6 +316,14 @@ class DomainListsManager:
             logger.error(f"Error fetching {url}: {e}")
             return []
     
+    def _remember_validators(self, url: str, response_headers) -> None:
+        validators = {}
+        if response_headers.get('ETag'):
+            validators['If-None-Match'] = response_headers['ETag']
+        if response_headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response_headers['Last-Modified']
+        self._source_validators[url] = validators
+    
     async def _load_hubspot_list(self) -> List[str]:
         try:
             # Load the HubSpot CSV file
@@ -93,21 +343,88 @@ class DomainListsManager:
             logger.error(f"Error loading HubSpot list: {e}")
             return []
     
+    def match_category(self, domain: str) -> Optional[str]:
+        """
+        Category of the domain or of any parent listed for it, walking the
+        labels once from the TLD inwards. Only names below the public suffix
+        are looked up in the lists, so a list entry such as "eu.org" cannot
+        match every registration under it.
+        """
+        domain = normalize_domain(domain)
+        public_suffix, _ = self.public_suffixes.split(domain)
+        best = len(CATEGORY_PRIORITY)
+        suffix_category = self._public_suffix_category(public_suffix)
+        if suffix_category and len(public_suffix) < len(domain):
+            best = CATEGORY_PRIORITY.index(suffix_category)
+        
+        for suffix, rule_category in self.suffix_rules.walk(domain):
+            if rule_category and len(suffix) < len(domain):
+                best = min(best, CATEGORY_PRIORITY.index(rule_category))
+            if len(suffix) <= len(public_suffix):
+                continue
+            if suffix in self.disposable_domains:
+                return 'disposable'
+            if best > 1 and suffix in self.public_provider_domains:
+                best = 1
+        return CATEGORY_PRIORITY[best] if best < len(CATEGORY_PRIORITY) else None
+    
+    def suffix_category(self, domain: str) -> Optional[str]:
+        """Educational / government category implied by the domain's suffix alone"""
+        domain = normalize_domain(domain)
+        public_suffix, _ = self.public_suffixes.split(domain)
+        category = self.suffix_rules.match(domain)
+        if category is None and len(public_suffix) < len(domain):
+            category = self._public_suffix_category(public_suffix)
+        return category
+    
+    def _public_suffix_category(self, public_suffix: str) -> Optional[str]:
+        # Only registries' own suffixes count: privately registered ones (ac.ru, edu.ru) are open to anyone
+        if self.public_suffixes.is_private(public_suffix):
+            return None
+        return public_suffix_category(public_suffix)
+    
     def is_disposable_domain(self, domain: str) -> bool:
-        return domain.lower() in self.disposable_domains
+        return self.match_category(domain) == 'disposable'
     
     def is_public_provider(self, domain: str) -> bool:
-        return domain.lower() in self.public_provider_domains
+        return self.match_category(domain) == 'public_provider'
     
     def get_domain_category(self, domain: str) -> str:
-        domain = domain.lower()
-        
-        if domain in self.disposable_domains:
-            return "disposable"
-        elif domain in self.public_provider_domains:
-            return "public_provider"
-        else:
-            return "unknown"
+        return self.match_category(domain) or "unknown"
     
     async def initialize(self):
-        await self.update_disposable_lists()
\ No newline at end of file
+        # With a snapshot on disk the network refresh is left to the background task
+        if not self.load_snapshot():
+            # Workers starting together wait for whichever one builds the snapshot rather than all fetching
+            await self.update_disposable_lists(wait=True)
+    
+    def start_background_refresh(self, interval: Optional[float] = None):
+        if self._refresh_task is None or self._refresh_task.done():
+            interval = interval or settings.lists_refresh_interval
+            self._refresh_task = asyncio.create_task(
+                self._refresh_loop(interval, refresh_first=self.loaded_from_snapshot)
+            )
+    
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def _refresh_loop(self, interval: float, refresh_first: bool = False):
+        loop = asyncio.get_running_loop()
+        next_refresh = loop.time() if refresh_first else loop.time() + interval
+        while True:
+            if loop.time() >= next_refresh:
+                try:
+                    await self.update_disposable_lists()
+                except Exception as e:
+                    logger.error(f"Background list refresh failed: {e}")
+                next_refresh = loop.time() + interval
+            elif self.remap_if_changed():
+                logger.info(f"Mapped the domain list snapshot another worker wrote: {len(self.disposable_domains)} disposable")
+            # Between refreshes, look for a snapshot written by whichever worker refreshed
+            await asyncio.sleep(max(0.0, min(self.snapshot_check_interval, next_refresh - loop.time())))
\ No newline at end of file
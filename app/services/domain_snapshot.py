@@ -0,0 +1,258 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+# File layout (all integers little-endian):
+#   header    magic, version, source count, domain count, metadata length, slot count, created_at
+#   metadata  JSON list of sources: name, category, etag, last_modified, count
+#   offsets   uint32[domain_count + 1], start of each domain in the blob
+#   masks     uint32[domain_count], bit i set when source i lists the domain
+#   slots     uint32[slot_count], open-addressing hash index: domain index + 1, 0 = empty
+#   blob      sorted, deduplicated domains, each terminated by b"\n"
+MAGIC = b"EDVSNAP\x00"
+VERSION = 2
+HEADER = struct.Struct("<8sHHIIIQ")
+MAX_SOURCES = 32
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _align(size: int) -> int:
+    return (size + 3) & ~3
+
+
+def _slot_count(domain_count: int) -> int:
+    # Power of two with a load factor of at most one half
+    size = 8
+    while size < domain_count * 2:
+        size <<= 1
+    return size
+
+
+def _key(domain: str) -> Optional[bytes]:
+    """The stored form of a domain: IDNA (punycode) for non-ASCII names, None when it has none"""
+    if domain.isascii():
+        return domain.encode('ascii')
+    try:
+        return domain.encode('idna')
+    except UnicodeError:
+        return None
+
+
+def write_snapshot(path: str, sources: List[Dict]) -> int:
+    """
+    Write a compiled snapshot. Each source is a dict with name, category,
+    domains and optionally etag / last_modified. Returns the domain count.
+    """
+    if len(sources) > MAX_SOURCES:
+        raise SnapshotError(f"At most {MAX_SOURCES} sources fit in a snapshot")
+    
+    masks: Dict[bytes, int] = {}
+    metadata = []
+    for index, source in enumerate(sources):
+        bit = 1 << index
+        domains = {_key(d) for d in source['domains']}
+        domains.discard(None)
+        domains.discard(b"")
+        for domain in domains:
+            masks[domain] = masks.get(domain, 0) | bit
+        metadata.append({
+            'name': source['name'],
+            'category': source['category'],
+            'etag': source.get('etag'),
+            'last_modified': source.get('last_modified'),
+            'count': len(domains)
+        })
+    
+    ordered = sorted(masks)
+    offsets = array('I', [0]) * (len(ordered) + 1)
+    position = 0
+    for i, domain in enumerate(ordered):
+        offsets[i] = position
+        position += len(domain) + 1
+    offsets[len(ordered)] = position
+    mask_array = array('I', (masks[d] for d in ordered))
+    
+    slot_count = _slot_count(len(ordered))
+    slots = array('I', [0]) * slot_count
+    for i, domain in enumerate(ordered):
+        slot = zlib.crc32(domain) & (slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = i + 1
+    
+    meta_bytes = json.dumps(metadata).encode()
+    header = HEADER.pack(MAGIC, VERSION, len(sources), len(ordered), len(meta_bytes), slot_count, int(time.time()))
+    padding = b"\0" * (_align(HEADER.size + len(meta_bytes)) - HEADER.size - len(meta_bytes))
+    
+    # Write next to the target and rename so readers never map a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(meta_bytes)
+        f.write(padding)
+        f.write(offsets.tobytes())
+        f.write(mask_array.tobytes())
+        f.write(slots.tobytes())
+        f.write(b"\n".join(ordered))
+        if ordered:
+            f.write(b"\n")
+    os.replace(tmp_path, path)
+    return len(ordered)
+
+
+class DomainSnapshot:
+    """Read-only, memory-mapped view of a compiled snapshot"""
+    
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self._mm) < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+        magic, version, source_count, count, meta_len, slot_count, created_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{path} is not a version {VERSION} domain snapshot")
+        
+        self.path = path
+        self.created_at = created_at
+        self.sources: List[Dict] = json.loads(self._mm[HEADER.size:HEADER.size + meta_len])
+        self._count = count
+        self._offsets_start = _align(HEADER.size + meta_len)
+        self._masks_start = self._offsets_start + 4 * (count + 1)
+        self._slots_start = self._masks_start + 4 * count
+        self._blob_start = self._slots_start + 4 * slot_count
+        self._slot_mask = slot_count - 1
+        
+        if slot_count & self._slot_mask or self._blob_start > len(self._mm):
+            raise SnapshotError(f"{path} is truncated")
+        self._offsets = memoryview(self._mm)[self._offsets_start:self._masks_start].cast('I')
+        self._masks = memoryview(self._mm)[self._masks_start:self._slots_start].cast('I')
+        self._slots = memoryview(self._mm)[self._slots_start:self._blob_start].cast('I')
+        
+        if self._blob_start + self._offsets[count] > len(self._mm):
+            self.close()
+            raise SnapshotError(f"{path} is truncated")
+        
+        # Category views probe the same name back to back; remember the last answer
+        self._last_lookup = (None, 0)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __getitem__(self, index: int) -> bytes:
+        start = self._blob_start + self._offsets[index]
+        return self._mm[start:self._blob_start + self._offsets[index + 1] - 1]
+    
+    def __contains__(self, domain: str) -> bool:
+        return self.lookup(domain) != 0
+    
+    def lookup(self, domain: str) -> int:
+        """Source bitmask for the domain, 0 when no source lists it"""
+        last_domain, last_mask = self._last_lookup
+        if domain == last_domain:
+            return last_mask
+        key = _key(domain)
+        mask = self._probe(key) if key else 0
+        self._last_lookup = (domain, mask)
+        return mask
+    
+    def _probe(self, key: bytes) -> int:
+        slots = self._slots
+        slot = zlib.crc32(key) & self._slot_mask
+        while True:
+            entry = slots[slot]
+            if not entry:
+                return 0
+            if self[entry - 1] == key:
+                return self._masks[entry - 1]
+            slot = (slot + 1) & self._slot_mask
+    
+    def category_mask(self, category: str) -> int:
+        mask = 0
+        for index, source in enumerate(self.sources):
+            if source['category'] == category:
+                mask |= 1 << index
+        return mask
+    
+    def entries(self) -> Iterator[Tuple[str, int]]:
+        if not self._count:
+            return iter(())
+        blob = self._mm[self._blob_start:self._blob_start + self._offsets[self._count] - 1]
+        return zip(blob.decode('ascii').split("\n"), self._masks.tolist())
+    
+    def domains_by_source(self, names: Optional[Collection[str]] = None) -> Dict[str, List[str]]:
+        """Domains of every source, or of the named ones only"""
+        wanted = [
+            (index, source['name']) for index, source in enumerate(self.sources)
+            if names is None or source['name'] in names
+        ]
+        entries = list(self.entries()) if wanted else []
+        return {name: [domain for domain, mask in entries if mask & (1 << index)] for index, name in wanted}
+    
+    def close(self):
+        self._offsets.release()
+        self._masks.release()
+        self._slots.release()
+        self._mm.close()
+
+
+def open_snapshot(path: str) -> Optional[DomainSnapshot]:
+    if not os.path.exists(path):
+        return None
+    return DomainSnapshot(path)
+
+
+class CompactDomainSet:
+    """
+    Set-like membership for one category of a snapshot plus an in-memory
+    overlay. The snapshot pages are shared by every process that maps the
+    same file; only the overlay lives on the Python heap.
+    """
+    
+    __hash__ = None
+    
+    def __init__(self, snapshot: Optional[DomainSnapshot] = None, mask: int = 0, extra=()):
+        self._snapshot = snapshot
+        self._mask = mask
+        self._extra = set(extra)
+        self._snapshot_len: Optional[int] = None
+    
+    def __contains__(self, domain: str) -> bool:
+        if domain in self._extra:
+            return True
+        return self._snapshot is not None and self._snapshot.lookup(domain) & self._mask != 0
+    
+    def __iter__(self) -> Iterator[str]:
+        if self._snapshot is not None:
+            for domain, mask in self._snapshot.entries():
+                if mask & self._mask:
+                    yield domain
+        for domain in self._extra:
+            if self._snapshot is None or not self._snapshot.lookup(domain) & self._mask:
+                yield domain
+    
+    def __len__(self) -> int:
+        if self._snapshot is None:
+            return len(self._extra)
+        if self._snapshot_len is None:
+            self._snapshot_len = sum(1 for mask in self._snapshot._masks.tolist() if mask & self._mask)
+        return self._snapshot_len + sum(1 for domain in self._extra if not self._snapshot.lookup(domain) & self._mask)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CompactDomainSet, set, frozenset)):
+            return set(self) == set(other)
+        return NotImplemented
+    
+    def add(self, domain: str):
+        self._extra.add(domain)
+    
+    def update(self, domains):
+        self._extra.update(domains)
@@ -0,0 +1,68 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+EDUCATIONAL_SUFFIXES = ['edu', 'ac.uk', 'edu.au', 'ac.jp', 'ac.za', 'edu.sg']
+GOVERNMENT_SUFFIXES = ['gov', 'gov.uk', 'gov.au', 'gov.ca', 'gouv.fr', 'gob.es']
+
+# Second-level labels that mark a public suffix as academic or governmental (ac.uk, gob.mx, ...)
+EDUCATIONAL_LABELS = {'edu', 'ac'}
+GOVERNMENT_LABELS = {'gov', 'gob', 'gouv', 'govt'}
+
+# Lower index wins when a domain matches more than one category
+CATEGORY_PRIORITY = ['disposable', 'public_provider', 'educational', 'government']
+
+_CATEGORY = "$"
+
+
+class SuffixTrie:
+    """Trie of suffix rules keyed by reversed labels: "ac.uk" is stored as uk -> ac"""
+    
+    def __init__(self, rules: Optional[Dict[str, str]] = None):
+        self._root: Dict = {}
+        for suffix, category in (rules or {}).items():
+            self.add(suffix, category)
+    
+    def add(self, suffix: str, category: str):
+        node = self._root
+        for label in reversed(suffix.lower().strip('.').split('.')):
+            node = node.setdefault(label, {})
+        node[_CATEGORY] = category
+    
+    def walk(self, domain: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Yield (suffix, rule category) for every parent of the domain, from the
+        TLD inwards, ending with the domain itself. The category is that of a
+        rule ending exactly at that suffix, or None.
+        """
+        node = self._root
+        end = len(domain)
+        while end > 0:
+            start = domain.rfind('.', 0, end) + 1
+            if node is not None:
+                node = node.get(domain[start:end])
+            yield domain[start:], node.get(_CATEGORY) if node else None
+            end = start - 1
+    
+    def match(self, domain: str) -> Optional[str]:
+        """Category of the most specific rule strictly above the domain"""
+        category = None
+        for suffix, rule_category in self.walk(domain):
+            if rule_category and len(suffix) < len(domain):
+                category = rule_category
+        return category
+
+
+def default_suffix_rules() -> SuffixTrie:
+    rules = {suffix: 'educational' for suffix in EDUCATIONAL_SUFFIXES}
+    rules.update({suffix: 'government' for suffix in GOVERNMENT_SUFFIXES})
+    return SuffixTrie(rules)
+
+
+def public_suffix_category(public_suffix: str) -> Optional[str]:
+    labels = public_suffix.split('.')
+    if len(labels) < 2:
+        return None
+    if labels[0] in EDUCATIONAL_LABELS:
+        return 'educational'
+    if labels[0] in GOVERNMENT_LABELS:
+        return 'government'
+    return None
@@ -1,127 +1,517 @@
 import asyncio
+import logging
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, Optional
-from app.services.dns_checker import DNSChecker
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import or_
+from app.services.dns_checker import DNSChecker, DNSCheckerResolver
+from app.services.dns_cache import DNSCache
 from app.services.http_checker import HTTPChecker
 from app.services.domain_lists_manager import DomainListsManager
 from app.services.cache_service import CacheService
+from app.services.mx_index import MXProviderIndex, MailProvider, CORPORATE_MAIL_CATEGORIES
+from app.core.config import settings
+from app.services.public_suffix import get_public_suffix_list, normalize_domain
+from app.models.database import SessionLocal, Domain
 from app.models.schemas import (
     DomainValidationResponse, DomainType, ValidationStatus, 
-    Recommendation, DomainMetadata
+    Recommendation, DomainMetadata, ValidationProfile
 )
 
+logger = logging.getLogger(__name__)
+
+LIST_CATEGORY_TYPES = {
+    'disposable': DomainType.DISPOSABLE,
+    'public_provider': DomainType.PUBLIC_PROVIDER,
+    'educational': DomainType.EDUCATIONAL,
+    'government': DomainType.GOVERNMENT
+}
+
+# Stand-ins for checks that were skipped because an earlier stage decided the result
+NO_DNS_RESULTS = {'has_mx': False, 'has_a': False, 'has_aaaa': False, 'mx_servers': None, 'domain_exists': False, 'dns_status': None}
+NO_HTTP_RESULTS = {'accessible': False, 'has_ssl': False, 'status_code': None, 'ssl_valid': False, 'parked': False}
+
+# Stages each profile runs; the http stage only checks the certificate for FULL
+PROFILE_STAGES = {
+    ValidationProfile.FAST: {'normalize', 'overrides', 'lists', 'cache', 'dns'},
+    ValidationProfile.STANDARD: {'normalize', 'overrides', 'lists', 'cache', 'dns', 'http'},
+    ValidationProfile.FULL: {'normalize', 'overrides', 'lists', 'cache', 'dns', 'http'}
+}
+
+# Share of the remaining deadline given to each network stage still to run
+STAGE_BUDGET_WEIGHTS = {'dns': 1, 'http': 3}
+
+@dataclass
+class DomainOverride:
+    domain_type: DomainType
+    validation_status: ValidationStatus
+    quality_score: float
+    recommendation: Optional[Recommendation] = None
+
+@dataclass
+class ValidationContext:
+    domain: str
+    registrable: str = ""
+    list_category: Optional[str] = None
+    dns_results: Optional[Dict[str, Any]] = None
+    http_results: Optional[Dict[str, Any]] = None
+    stages: List[str] = field(default_factory=list)
+    profile: ValidationProfile = ValidationProfile.FULL
+    deadline: Optional[float] = None  # event loop time
+    partial: bool = False
+    mail_provider: Optional[MailProvider] = None
+    # Batch runs share the cache answers fetched up front and the entries to write back at the end
+    prefetched: Optional[Dict[str, DomainValidationResponse]] = None
+    revalidate: bool = False  # a background refresh of a stale entry: skip the cache
+    # The verdict for this name equals its registrable domain's, so the two can share a cache entry
+    shares_entry: bool = True
+    cache_writes: Optional[List[Tuple[str, DomainValidationResponse, Optional[ValidationProfile], Optional[int]]]] = None
+
 class DomainValidator:
     def __init__(self):
         self.dns_checker = DNSChecker()
-        self.http_checker = HTTPChecker()
+        # Probes resolve through the DNS checker's cache rather than getaddrinfo threads
+        self.http_checker = HTTPChecker(resolver=DNSCheckerResolver(self.dns_checker))
         self.domain_lists = DomainListsManager()
         self.cache_service = CacheService()
+        self.mx_index = MXProviderIndex()
+        self._mx_learning_task: Optional[asyncio.Task] = None
+        self._mx_learning_dns: Optional[DNSChecker] = None
+        # Background refreshes of stale cache entries, one per (registrable domain, profile)
+        self._refreshes: Dict[Tuple[str, ValidationProfile], asyncio.Task] = {}
+        self.public_suffixes = get_public_suffix_list()
+        self.overrides: Dict[str, DomainOverride] = {}
         
-    async def validate_domain(self, domain: str) -> DomainValidationResponse:
-        domain = domain.lower().strip()
+        # Cheapest first; any stage may return the final result and skip the rest
+        self.pipeline = [
+            ('normalize', self._normalize_stage),
+            ('overrides', self._overrides_stage),
+            ('lists', self._lists_stage),
+            ('cache', self._cache_stage),
+            ('dns', self._dns_stage),
+            ('http', self._http_stage)
+        ]
         
-        # Check cache first
-        cached_result = await self.cache_service.get_cached_validation(domain)
+    async def startup(self):
+        self.cache_service.override_listener = self.reload_override
+        await self.cache_service.connect()
+        # List refreshes share the probes' pooled session
+        self.domain_lists.http_session = self.http_checker.session
+        await self.domain_lists.initialize()
+        self.domain_lists.start_background_refresh()
+        self.load_overrides()
+        if settings.mx_index_learn_limit:
+            # Learning runs on a small limiter of its own and keeps its answers out of the shared cache,
+            # so validations never queue behind it
+            self._mx_learning_dns = DNSChecker(
+                cache=DNSCache(0), bulk_sockets=0, max_in_flight=settings.mx_index_learn_max_in_flight
+            )
+            self._mx_learning_task = asyncio.create_task(self._learn_disposable_mx_loop())
+    
+    async def shutdown(self):
+        if self._mx_learning_task:
+            self._mx_learning_task.cancel()
+            try:
+                await self._mx_learning_task
+            except asyncio.CancelledError:
+                pass
+            self._mx_learning_task = None
+        if self._mx_learning_dns:
+            await self._mx_learning_dns.close()
+            self._mx_learning_dns = None
+        refreshes = list(self._refreshes.values())
+        for task in refreshes:
+            task.cancel()
+        await asyncio.gather(*refreshes, return_exceptions=True)
+        await self.domain_lists.stop_background_refresh()
+        self.domain_lists.http_session = None
+        await self.http_checker.close()
+        await self.dns_checker.close()
+        await self.cache_service.disconnect()
+    
+    async def _learn_disposable_mx_loop(self):
+        # Follows the list refresh cadence; the lists themselves are swapped in by the manager
+        while True:
+            try:
+                await self.mx_index.learn_disposable(
+                    self._mx_learning_dns, self.domain_lists.disposable_domains, settings.mx_index_learn_limit
+                )
+            except Exception as e:
+                logger.error(f"Learning disposable MX hosts failed: {e}")
+            await asyncio.sleep(settings.lists_refresh_interval)
+    
+    def load_overrides(self):
+        db = SessionLocal()
+        try:
+            records = db.query(Domain).filter(or_(
+                Domain.is_whitelisted == True,
+                Domain.is_blacklisted == True,
+                Domain.manual_classification == True
+            )).all()
+            for record in records:
+                self.update_override(record.domain_name, record)
+        except Exception as e:
+            logger.warning(f"Could not load manual overrides: {e}")
+        finally:
+            db.close()
+    
+    def reload_override(self, domain: Optional[str]):
+        """Re-read one domain's override, or all of them, after another worker changed it"""
+        if domain is None:
+            self.overrides = {}
+            self.load_overrides()
+            return
+        db = SessionLocal()
+        try:
+            self.update_override(domain, db.query(Domain).filter(Domain.domain_name == domain).first())
+        except Exception as e:
+            logger.warning(f"Could not reload the override of {domain}: {e}")
+        finally:
+            db.close()
+    
+    async def apply_override(self, domain: str, record: Optional[Domain]):
+        """Put a committed override change into effect in every worker"""
+        self.update_override(domain, record)
+        await self.cache_service.invalidate_domain_cache(domain)
+        await self.cache_service.announce_override(domain)
+    
+    def update_override(self, domain: str, record: Optional[Domain]):
+        domain = normalize_domain(domain)
+        override = None
+        if record is not None:
+            if record.is_blacklisted:
+                override = DomainOverride(DomainType.SUSPICIOUS, ValidationStatus.SUSPICIOUS, 0.0, Recommendation.REJECT)
+            elif record.is_whitelisted:
+                override = DomainOverride(
+                    DomainType(record.domain_type.value), ValidationStatus.VALID,
+                    record.quality_score if record.quality_score is not None else 10.0, Recommendation.ACCEPT
+                )
+            elif record.manual_classification:
+                override = DomainOverride(
+                    DomainType(record.domain_type.value), ValidationStatus(record.validation_status.value),
+                    record.quality_score if record.quality_score is not None else 5.0
+                )
+        
+        if override:
+            self.overrides[domain] = override
+        else:
+            self.overrides.pop(domain, None)
+        
+    async def validate_domain(
+        self,
+        domain: str,
+        profile: ValidationProfile = ValidationProfile.FULL,
+        deadline_ms: Optional[int] = None
+    ) -> DomainValidationResponse:
+        return await self._run(self._new_context(domain, profile, deadline_ms))
+    
+    async def validate_many(
+        self,
+        domains: List[str],
+        profile: ValidationProfile = ValidationProfile.FULL,
+        deadline_ms: Optional[int] = None
+    ) -> List[Optional[DomainValidationResponse]]:
+        """
+        Validate a batch in order; None stands for a domain whose validation
+        failed. Every cached domain is answered from one cache round trip
+        before any probe starts, and new results go back in one pipelined write.
+        """
+        prefetched: Dict[str, DomainValidationResponse] = {}
+        if 'cache' in PROFILE_STAGES[profile]:
+            prefetched = await self.cache_service.get_many(
+                [self._registrable(normalize_domain(domain)) for domain in domains], profile
+            )
+        cache_writes = []
+        
+        results = []
+        for domain in domains:
+            # Each domain's deadline starts when its turn comes, as with one request per domain
+            context = self._new_context(domain, profile, deadline_ms)
+            context.prefetched, context.cache_writes = prefetched, cache_writes
+            try:
+                results.append(await self._run(context))
+            except Exception as e:
+                logger.error(f"Validation of {domain} failed: {e}")
+                results.append(None)
+        
+        await self.cache_service.set_many(cache_writes)
+        return results
+    
+    def _new_context(
+        self, domain: str, profile: ValidationProfile, deadline_ms: Optional[int]
+    ) -> ValidationContext:
+        if deadline_ms is None:
+            deadline_ms = self._default_deadline_ms(profile)
+        return ValidationContext(
+            domain=domain, profile=profile,
+            deadline=asyncio.get_running_loop().time() + deadline_ms / 1000 if deadline_ms else None
+        )
+    
+    async def _run(self, context: ValidationContext) -> DomainValidationResponse:
+        stages = [(name, stage) for name, stage in self.pipeline if name in PROFILE_STAGES[context.profile]]
+        for index, (name, stage) in enumerate(stages):
+            budget = self._stage_budget(context, name, [pending for pending, _ in stages[index:]])
+            if budget is not None and budget <= 0:
+                context.partial = True
+                break
+            context.stages.append(name)
+            try:
+                result = await asyncio.wait_for(stage(context), budget)
+            except asyncio.TimeoutError:
+                logger.info(f"Deadline reached in {name} stage for {context.domain}")
+                context.partial = True
+                break
+            if result is not None:
+                return result
+        return await self._complete(context)
+    
+    def _default_deadline_ms(self, profile: ValidationProfile) -> int:
+        return {
+            ValidationProfile.FAST: settings.fast_profile_deadline_ms,
+            ValidationProfile.STANDARD: settings.standard_profile_deadline_ms,
+            ValidationProfile.FULL: settings.full_profile_deadline_ms
+        }[profile]
+    
+    def _stage_budget(self, context: ValidationContext, name: str, pending: List[str]) -> Optional[float]:
+        """Seconds the stage may take: its weighted share of what is left of the deadline"""
+        if context.deadline is None or name not in STAGE_BUDGET_WEIGHTS:
+            return None
+        remaining = context.deadline - asyncio.get_running_loop().time()
+        total_weight = sum(STAGE_BUDGET_WEIGHTS.get(stage, 0) for stage in pending)
+        return remaining * STAGE_BUDGET_WEIGHTS[name] / total_weight
+    
+    async def _normalize_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        context.domain = normalize_domain(context.domain)
+        context.registrable = self._registrable(context.domain)
+        return None
+    
+    def _registrable(self, domain: str) -> str:
+        # Subdomains share the probes and the cache entry of their registrable domain
+        return self.public_suffixes.registrable_domain(domain) or domain
+    
+    async def _overrides_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        override = self.overrides.get(context.domain) or self.overrides.get(context.registrable)
+        if override is None:
+            return None
+        return self._build_result(
+            context, override.domain_type, override.validation_status,
+            override.quality_score, override.recommendation
+        )
+    
+    async def _lists_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        context.list_category = self.domain_lists.match_category(context.domain)
+        # A list hit is settled without looking up records: its metadata stays empty (dns_status None)
+        # and it scores the type's base score (gmail.com 5.0, not the 7.0 a full probe used to add up)
+        if context.list_category == 'disposable':
+            return self._build_result(context, DomainType.DISPOSABLE, ValidationStatus.UNKNOWN)
+        if context.list_category == 'public_provider':
+            return self._build_result(context, DomainType.PUBLIC_PROVIDER, ValidationStatus.VALID)
+        # Lists and suspicious patterns read the whole name; records are the registrable domain's
+        if context.domain != context.registrable:
+            context.shares_entry = self._name_signals(context.domain, context.list_category) == \
+                self._name_signals(context.registrable)
+        return None
+    
+    def _name_signals(self, domain: str, list_category: Optional[str] = None) -> Tuple:
+        """What the classification takes from the name itself rather than from its records"""
+        # 'mail' in a name without MX is left out: without MX the verdict is never corporate anyway
+        return (list_category or self.domain_lists.match_category(domain), self._has_suspicious_name(domain))
+    
+    async def _cache_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        if context.revalidate or not context.shares_entry:
+            return None
+        if context.prefetched is not None:
+            cached_result = context.prefetched.get(context.registrable)
+        else:
+            cached_result = await self.cache_service.get_cached_validation(context.registrable, context.profile)
         if cached_result:
-            return cached_result
+            if cached_result.stale:
+                # Answer now; the next caller gets the refreshed entry. Refreshed as the profile it was
+                # cached under, so a fast request cannot replace a full entry with a fast one
+                self._schedule_refresh(context.registrable, cached_result.profile)
+            return cached_result.model_copy(update={'domain': context.domain, 'stages': list(context.stages)})
+        return None
+    
+    def _schedule_refresh(self, registrable: str, profile: ValidationProfile):
+        key = (registrable, profile)
+        if key in self._refreshes:
+            return
+        task = asyncio.create_task(self._refresh(registrable, profile))
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+    
+    async def _refresh(self, registrable: str, profile: ValidationProfile):
+        context = self._new_context(registrable, profile, None)
+        context.revalidate = True
+        try:
+            await self._run(context)
+        except Exception as e:
+            logger.warning(f"Refreshing the cache entry of {registrable} failed: {e}")
+    
+    async def _dns_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        dns_results = await self._perform_dns_checks(context.registrable)
+        context.dns_results = dns_results
+        context.mail_provider = self.mx_index.classify(dns_results['mx_servers'])
+        
+        if dns_results.get('resolver_trouble'):
+            # Answers lost to SERVFAIL / timeouts are not "no records": conclude and cache nothing from them
+            context.partial = True
+            if not dns_results['domain_exists']:
+                return await self._complete(context)
+            return None
+        
+        if not dns_results['domain_exists']:
+            # NXDOMAIN or no mail / web host: nothing left worth probing
+            result = self._build_result(context, DomainType.UNREACHABLE, ValidationStatus.INVALID)
+        elif context.list_category in ('educational', 'government'):
+            # The suffix already decided the type; a website would not change it
+            result = self._build_result(
+                context, LIST_CATEGORY_TYPES[context.list_category],
+                self._determine_validation_status(dns_results, NO_HTTP_RESULTS)
+            )
+        elif context.mail_provider and context.mail_provider.category in ('disposable',) + CORPORATE_MAIL_CATEGORIES:
+            # Mail hosted by a disposable service or a major platform settles it without a website probe
+            domain_type = await self._classify_domain(context.domain, dns_results, None)
+            validation_status = ValidationStatus.UNKNOWN if domain_type == DomainType.DISPOSABLE \
+                else self._determine_validation_status(dns_results, NO_HTTP_RESULTS)
+            result = self._build_result(context, domain_type, validation_status)
+        else:
+            return None
         
-        # Parallel execution of checks
-        dns_task = self._perform_dns_checks(domain)
-        http_task = self._perform_http_checks(domain)
+        # Every profile would have stopped here, so the entry can serve them all
+        await self._store(context, result, ValidationProfile.FULL)
+        return result
+    
+    async def _http_stage(self, context: ValidationContext) -> Optional[DomainValidationResponse]:
+        context.http_results = await self._perform_http_checks(
+            context.registrable, check_ssl=context.profile == ValidationProfile.FULL
+        )
+        return None
+    
+    async def _complete(self, context: ValidationContext) -> DomainValidationResponse:
+        """Result from whatever the profile's checks (or the deadline) left in the context"""
+        dns_results = context.dns_results
+        http_results = context.http_results
         
-        dns_results, http_results = await asyncio.gather(dns_task, http_task)
+        recommendation = None
+        if dns_results is None or not dns_results['domain_exists']:
+            # DNS ran out of time or the resolver failed: nothing is known beyond the name
+            domain_type = LIST_CATEGORY_TYPES.get(context.list_category, DomainType.SUSPICIOUS)
+            validation_status = ValidationStatus.UNKNOWN
+            recommendation = Recommendation.MANUAL_REVIEW
+        else:
+            domain_type = await self._classify_domain(context.domain, dns_results, http_results)
+            validation_status = self._determine_validation_status(dns_results, http_results or NO_HTTP_RESULTS)
+        result = self._build_result(context, domain_type, validation_status, recommendation=recommendation)
+        
+        # A partial result only says how slow or troubled the probes were this time
+        if not context.partial:
+            await self._store(context, result)
+        
+        return result
+    
+    async def _store(
+        self, context: ValidationContext, result: DomainValidationResponse,
+        profile: Optional[ValidationProfile] = None
+    ):
+        if not context.shares_entry:
+            return
+        # The entry expires with the DNS answers it was drawn from (see CacheTTLPolicy)
+        dns_ttl = context.dns_results.get('dns_ttl') if context.dns_results else None
+        if context.cache_writes is None:
+            await self.cache_service.cache_validation_result(context.registrable, result, profile, dns_ttl=dns_ttl)
+            return
+        context.cache_writes.append((context.registrable, result, profile, dns_ttl))
+        # Later domains of the batch on the same registrable domain reuse it without probing
+        context.prefetched[context.registrable] = result
+    
+    def _build_result(
+        self,
+        context: ValidationContext,
+        domain_type: DomainType,
+        validation_status: ValidationStatus,
+        quality_score: Optional[float] = None,
+        recommendation: Optional[Recommendation] = None
+    ) -> DomainValidationResponse:
+        dns_results = context.dns_results or NO_DNS_RESULTS
+        http_results = context.http_results or NO_HTTP_RESULTS
         
-        # Combine results
         metadata = DomainMetadata(
             has_mx_record=dns_results['has_mx'],
             has_a_record=dns_results['has_a'],
             mx_servers=dns_results['mx_servers'],
+            dns_status=dns_results.get('dns_status'),
+            mail_provider=context.mail_provider.name if context.mail_provider else None,
             website_accessible=http_results['accessible'],
-            has_ssl_certificate=http_results['has_ssl']
+            has_ssl_certificate=http_results['has_ssl'],
+            ssl_issuer=http_results.get('ssl_issuer'),
+            ssl_expiry_date=http_results.get('ssl_expiry_date'),
+            parked=http_results.get('parked', False)
         )
         
-        # Classify domain
-        domain_type = await self._classify_domain(domain, dns_results, http_results)
-        validation_status = self._determine_validation_status(dns_results, http_results)
-        quality_score = self._calculate_quality_score(domain_type, dns_results, http_results)
-        recommendation = self._generate_recommendation(domain_type, quality_score)
+        if quality_score is None:
+            quality_score = self._calculate_quality_score(domain_type, dns_results, http_results)
+        if recommendation is None:
+            recommendation = self._generate_recommendation(domain_type, quality_score)
         
-        result = DomainValidationResponse(
-            domain=domain,
+        return DomainValidationResponse(
+            domain=context.domain,
+            registrable_domain=context.registrable,
             domain_type=domain_type,
             validation_status=validation_status,
             quality_score=quality_score,
             recommendation=recommendation,
             metadata=metadata,
+            stages=list(context.stages),
+            profile=context.profile,
+            partial=context.partial,
             checked_at=datetime.utcnow()
         )
-        
-        # Cache the result
-        await self.cache_service.cache_validation_result(domain, result)
-        
-        return result
     
     async def _perform_dns_checks(self, domain: str) -> Dict[str, Any]:
-        has_mx, mx_servers = await self.dns_checker.check_mx_records(domain)
-        has_a = await self.dns_checker.check_a_records(domain)
-        
-        return {
-            'has_mx': has_mx,
-            'has_a': has_a,
-            'mx_servers': mx_servers,
-            'domain_exists': has_mx or has_a
-        }
+        return await self.dns_checker.lookup(domain)
     
-    async def _perform_http_checks(self, domain: str) -> Dict[str, Any]:
-        website_check = await self.http_checker.check_website_accessibility(domain)
-        ssl_check = await self.http_checker.check_ssl_certificate(domain)
+    async def _perform_http_checks(self, domain: str, check_ssl: bool = True) -> Dict[str, Any]:
+        # One HTTPS request answers both questions: the certificate comes off its own handshake
+        website_check = await self.http_checker.check_website_accessibility(domain, read_certificate=check_ssl)
         
         return {
             'accessible': website_check['accessible'],
-            'has_ssl': ssl_check['has_ssl'] or website_check['has_ssl'],
+            'has_ssl': website_check['has_ssl'],
             'status_code': website_check['status_code'],
-            'ssl_valid': ssl_check['valid_ssl']
+            'ssl_valid': website_check['ssl_valid'],
+            'ssl_issuer': website_check['ssl_issuer'],
+            'ssl_expiry_date': website_check['ssl_expiry_date'],
+            'parked': website_check.get('parked', False)
         }
     
-    async def _classify_domain(self, domain: str, dns_results: Dict, http_results: Dict) -> DomainType:
+    async def _classify_domain(self, domain: str, dns_results: Dict, http_results: Optional[Dict]) -> DomainType:
         if not dns_results['domain_exists']:
             return DomainType.UNREACHABLE
             
-        # Check disposable domains first
-        if self.domain_lists.is_disposable_domain(domain):
-            return DomainType.DISPOSABLE
-            
-        # Check public providers
-        if self.domain_lists.is_public_provider(domain):
-            return DomainType.PUBLIC_PROVIDER
-            
-        # Check for educational domains
-        if self._is_educational_domain(domain):
-            return DomainType.EDUCATIONAL
+        # Disposable, public provider, educational and government in one suffix walk
+        category = self.domain_lists.match_category(domain)
+        if category:
+            return LIST_CATEGORY_TYPES[category]
             
-        # Check for government domains
-        if self._is_government_domain(domain):
-            return DomainType.GOVERNMENT
+        # Unlisted domain receiving mail on a disposable service's MX hosts
+        mail_provider = self.mx_index.classify(dns_results.get('mx_servers'))
+        if mail_provider and mail_provider.category == 'disposable':
+            return DomainType.DISPOSABLE
             
         # Check for suspicious indicators
         if self._is_suspicious_domain(domain, dns_results, http_results):
             return DomainType.SUSPICIOUS
             
-        # Default to corporate if has proper infrastructure
-        if dns_results['has_mx'] and http_results['accessible']:
+        # Default to corporate if has proper infrastructure; without a website probe MX is enough,
+        # and mail on a major platform stands in for a website
+        hosted_mail = mail_provider is not None and mail_provider.category in CORPORATE_MAIL_CATEGORIES
+        if dns_results['has_mx'] and (http_results is None or http_results['accessible'] or hosted_mail):
             return DomainType.CORPORATE
             
         return DomainType.SUSPICIOUS
     
-    def _is_educational_domain(self, domain: str) -> bool:
-        edu_tlds = ['.edu', '.ac.uk', '.edu.au', '.ac.jp', '.ac.za', '.edu.sg']
-        return any(domain.endswith(tld) for tld in edu_tlds)
-    
-    def _is_government_domain(self, domain: str) -> bool:
-        gov_tlds = ['.gov', '.gov.uk', '.gov.au', '.gov.ca', '.gouv.fr', '.gob.es']
-        return any(domain.endswith(tld) for tld in gov_tlds)
-    
-    def _is_suspicious_domain(self, domain: str, dns_results: Dict, http_results: Dict) -> bool:
+    def _has_suspicious_name(self, domain: str) -> bool:
         # Check for suspicious patterns
         suspicious_patterns = [
             'temp', 'fake', 'test', 'spam', 'trash', 'disposable',
@@ -135,11 +525,18 @@ class DomainValidator:
         
         # Check for very new domains or unusual TLDs
         suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.top', '.click', '.download']
-        if any(domain.endswith(tld) for tld in suspicious_tlds):
+        return any(domain.endswith(tld) for tld in suspicious_tlds)
+    
+    def _is_suspicious_domain(self, domain: str, dns_results: Dict, http_results: Dict) -> bool:
+        if self._has_suspicious_name(domain):
             return True
             
         # No MX records but trying to be an email service
-        if not dns_results['has_mx'] and 'mail' in domain_lower:
+        if not dns_results['has_mx'] and 'mail' in domain.lower():
+            return True
+        
+        # A parking page: registered, but nobody runs anything there
+        if http_results and http_results.get('parked'):
             return True
             
         return False
@@ -147,6 +544,9 @@ class DomainValidator:
     def _determine_validation_status(self, dns_results: Dict, http_results: Dict) -> ValidationStatus:
         if not dns_results['domain_exists']:
             return ValidationStatus.INVALID
+        
+        if http_results.get('parked'):
+            return ValidationStatus.SUSPICIOUS
             
         if dns_results['has_mx'] and dns_results['has_a']:
             return ValidationStatus.VALID
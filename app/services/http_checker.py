@@ -2,72 +2,221 @@ import aiohttp
 import ssl
 import socket
 import asyncio
-from typing import Optional, Dict, Any
-from urllib.parse import urlparse
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
+from aiohttp.abc import AbstractResolver
+from app.core.config import settings
+from app.services.probe_cache import ProbeOutcomeCache, is_parking_response, response_fingerprint
+from app.services.probe_scheduler import ProbeScheduler
+
+# Servers that refuse HEAD get the ranged GET instead
+HEAD_FALLBACK_STATUSES = (405, 501)
+# Answers to our Range header stand for the page's own 200
+RANGED_STATUSES = {206: 200, 416: 200}
+
+class _CertificateResponse(aiohttp.ClientResponse):
+    """Keeps the peer certificate of the TLS connection the response arrived on"""
+    
+    peer_certificate: Optional[Dict[str, Any]] = None
+    
+    async def start(self, connection):
+        # Small bodies hand the connection back to the pool before the caller sees the response
+        transport = connection.transport
+        ssl_object = transport.get_extra_info('ssl_object') if transport else None
+        if ssl_object is not None:
+            self.peer_certificate = ssl_object.getpeercert()
+        return await super().start(connection)
 
 class HTTPChecker:
-    def __init__(self, timeout: int = 10):
+    """
+    Website probes over one long-lived ClientSession: a single connector
+    (connection limits, keep-alive, aiohttp's DNS cache) and one set of TLS
+    contexts shared by every probe. The session opens on first use and is
+    closed by close(); whoever owns the checker owns its lifecycle.
+    """
+    
+    def __init__(self, timeout: int = 10, connection_limit: Optional[int] = None,
+                 per_host_limit: Optional[int] = None, resolver: Optional[AbstractResolver] = None,
+                 ssl_context: Optional[ssl.SSLContext] = None, probe_mode: Optional[str] = None,
+                 scheduler: Optional[ProbeScheduler] = None, probe_cache: Optional[ProbeOutcomeCache] = None):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.connection_limit = settings.http_connection_limit if connection_limit is None else connection_limit
+        self.per_host_limit = settings.http_per_host_limit if per_host_limit is None else per_host_limit
+        self.resolver = resolver
+        self.ssl_context = ssl_context  # None: aiohttp's default verified context
+        self.probe_mode = probe_mode or settings.http_probe_mode  # 'head': HEAD, then ranged GET; 'get': ranged GET
+        self.max_redirects = settings.http_max_redirects
+        self.max_bytes = settings.http_probe_max_bytes
+        self.scheme_stagger = settings.http_scheme_stagger
+        self.scheduler = scheduler or ProbeScheduler(settings.http_probe_max_in_flight, settings.http_probe_max_per_ip)
+        self.probe_cache = probe_cache or ProbeOutcomeCache(settings.http_parking_ttl, settings.http_parking_min_domains)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._probes = 0
+        self._head_fallbacks = 0
+        self._https_wins = 0
+        self._http_wins = 0
+        self._bytes_downloaded = 0
+        self._max_probe_bytes = 0
+    
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.per_host_limit,
+                use_dns_cache=True,
+                ttl_dns_cache=settings.http_dns_cache_ttl,
+                keepalive_timeout=settings.http_keepalive_timeout,
+                resolver=self.resolver,
+                ssl=self.ssl_context
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, response_class=_CertificateResponse
+            )
+        return self._session
+    
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
         
-    async def check_website_accessibility(self, domain: str) -> Dict[str, Any]:
+    async def check_website_accessibility(self, domain: str, read_certificate: bool = False) -> Dict[str, Any]:
         results = {
             'accessible': False,
             'has_ssl': False,
             'status_code': None,
             'redirects': 0,
-            'final_url': None
+            'final_url': None,
+            'ssl_valid': False,
+            'ssl_issuer': None,
+            'ssl_expiry_date': None,
+            'bytes_downloaded': 0,
+            'parked': False
         }
         
-        urls_to_try = [f"https://{domain}", f"http://{domain}"]
+        destination = await self._destination(domain)
+        shared = self.probe_cache.parking_outcome(destination, domain)
+        if shared is not None:
+            # A known parking host serves every domain on it the same page
+            return shared
         
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            for url in urls_to_try:
-                try:
-                    async with session.get(url, allow_redirects=True) as response:
-                        results['accessible'] = True
-                        results['status_code'] = response.status
-                        results['final_url'] = str(response.url)
-                        results['has_ssl'] = str(response.url).startswith('https://')
-                        results['redirects'] = len(response.history)
-                        return results
-                except aiohttp.ClientError:
-                    continue
-                except asyncio.TimeoutError:
-                    continue
-                    
-        return results
+        # Admission per resolved IP: domains parked on one host queue behind each other
+        async with self.scheduler.slot(destination):
+            # Happy-eyeballs style: https:// gets a head start, http:// joins after the stagger
+            # (or at once if https:// fails first); https:// wins whenever it answers
+            https = asyncio.create_task(self._attempt(f"https://{domain}", results))
+            http: Optional[asyncio.Task] = None
+            try:
+                await asyncio.wait({https}, timeout=self.scheme_stagger)
+                if not (https.done() and https.result()):
+                    http = asyncio.create_task(self._attempt(f"http://{domain}", results))
+                
+                outcome = await https
+                if outcome:
+                    self._https_wins += 1
+                elif http is not None:
+                    outcome = await http
+                    self._http_wins += bool(outcome)
+                if not outcome:
+                    return results
+                
+                response, redirects = outcome
+                results['accessible'] = True
+                results['status_code'] = RANGED_STATUSES.get(response.status, response.status)
+                results['final_url'] = str(response.url)
+                results['has_ssl'] = str(response.url).startswith('https://')
+                results['redirects'] = redirects
+                results['parked'] = is_parking_response(response)
+                if read_certificate and results['has_ssl']:
+                    results.update(self._certificate_info(response))
+                if results['parked']:
+                    self.probe_cache.record(destination, response_fingerprint(response, domain), domain, results)
+                return results
+            finally:
+                for task in (https, http):
+                    if task is not None and not task.done():
+                        task.cancel()
+                self._record_probe(results['bytes_downloaded'])
     
-    async def check_ssl_certificate(self, domain: str) -> Dict[str, Any]:
-        ssl_info = {
-            'has_ssl': False,
-            'valid_ssl': False,
-            'issuer': None,
-            'expiry_date': None
-        }
-        
+    async def _destination(self, domain: str) -> str:
+        # Without a resolver of our own, aiohttp resolves on its own and the host name has to do
+        if self.resolver is None:
+            return domain
         try:
-            context = ssl.create_default_context()
-            
-            loop = asyncio.get_event_loop()
-            
-            def get_ssl_info():
-                try:
-                    with socket.create_connection((domain, 443), timeout=5) as sock:
-                        with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                            cert = ssock.getpeercert()
-                            return cert
-                except Exception:
-                    return None
-            
-            cert = await loop.run_in_executor(None, get_ssl_info)
-            
-            if cert:
-                ssl_info['has_ssl'] = True
-                ssl_info['valid_ssl'] = True
-                ssl_info['issuer'] = cert.get('issuer', [{}])[0].get('organizationName', 'Unknown')
-                ssl_info['expiry_date'] = cert.get('notAfter')
-                
-        except Exception:
+            hosts = await self.resolver.resolve(domain, 443, socket.AF_UNSPEC)
+        except OSError:
+            return domain
+        return hosts[0]['host'] if hosts else domain
+    
+    async def _attempt(self, url: str, results: Dict[str, Any]) -> Optional[Tuple[aiohttp.ClientResponse, int]]:
+        """The answering response and its redirect count, or None when the scheme is unreachable"""
+        try:
+            response = await self._probe(url, results)
+            return response, len(response.history)
+        except aiohttp.TooManyRedirects as e:
+            # A server that never settles is still a server answering
+            results['bytes_downloaded'] += sum(self._body_bytes(hop) for hop in e.history)
+            return e.history[-1], len(e.history)
+        except aiohttp.ClientError:
+            return None
+        except asyncio.TimeoutError:
+            return None
+    
+    async def _probe(self, url: str, results: Dict[str, Any]) -> aiohttp.ClientResponse:
+        # Leaving the block right after the headers releases the connection; an unread body
+        # closes it instead of being drained
+        session = self.session
+        if self.probe_mode == 'head':
+            async with session.head(url, allow_redirects=True, max_redirects=self.max_redirects) as response:
+                pass
+            results['bytes_downloaded'] += self._body_bytes(response)
+            if response.status not in HEAD_FALLBACK_STATUSES:
+                return response
+            self._head_fallbacks += 1
+        
+        headers = {'Range': f'bytes=0-{self.max_bytes - 1}'}
+        async with session.get(url, allow_redirects=True, max_redirects=self.max_redirects,
+                               headers=headers, read_bufsize=self.max_bytes) as response:
             pass
-            
-        return ssl_info
\ No newline at end of file
+        results['bytes_downloaded'] += sum(self._body_bytes(hop) for hop in (*response.history, response))
+        return response
+    
+    @staticmethod
+    def _body_bytes(response: aiohttp.ClientResponse) -> int:
+        # Bytes of body that reached the client before the connection was let go
+        return getattr(response.content, 'total_bytes', 0)
+    
+    def _record_probe(self, downloaded: int):
+        self._probes += 1
+        self._bytes_downloaded += downloaded
+        self._max_probe_bytes = max(self._max_probe_bytes, downloaded)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'probes': self._probes,
+            'head_fallbacks': self._head_fallbacks,
+            'https_wins': self._https_wins,
+            'http_wins': self._http_wins,
+            'bytes_downloaded': self._bytes_downloaded,
+            'mean_bytes_per_probe': self._bytes_downloaded / self._probes if self._probes else 0.0,
+            'max_bytes_per_probe': self._max_probe_bytes,
+            'scheduler': self.scheduler.stats(),
+            'parking': self.probe_cache.stats()
+        }
+    
+    @staticmethod
+    def _certificate_info(response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        # The handshake of the request itself already verified the chain and the dates
+        cert = getattr(response, 'peer_certificate', None)
+        if not cert:
+            return {}
+        
+        issuer = dict(pair for rdn in cert.get('issuer', ()) for pair in rdn)
+        expiry_date = None
+        if cert.get('notAfter'):
+            expiry_date = datetime.fromtimestamp(ssl.cert_time_to_seconds(cert['notAfter']), tz=timezone.utc)
+        return {
+            'ssl_valid': expiry_date is None or expiry_date > datetime.now(timezone.utc),
+            'ssl_issuer': issuer.get('organizationName') or issuer.get('commonName', 'Unknown'),
+            'ssl_expiry_date': expiry_date
+        }
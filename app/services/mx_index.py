@@ -0,0 +1,133 @@
+import logging
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+from app.services.domain_snapshot import CompactDomainSet
+from app.services.public_suffix import get_public_suffix_list, normalize_domain
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class MailProvider:
+    name: str
+    category: str  # hosted, gateway, hosting, forwarding or disposable
+
+# Organisations pay for hosted suites and inbound security gateways, so either one says
+# "real business" about as well as a website does
+CORPORATE_MAIL_CATEGORIES = ('hosted', 'gateway')
+
+# MX host suffix -> provider
+MAIL_PROVIDERS = {
+    'google.com': MailProvider('google_workspace', 'hosted'),
+    'googlemail.com': MailProvider('google_workspace', 'hosted'),
+    'outlook.com': MailProvider('microsoft_365', 'hosted'),
+    'zoho.com': MailProvider('zoho_mail', 'hosted'),
+    'zoho.eu': MailProvider('zoho_mail', 'hosted'),
+    'messagingengine.com': MailProvider('fastmail', 'hosted'),
+    'protonmail.ch': MailProvider('proton_mail', 'hosted'),
+    'icloud.com': MailProvider('icloud_mail', 'hosted'),
+    'emailsrvr.com': MailProvider('rackspace_email', 'hosted'),
+    'yandex.net': MailProvider('yandex_360', 'hosted'),
+    'pphosted.com': MailProvider('proofpoint', 'gateway'),
+    'ppe-hosted.com': MailProvider('proofpoint', 'gateway'),
+    'mimecast.com': MailProvider('mimecast', 'gateway'),
+    'barracudanetworks.com': MailProvider('barracuda', 'gateway'),
+    'iphmx.com': MailProvider('cisco_secure_email', 'gateway'),
+    'trendmicro.com': MailProvider('trend_micro', 'gateway'),
+    'secureserver.net': MailProvider('godaddy', 'hosting'),
+    'ovh.net': MailProvider('ovh', 'hosting'),
+    'hostinger.com': MailProvider('hostinger', 'hosting'),
+    'titan.email': MailProvider('titan', 'hosting'),
+    'amazonaws.com': MailProvider('amazon_ses', 'hosting'),
+    # Forwarding services and registrars' free forwarders relay for any domain, disposable ones included
+    'mx.cloudflare.net': MailProvider('cloudflare_email_routing', 'forwarding'),
+    'improvmx.com': MailProvider('improvmx', 'forwarding'),
+    'registrar-servers.com': MailProvider('namecheap_forwarding', 'forwarding'),
+    'porkbun.com': MailProvider('porkbun_forwarding', 'forwarding'),
+    'forwardemail.net': MailProvider('forward_email', 'forwarding'),
+    'gandi.net': MailProvider('gandi', 'forwarding'),
+    'mailgun.org': MailProvider('mailgun', 'forwarding'),
+}
+
+# A host outside the listed domains themselves has to serve this many of them before it counts
+# as a disposable service's MX: shared infrastructure the table above misses serves a handful
+DISPOSABLE_MX_MIN_DOMAINS = 25
+
+def _sample(domains: Iterable[str], limit: int) -> List[str]:
+    """Up to limit domains drawn uniformly from the whole list in one pass (reservoir sampling)"""
+    sample: List[str] = []
+    for seen, domain in enumerate(domains):
+        if seen < limit:
+            sample.append(domain)
+        else:
+            slot = random.randint(0, seen)
+            if slot < limit:
+                sample[slot] = domain
+    return sample
+
+class MXProviderIndex:
+    """
+    Maps MX hosts to the provider behind them: curated suffixes for the big
+    mail platforms, plus exact hosts learned by resolving the MX records of
+    the disposable lists.
+    """
+
+    def __init__(self, providers: Optional[Dict[str, MailProvider]] = None):
+        self._suffixes: Dict[str, MailProvider] = dict(MAIL_PROVIDERS if providers is None else providers)
+        self._hosts: Dict[str, MailProvider] = {}
+
+    def _match_suffix(self, host: str) -> Optional[MailProvider]:
+        labels = host.split('.')
+        # Most specific suffix first; a bare TLD never matches
+        for i in range(len(labels) - 1):
+            provider = self._suffixes.get('.'.join(labels[i:]))
+            if provider is not None:
+                return provider
+        return None
+
+    def match(self, mx_host: str) -> Optional[MailProvider]:
+        host = normalize_domain(mx_host)
+        if not host:
+            return None
+        return self._hosts.get(host) or self._match_suffix(host)
+
+    def classify(self, mx_servers: Iterable[str]) -> Optional[MailProvider]:
+        """Provider for a domain's MX set; a disposable service's host outweighs any other"""
+        found = None
+        for mx_host in mx_servers or ():
+            provider = self.match(mx_host)
+            if provider is not None and provider.category == 'disposable':
+                return provider
+            found = found or provider
+        return found
+
+    @property
+    def learned_hosts(self) -> int:
+        return len(self._hosts)
+
+    async def learn_disposable(self, dns_checker, domains: Iterable[str], limit: int = 0) -> int:
+        """
+        Resolve the MX records of listed disposable domains and index the
+        hosts that belong to a listed domain (mx.mailinator.com) or are
+        dedicated to the list, serving DISPOSABLE_MX_MIN_DOMAINS of it.
+        """
+        # The lists' own sets answer membership without copying them onto the heap
+        listed = domains if isinstance(domains, (set, frozenset, CompactDomainSet)) else frozenset(domains)
+        queried = _sample(listed, limit) if limit else listed
+        serving: Dict[str, Set[str]] = {}
+        async for name, _, answer in dns_checker.resolve_many((domain, 'MX') for domain in queried):
+            for mx_host in answer.records:
+                host = normalize_domain(mx_host)
+                # Curated platforms host plenty of legitimate mail too, whatever else they serve
+                if host and self._match_suffix(host) is None:
+                    serving.setdefault(host, set()).add(name)
+
+        public_suffixes = get_public_suffix_list()
+        learned = {}
+        for host, names in serving.items():
+            registrable = public_suffixes.registrable_domain(host) or host
+            if registrable in listed or len(names) >= DISPOSABLE_MX_MIN_DOMAINS:
+                learned[host] = MailProvider(registrable, 'disposable')
+        self._hosts = learned
+        logger.info(f"Indexed {len(learned)} disposable MX hosts")
+        return len(learned)
@@ -0,0 +1,140 @@
+import ipaddress
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+
+# Parking services and domain marketplaces a parked domain redirects to
+PARKING_HOSTS = (
+    'sedoparking.com', 'sedo.com', 'parkingcrew.net', 'bodis.com', 'above.com', 'parklogic.com',
+    'dan.com', 'afternic.com', 'hugedomains.com', 'domainmarket.com', 'undeveloped.com'
+)
+# Ad-funded parking pages announce themselves to ad blockers
+PARKING_HEADERS = ('X-Adblock-Key',)
+# CDN edges front thousands of unrelated sites; two parked customers there say nothing about a third
+CDN_NETWORKS = tuple(ipaddress.ip_network(network) for network in (
+    # Cloudflare
+    '173.245.48.0/20', '103.21.244.0/22', '103.22.200.0/22', '103.31.4.0/22', '141.101.64.0/18',
+    '108.162.192.0/18', '190.93.240.0/20', '188.114.96.0/20', '197.234.240.0/22', '198.41.128.0/17',
+    '162.158.0.0/15', '104.16.0.0/13', '104.24.0.0/14', '172.64.0.0/13', '131.0.72.0/22',
+    '2400:cb00::/32', '2606:4700::/32', '2803:f800::/32', '2405:b500::/32', '2405:8100::/32',
+    '2a06:98c0::/29', '2c0f:f248::/32',
+    # Fastly
+    '151.101.0.0/16', '199.232.0.0/16', '2a04:4e40::/32'
+))
+
+def _host_matches(host: Optional[str], suffixes) -> bool:
+    host = (host or '').lower().rstrip('.')
+    return any(host == suffix or host.endswith('.' + suffix) for suffix in suffixes)
+
+def is_cdn_address(ip: str) -> bool:
+    """Whether ip is a CDN edge; host names (no resolver of our own) are not"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in CDN_NETWORKS)
+
+def is_parking_response(response: aiohttp.ClientResponse) -> bool:
+    """Whether a probe landed on a parking page: a redirect through a parking service or its marker header"""
+    for hop in (*response.history, response):
+        if _host_matches(hop.url.host, PARKING_HOSTS):
+            return True
+        if _host_matches(urlsplit(hop.headers.get('Location', '')).hostname, PARKING_HOSTS):
+            return True
+    return any(header in response.headers for header in PARKING_HEADERS)
+
+def response_fingerprint(response: aiohttp.ClientResponse, domain: str) -> Tuple:
+    """What a probe saw, with the probed domain taken out so one host's shared page looks the same for every domain"""
+    final_url = re.sub(re.escape(domain), '{domain}', str(response.url), flags=re.IGNORECASE)
+    return (
+        response.status,
+        response.headers.get('Server'),
+        response.headers.get('Content-Type'),
+        response.headers.get('Content-Length'),
+        len(response.history),
+        final_url
+    )
+
+class ProbeOutcomeCache:
+    """
+    Short-lived memory of parking pages per resolved IP. Once min_domains
+    different domains on one IP have come back as the same parking page
+    (same response fingerprint), the IP counts as a parking host for ttl
+    seconds and further domains on it take that outcome without a probe.
+    One parked customer on a shared host never condemns the IP: its
+    neighbours would have to serve the very same page. CDN edges are never
+    shared at all, however many parked domains they front.
+    """
+
+    def __init__(self, ttl: float = 300, min_domains: int = 10, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.min_domains = min_domains
+        self.max_entries = max_entries
+        self.clock = clock
+        # (ip, fingerprint) -> (domains seen, outcome template, expires at)
+        self._sightings: "OrderedDict[Tuple[str, Tuple], Tuple[set[str], Dict[str, Any], float]]" = OrderedDict()
+        # ip -> (outcome template, expires at)
+        self._parking_hosts: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+
+    @staticmethod
+    def _template(results: Dict[str, Any], domain: str) -> Dict[str, Any]:
+        template = dict(results, ssl_valid=False, ssl_issuer=None, ssl_expiry_date=None, bytes_downloaded=0)
+        if template.get('final_url'):
+            template['final_url'] = re.sub(re.escape(domain), '{domain}', template['final_url'], flags=re.IGNORECASE)
+        return template
+
+    def _trim(self, entries: OrderedDict):
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def record(self, ip: str, fingerprint: Tuple, domain: str, results: Dict[str, Any]):
+        """Note a parked probe result for domain on ip"""
+        if self.ttl <= 0 or is_cdn_address(ip):
+            return
+        now = self.clock()
+        key = (ip, fingerprint)
+        sighting = self._sightings.get(key)
+        if sighting is None or sighting[2] <= now:
+            sighting = (set(), self._template(results, domain), now + self.ttl)
+        domains = sighting[0]
+        domains.add(domain.lower())
+        self._sightings[key] = sighting
+        self._sightings.move_to_end(key)
+        self._trim(self._sightings)
+
+        if len(domains) >= self.min_domains:
+            self._parking_hosts[ip] = (sighting[1], now + self.ttl)
+            self._parking_hosts.move_to_end(ip)
+            self._trim(self._parking_hosts)
+            del self._sightings[key]
+
+    def parking_outcome(self, ip: str, domain: str) -> Optional[Dict[str, Any]]:
+        """The shared outcome for a domain on a known parking host, or None"""
+        entry = self._parking_hosts.get(ip)
+        if entry is None:
+            return None
+        template, expires_at = entry
+        if expires_at <= self.clock():
+            del self._parking_hosts[ip]
+            return None
+        self.hits += 1
+        outcome = dict(template)
+        if outcome.get('final_url'):
+            outcome['final_url'] = outcome['final_url'].replace('{domain}', domain)
+        return outcome
+
+    def clear(self):
+        self._sightings.clear()
+        self._parking_hosts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'parking_hosts': len(self._parking_hosts),
+            'sightings': len(self._sightings),
+            'hits': self.hits
+        }
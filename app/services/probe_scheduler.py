@@ -0,0 +1,126 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+class ProbeScheduler:
+    """
+    Admission control for outbound website probes: at most max_in_flight
+    probes overall and max_per_destination against any one resolved IP.
+    Probes that have to wait queue per destination, and freed slots go
+    round-robin across the destinations with someone waiting, so a batch
+    of domains parked on one IP queues behind itself instead of starving
+    everyone else or hammering that host into rate limiting.
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_per_destination: int = 4):
+        self.max_in_flight = max_in_flight
+        self.max_per_destination = max_per_destination
+        self.in_flight = 0
+        self._active: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        # Destinations with waiters, in turn order
+        self._rotation: Deque[str] = deque()
+        self.granted = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+
+    def _can_start(self, destination: str) -> bool:
+        return self.in_flight < self.max_in_flight and \
+            self._active.get(destination, 0) < self.max_per_destination
+
+    def _start(self, destination: str):
+        self.in_flight += 1
+        self._active[destination] = self._active.get(destination, 0) + 1
+        self.granted += 1
+
+    async def acquire(self, destination: str):
+        if destination not in self._queues and self._can_start(destination):
+            self._start(destination)
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        queue = self._queues.setdefault(destination, deque())
+        if not queue:
+            self._rotation.append(destination)
+        queue.append(waiter)
+        self.queue_depth += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        queued_at = loop.time()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before the cancellation landed: pass the slot on
+                self.release(destination)
+            else:
+                self._forget(destination, waiter)
+            raise
+
+        wait = loop.time() - queued_at
+        self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _forget(self, destination: str, waiter: asyncio.Future):
+        queue = self._queues.get(destination)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queue_depth -= 1
+        if not queue:
+            del self._queues[destination]
+            self._rotation.remove(destination)
+
+    def release(self, destination: str):
+        self.in_flight -= 1
+        active = self._active[destination] - 1
+        if active:
+            self._active[destination] = active
+        else:
+            del self._active[destination]
+        self._dispatch()
+
+    def _dispatch(self):
+        # One slot per destination per turn; destinations at their own cap keep their place
+        passed = 0
+        while self.in_flight < self.max_in_flight and passed < len(self._rotation):
+            destination = self._rotation.popleft()
+            if not self._can_start(destination):
+                self._rotation.append(destination)
+                passed += 1
+                continue
+            queue = self._queues[destination]
+            waiter = queue.popleft()
+            self.queue_depth -= 1
+            self._start(destination)
+            waiter.set_result(None)
+            passed = 0
+            if queue:
+                self._rotation.append(destination)
+            else:
+                del self._queues[destination]
+
+    @asynccontextmanager
+    async def slot(self, destination: str):
+        await self.acquire(destination)
+        try:
+            yield
+        finally:
+            self.release(destination)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'destinations': len(self._active),
+            'queue_depth': self.queue_depth,
+            'peak_queue_depth': self.peak_queue_depth,
+            'granted': self.granted,
+            'waited': self.waited,
+            'mean_wait_ms': self.total_wait / self.waited * 1000 if self.waited else 0.0,
+            'max_wait_ms': self.max_wait * 1000
+        }
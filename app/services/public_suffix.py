@@ -0,0 +1,101 @@
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+DEFAULT_PSL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "public_suffix_list.dat")
+
+_RULE = "$"
+_EXCEPTION = "!"
+_WILDCARD = "*"
+_PRIVATE = "#"
+
+
+def _to_ascii(label: str) -> str:
+    if label.isascii():
+        return label
+    try:
+        return label.encode('idna').decode('ascii')
+    except UnicodeError:
+        return label
+
+
+class PublicSuffixList:
+    """
+    Public Suffix List compiled into a reversed-label trie, with an LRU of
+    recent answers in front. Wildcard (*.x) and exception (!y.x) rules are
+    applied as described at https://publicsuffix.org/list/.
+    """
+    
+    def __init__(self, path: str = DEFAULT_PSL_PATH, cache_size: int = 65536):
+        self._root: Dict = {}
+        self.rule_count = 0
+        # Rules below this marker are submitted by companies (github.io, ac.ru), not run by a registry
+        private = False
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                rule = line.split(None, 1)[0] if line.strip() else ""
+                if '===BEGIN PRIVATE DOMAINS===' in line:
+                    private = True
+                elif rule and not rule.startswith('//'):
+                    self._add_rule(rule.lower(), private)
+        self.split = lru_cache(maxsize=cache_size)(self._split)
+    
+    def _add_rule(self, rule: str, private: bool = False):
+        exception = rule.startswith('!')
+        node = self._root
+        for label in reversed(rule.lstrip('!').split('.')):
+            node = node.setdefault(_to_ascii(label), {})
+        node[_EXCEPTION if exception else _RULE] = True
+        if private:
+            node[_PRIVATE] = True
+        self.rule_count += 1
+    
+    def _suffix_label_count(self, labels) -> int:
+        # The implicit "*" rule makes an unknown TLD a public suffix on its own
+        count = 1
+        node = self._root
+        for depth, label in enumerate(reversed(labels)):
+            child = node.get(label)
+            if child is not None and _EXCEPTION in child:
+                return depth
+            wildcard = node.get(_WILDCARD)
+            if (child is not None and _RULE in child) or (wildcard is not None and _RULE in wildcard):
+                count = depth + 1
+            node = child if child is not None else wildcard
+            if node is None:
+                break
+        return count
+    
+    def _split(self, domain: str) -> Tuple[str, Optional[str]]:
+        labels = domain.split('.')
+        count = self._suffix_label_count(labels)
+        public_suffix = '.'.join(labels[-count:])
+        if len(labels) <= count:
+            return public_suffix, None
+        return public_suffix, '.'.join(labels[-count - 1:])
+    
+    def public_suffix(self, domain: str) -> str:
+        return self.split(normalize_domain(domain))[0]
+    
+    def registrable_domain(self, domain: str) -> Optional[str]:
+        """The public suffix plus one label, or None when the domain is itself a public suffix"""
+        return self.split(normalize_domain(domain))[1]
+    
+    def is_private(self, public_suffix: str) -> bool:
+        """Whether the public suffix comes from the list's private section rather than the ICANN one"""
+        node = self._root
+        for label in reversed(public_suffix.split('.')):
+            node = node.get(label, node.get(_WILDCARD))
+            if node is None:
+                return False
+        return _PRIVATE in node
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().lower().rstrip('.')
+
+
+@lru_cache(maxsize=None)
+def get_public_suffix_list() -> PublicSuffixList:
+    return PublicSuffixList(settings.psl_path or DEFAULT_PSL_PATH, settings.psl_cache_size)
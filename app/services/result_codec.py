@@ -0,0 +1,214 @@
+import calendar
+import json
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from app.models.schemas import (
+    DomainValidationResponse, DomainMetadata, DomainType, ValidationStatus,
+    Recommendation, ValidationProfile
+)
+
+# Cache entries written before this codec are JSON objects; nothing encoded here starts with "{".
+# Version 2 added the soft expiry to the header
+CODEC_VERSION = 2
+
+# Position in each table is the wire value: append only, never reorder
+DOMAIN_TYPES = (
+    DomainType.CORPORATE, DomainType.PUBLIC_PROVIDER, DomainType.DISPOSABLE, DomainType.EDUCATIONAL,
+    DomainType.GOVERNMENT, DomainType.UNREACHABLE, DomainType.SUSPICIOUS
+)
+VALIDATION_STATUSES = (
+    ValidationStatus.VALID, ValidationStatus.INVALID, ValidationStatus.SUSPICIOUS, ValidationStatus.UNKNOWN
+)
+RECOMMENDATIONS = (Recommendation.ACCEPT, Recommendation.REJECT, Recommendation.MANUAL_REVIEW)
+PROFILES = (ValidationProfile.FAST, ValidationProfile.STANDARD, ValidationProfile.FULL)
+# Validator stages in pipeline order, one bit each
+STAGES = ('normalize', 'overrides', 'lists', 'cache', 'dns', 'http')
+
+# Flag bits
+HAS_MX, HAS_A, WEBSITE, SSL, PARKED, PARTIAL, MX_COMPRESSED = (1 << bit for bit in range(7))
+FLAG_FIELDS = (
+    (HAS_MX, 'has_mx_record'), (HAS_A, 'has_a_record'), (WEBSITE, 'website_accessible'),
+    (SSL, 'has_ssl_certificate'), (PARKED, 'parked')
+)
+
+# version, flags, domain type, status, recommendation, profile, stages, score in hundredths, checked_at,
+# then from version 2 on the soft expiry (0: none)
+HEADER_V1 = struct.Struct('!BBBBBBBHI')
+HEADER = struct.Struct('!BBBBBBBHII')
+STRING_LENGTH = struct.Struct('!H')
+TIMESTAMP = struct.Struct('!q')
+NONE_LENGTH = 0xFFFF
+NO_TIMESTAMP = -(1 << 63)
+
+# MX lists shorter than this do not shrink under zlib
+MX_COMPRESS_MIN_BYTES = 96
+
+# Optional strings after the header, in wire order
+STRING_FIELDS = ('dns_status', 'mail_provider', 'ssl_issuer', 'whois_registrar', 'whois_country')
+
+def _epoch(value: datetime) -> int:
+    # Naive datetimes are UTC throughout the validator
+    return calendar.timegm(value.utctimetuple())
+
+def _pack_bytes(out: List[bytes], data: Optional[bytes]):
+    if data is None:
+        out.append(STRING_LENGTH.pack(NONE_LENGTH))
+        return
+    out.append(STRING_LENGTH.pack(len(data)))
+    out.append(data)
+
+def _pack_string(out: List[bytes], value: Optional[str]):
+    _pack_bytes(out, None if value is None else value.encode('utf-8'))
+
+def _pack_timestamp(out: List[bytes], value: Optional[datetime]):
+    out.append(TIMESTAMP.pack(NO_TIMESTAMP if value is None else _epoch(value)))
+
+def encode_result(
+    result: DomainValidationResponse, compress_mx: bool = True, fresh_until: Optional[int] = None
+) -> bytes:
+    """
+    Versioned binary form of a validation result for the cache: enums and
+    stages as small ints, timestamps as epoch seconds, the score in
+    hundredths and, for long MX lists, zlib over the joined host names.
+    fresh_until is the epoch second after which the entry is stale.
+    """
+    metadata = result.metadata
+    flags = 0
+    for bit, name in FLAG_FIELDS:
+        if getattr(metadata, name):
+            flags |= bit
+    if result.partial:
+        flags |= PARTIAL
+    stages = 0
+    for stage in result.stages:
+        stages |= 1 << STAGES.index(stage)
+
+    mx_payload = None
+    if metadata.mx_servers is not None:
+        mx_payload = '\n'.join(metadata.mx_servers).encode('utf-8')
+        if compress_mx and len(mx_payload) >= MX_COMPRESS_MIN_BYTES:
+            compressed = zlib.compress(mx_payload)
+            if len(compressed) < len(mx_payload):
+                mx_payload = compressed
+                flags |= MX_COMPRESSED
+
+    out = [HEADER.pack(
+        CODEC_VERSION, flags,
+        DOMAIN_TYPES.index(result.domain_type), VALIDATION_STATUSES.index(result.validation_status),
+        RECOMMENDATIONS.index(result.recommendation), PROFILES.index(result.profile), stages,
+        round(result.quality_score * 100), _epoch(result.checked_at), fresh_until or 0
+    )]
+    _pack_string(out, result.domain)
+    _pack_string(out, result.registrable_domain)
+    for name in STRING_FIELDS:
+        _pack_string(out, getattr(metadata, name))
+    _pack_timestamp(out, metadata.ssl_expiry_date)
+    _pack_timestamp(out, metadata.whois_creation_date)
+    _pack_bytes(out, mx_payload)
+    return b''.join(out)
+
+class _Reader:
+    def __init__(self, data: bytes, offset: int):
+        self.data = data
+        self.offset = offset
+
+    def bytes(self) -> Optional[bytes]:
+        (length,) = STRING_LENGTH.unpack_from(self.data, self.offset)
+        self.offset += STRING_LENGTH.size
+        if length == NONE_LENGTH:
+            return None
+        value = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return value
+
+    def string(self) -> Optional[str]:
+        value = self.bytes()
+        return None if value is None else value.decode('utf-8')
+
+    def timestamp(self, aware: bool = False) -> Optional[datetime]:
+        (value,) = TIMESTAMP.unpack_from(self.data, self.offset)
+        self.offset += TIMESTAMP.size
+        if value == NO_TIMESTAMP:
+            return None
+        moment = datetime.fromtimestamp(value, tz=timezone.utc)
+        return moment if aware else moment.replace(tzinfo=None)
+
+def _construct(model, fields: dict):
+    # model_construct without its per-field default handling, which costs more than
+    # validating: every field is given here
+    instance = model.__new__(model)
+    object.__setattr__(instance, '__dict__', fields)
+    object.__setattr__(instance, '__pydantic_fields_set__', set(fields))
+    object.__setattr__(instance, '__pydantic_extra__', None)
+    object.__setattr__(instance, '__pydantic_private__', None)
+    return instance
+
+def decode_result(data: bytes) -> DomainValidationResponse:
+    return decode_entry(data)[0]
+
+def decode_entry(data: bytes) -> Tuple[DomainValidationResponse, Optional[int]]:
+    """
+    Inverse of encode_result: the result and its soft expiry, if any. Cache
+    data is trusted, so the models are built without validation; JSON
+    entries from before the codec take the validating path.
+    """
+    if data[:1] == b'{':
+        return DomainValidationResponse(**json.loads(data)), None
+    version = data[0]
+    if version == CODEC_VERSION:
+        header = HEADER
+        _, flags, domain_type, status, recommendation, profile, stages, score, checked_at, fresh_until = \
+            header.unpack_from(data)
+    elif version == 1:
+        header, fresh_until = HEADER_V1, 0
+        _, flags, domain_type, status, recommendation, profile, stages, score, checked_at = \
+            header.unpack_from(data)
+    else:
+        raise ValueError(f"Unsupported cache entry version {version}")
+
+    reader = _Reader(data, header.size)
+    domain = reader.string()
+    registrable_domain = reader.string()
+    dns_status, mail_provider, ssl_issuer, whois_registrar, whois_country = \
+        (reader.string() for _ in STRING_FIELDS)
+    # The certificate's expiry comes from the probe as an aware UTC datetime
+    ssl_expiry_date = reader.timestamp(aware=True)
+    whois_creation_date = reader.timestamp()
+    mx_servers = reader.bytes()
+    if mx_servers is not None:
+        if flags & MX_COMPRESSED:
+            mx_servers = zlib.decompress(mx_servers)
+        mx_servers = mx_servers.decode('utf-8').split('\n') if mx_servers else []
+
+    # Declaration order: serialization follows it
+    metadata = _construct(DomainMetadata, {
+        'has_mx_record': bool(flags & HAS_MX),
+        'has_a_record': bool(flags & HAS_A),
+        'mx_servers': mx_servers,
+        'dns_status': dns_status,
+        'mail_provider': mail_provider,
+        'website_accessible': bool(flags & WEBSITE),
+        'has_ssl_certificate': bool(flags & SSL),
+        'ssl_issuer': ssl_issuer,
+        'ssl_expiry_date': ssl_expiry_date,
+        'parked': bool(flags & PARKED),
+        'whois_registrar': whois_registrar,
+        'whois_creation_date': whois_creation_date,
+        'whois_country': whois_country
+    })
+    return _construct(DomainValidationResponse, {
+        'domain': domain,
+        'registrable_domain': registrable_domain,
+        'domain_type': DOMAIN_TYPES[domain_type],
+        'validation_status': VALIDATION_STATUSES[status],
+        'quality_score': score / 100,
+        'recommendation': RECOMMENDATIONS[recommendation],
+        'metadata': metadata,
+        'stages': [stage for bit, stage in enumerate(STAGES) if stages & (1 << bit)],
+        'profile': PROFILES[profile],
+        'partial': bool(flags & PARTIAL),
+        'stale': False,
+        'checked_at': datetime.utcfromtimestamp(checked_at)
+    }), fresh_until or None
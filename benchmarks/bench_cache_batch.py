@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Redis round trips and wall time for one /validate-batch request of 1,000
+domains, most of them already cached, against an in-memory Redis stand-in
+that sleeps for a fixed round-trip time on every command. The rest are dead
+(NXDOMAIN) names answered by a stub DNS server, so no website is probed.
+Before: validate_domain per domain, one MGET per lookup and one SETEX per new
+result. After: validate_many, one MGET for the whole batch up front and one
+pipelined SETEX at the end.
+
+The in-process L1 tier is switched off so every lookup reaches "Redis".
+
+Usage: python -m benchmarks.bench_cache_batch [--domains 1000] [--cached 0.9] [--rtt-ms 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.models.schemas import ValidationProfile
+from app.services.dns_checker import DNSChecker
+from app.services.domain_validator import DomainValidator
+from app.services.local_cache import LocalCache
+from tests.stub_servers import DNSServer
+
+
+class RoundTripRedis:
+    """Enough of redis.asyncio for CacheService, counting round trips"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.data = {}
+        self.round_trips = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+
+    async def mget(self, keys):
+        await self._round_trip()
+        return [self.data.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        await self._round_trip()
+        self.data[key] = value
+
+    def pipeline(self, transaction=True):
+        return RoundTripPipeline(self)
+
+
+class RoundTripPipeline:
+    def __init__(self, redis: RoundTripRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        await self.redis._round_trip()
+        self.redis.data.update(self.commands)
+        return [True] * len(self.commands)
+
+
+async def run(label, redis, validator, snapshot, batch):
+    redis.data = dict(snapshot)
+    redis.round_trips = 0
+    validator.dns_checker.cache.clear()
+    start = time.perf_counter()
+    results = await batch()
+    elapsed = time.perf_counter() - start
+    print(f"{label:38s} {elapsed * 1000:8.1f} ms   {redis.round_trips:5d} Redis round trips   "
+          f"{len(results)} results")
+
+
+async def main(count: int, cached_share: float, rtt_ms: float):
+    server = DNSServer()
+    await server.start()
+    cached_count = int(count * cached_share)
+    domains = [f"known-{i}.test" if i < cached_count else f"tpyo-{i}.test" for i in range(count)]
+    profile = ValidationProfile.STANDARD
+
+    try:
+        validator = DomainValidator()
+        validator.dns_checker = DNSChecker(timeout=2, retries=0, nameservers=["127.0.0.1"], port=server.port)
+        redis = RoundTripRedis(rtt_ms / 1000)
+        cache_service = validator.cache_service
+        cache_service.local = LocalCache(0)
+        cache_service.redis_client = redis
+
+        # Populate the cache the way earlier requests would have: validate the known names as dead ones
+        await validator.validate_many(domains[:cached_count], profile=profile)
+        snapshot = dict(redis.data)
+
+        async def one_by_one():
+            return [await validator.validate_domain(domain, profile=profile) for domain in domains]
+
+        async def batched():
+            return await validator.validate_many(domains, profile=profile)
+
+        print(f"{count} domains, {cached_count} cached, {rtt_ms} ms per Redis round trip")
+        await run("before: validate_domain per domain", redis, validator, snapshot, one_by_one)
+        await run("after: validate_many", redis, validator, snapshot, batched)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--cached", type=float, default=0.9)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.domains, args.cached, args.rtt_ms))
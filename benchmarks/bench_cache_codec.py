@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Size and encode/decode cost of cached validation results: the previous JSON
+entries (model_dump + json.dumps, decoded with full Pydantic validation)
+against result_codec's binary entries (decoded without validation).
+
+Memory is projected to 1M entries from the bytes of keys and values. Redis
+adds its own per-key overhead on top (dict entry, object headers, expiry)
+that is the same for both; pass --redis-url to measure used_memory on a
+real server instead, which flushes the selected database.
+
+Usage: python -m benchmarks.bench_cache_codec [--entries 20000] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import (
+    DomainMetadata, DomainType, DomainValidationResponse, Recommendation,
+    ValidationProfile, ValidationStatus
+)
+from app.services.result_codec import decode_result, encode_result
+
+PROJECTED_ENTRIES = 1_000_000
+STAGES = ['normalize', 'overrides', 'lists', 'cache', 'dns', 'http']
+
+
+def make_results(count: int):
+    """A mix resembling real traffic: corporate sites, hosted mail, dead names"""
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    results = []
+    for i in range(count):
+        domain = f"company-{i}.example.com"
+        kind = rng.random()
+        if kind < 0.6:
+            metadata = DomainMetadata(
+                has_mx_record=True, has_a_record=True, dns_status='noerror',
+                mx_servers=[f"mx{n}.company-{i}.example.com" for n in range(rng.randint(1, 3))],
+                website_accessible=True, has_ssl_certificate=True, ssl_issuer="Let's Encrypt",
+                ssl_expiry_date=datetime.now(timezone.utc) + timedelta(days=rng.randint(1, 90))
+            )
+            result_type, status, stages = DomainType.CORPORATE, ValidationStatus.VALID, STAGES
+        elif kind < 0.85:
+            metadata = DomainMetadata(
+                has_mx_record=True, has_a_record=True, dns_status='noerror', mail_provider='microsoft_365',
+                mx_servers=[f"company-{i}-example-com.mail.protection.outlook.com"]
+            )
+            result_type, status, stages = DomainType.CORPORATE, ValidationStatus.VALID, STAGES[:5]
+        else:
+            metadata = DomainMetadata(dns_status='nxdomain')
+            result_type, status, stages = DomainType.UNREACHABLE, ValidationStatus.INVALID, STAGES[:5]
+        results.append(DomainValidationResponse(
+            domain=domain, registrable_domain=domain, domain_type=result_type, validation_status=status,
+            quality_score=round(rng.uniform(0, 10), 1), recommendation=Recommendation.ACCEPT,
+            metadata=metadata, stages=stages, profile=ValidationProfile.FULL, checked_at=now
+        ))
+    return results
+
+
+def json_encode(result):
+    return json.dumps(result.model_dump(mode='json'), default=str).encode()
+
+
+def json_decode(data):
+    return DomainValidationResponse(**json.loads(data))
+
+
+def timed(function, items):
+    # As timeit does: collections triggered by the kept outputs would dominate otherwise
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        output = [function(item) for item in items]
+        return output, (time.perf_counter() - start) / len(items) * 1_000_000
+    finally:
+        gc.enable()
+
+
+def redis_memory(redis_url, keys, values):
+    import redis
+    client = redis.Redis.from_url(redis_url)
+    client.flushdb()
+    before = client.info('memory')['used_memory']
+    pipe = client.pipeline(transaction=False)
+    for key, value in zip(keys, values):
+        pipe.setex(key, 3600, value)
+    pipe.execute()
+    used = client.info('memory')['used_memory'] - before
+    client.flushdb()
+    return used
+
+
+def main(count: int, redis_url):
+    results = make_results(count)
+    keys = [f"domain_validation:full:{result.registrable_domain}".encode() for result in results]
+    key_bytes = sum(len(key) for key in keys)
+
+    for label, encode, decode in (
+        ("json + validating decode", json_encode, json_decode),
+        ("result_codec", encode_result, decode_result),
+    ):
+        encoded, encode_us = timed(encode, results)
+        decoded, decode_us = timed(decode, encoded)
+        assert decoded[0].domain == results[0].domain
+        value_bytes = sum(len(value) for value in encoded)
+        projected = (key_bytes + value_bytes) / count * PROJECTED_ENTRIES / 2 ** 20
+        line = (f"{label:26s} {value_bytes / count:6.1f} B/value   keys+values per 1M {projected:7.1f} MiB   "
+                f"encode {encode_us:6.2f} us   decode {decode_us:6.2f} us")
+        if redis_url:
+            used = redis_memory(redis_url, keys, encoded)
+            line += f"   redis per 1M {used / count * PROJECTED_ENTRIES / 2 ** 20:7.1f} MiB"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+    main(args.entries, args.redis_url)
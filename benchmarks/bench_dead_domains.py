@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time spent per dead (NXDOMAIN) domain, one domain at a time against a local
+stub DNS server with a fixed answer delay. The old flow asked for MX, then A,
+and then went on to probe https://, http:// and port 443 regardless; the
+validator now stops at the first NXDOMAIN and remembers it for the SOA
+minimum.
+
+HTTP probes are counted, not timed: against a real dead name each one costs
+a resolver round trip at best and the full 10 s timeout at worst.
+
+Usage: python -m benchmarks.bench_dead_domains [--domains 200] [--delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.dns_cache import DNSCache
+from app.services.dns_checker import DNSChecker
+from app.services.domain_validator import DomainValidator
+from app.services.http_checker import HTTPChecker
+from tests.stub_servers import DNSServer
+
+# https://, http:// and the raw TLS connect on 443
+HTTP_PROBES_PER_DOMAIN = 3
+
+
+class CountingHTTPChecker(HTTPChecker):
+    def __init__(self):
+        super().__init__()
+        self.probes = 0
+
+    async def check_website_accessibility(self, domain, read_certificate=False):
+        self.probes += 2
+        return {'accessible': False, 'has_ssl': False, 'status_code': None, 'redirects': 0, 'final_url': None,
+                'ssl_valid': False, 'ssl_issuer': None, 'ssl_expiry_date': None}
+
+
+async def per_domain(coro_factory, domains):
+    timings = []
+    for domain in domains:
+        start = time.perf_counter()
+        await coro_factory(domain)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings, probes):
+    print(f"{label:34s} mean {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms   "
+          f"http probes {probes}")
+
+
+async def main(count: int, delay_ms: float):
+    server = DNSServer(delay=delay_ms / 1000)
+    await server.start()
+    domains = [f"tpyo-{i}.test" for i in range(count)]
+
+    try:
+        legacy = DNSChecker(timeout=2, retries=0, nameservers=["127.0.0.1"], port=server.port, cache=DNSCache(0))
+
+        async def legacy_flow(domain):
+            await legacy.check_mx_records(domain)
+            await legacy.check_a_records(domain)
+
+        timings = await per_domain(legacy_flow, domains)
+        report("before: MX, then A, then HTTP", timings, count * HTTP_PROBES_PER_DOMAIN)
+
+        validator = DomainValidator()
+        validator.dns_checker = DNSChecker(timeout=2, retries=0, nameservers=["127.0.0.1"], port=server.port)
+        validator.http_checker = CountingHTTPChecker()
+        server.queries.clear()
+        timings = await per_domain(validator.validate_domain, domains)
+        report("after: validator, first NXDOMAIN", timings, validator.http_checker.probes)
+        print(f"  {server.total_queries} DNS queries for {count} domains")
+
+        server.queries.clear()
+        timings = await per_domain(validator.validate_domain, domains)
+        report("after: same domains again", timings, validator.http_checker.probes)
+        print(f"  {server.total_queries} DNS queries for {count} domains")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--domains", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.domains, args.delay_ms))
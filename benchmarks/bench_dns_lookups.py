@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+1,000 concurrent domain lookups against a local stub DNS server that answers
+after a fixed delay: the old path (blocking dns.resolver calls on the default
+executor, MX then A) versus DNSChecker.lookup() on dns.asyncresolver with MX,
+A and AAAA in flight together, then the same lookups again from its answer
+cache.
+
+Usage: python -m benchmarks.bench_dns_lookups [--domains 1000] [--delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import dns.exception
+import dns.resolver
+
+from app.services.dns_checker import DNSChecker
+from tests.stub_servers import DNSServer
+
+
+def executor_resolver(port: int) -> dns.resolver.Resolver:
+    resolver = dns.resolver.Resolver(configure=False)
+    resolver.nameservers = ["127.0.0.1"]
+    resolver.port = port
+    return resolver
+
+
+async def executor_lookup(resolver: dns.resolver.Resolver, domain: str) -> bool:
+    def resolve(rdtype):
+        try:
+            return list(resolver.resolve(domain, rdtype))
+        except dns.exception.DNSException:
+            return []
+
+    loop = asyncio.get_event_loop()
+    mx = await loop.run_in_executor(None, resolve, "MX")
+    a = await loop.run_in_executor(None, resolve, "A")
+    return bool(mx or a)
+
+
+async def timed(coro_factory, domains):
+    latencies = []
+
+    async def one(domain):
+        start = time.perf_counter()
+        await coro_factory(domain)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(domain) for domain in domains))
+    return time.perf_counter() - start, latencies
+
+
+def report(label, wall, latencies, count):
+    latencies.sort()
+    print(f"{label:28s} wall {wall * 1000:8.1f} ms   {count / wall:8.0f} lookups/s   "
+          f"p50 {statistics.median(latencies):7.1f} ms   p99 {latencies[int(len(latencies) * 0.99) - 1]:7.1f} ms")
+
+
+async def main(count: int, delay_ms: float):
+    server = DNSServer(delay=delay_ms / 1000)
+    domains = [f"domain-{i}.test" for i in range(count)]
+    for domain in domains:
+        server.add_domain(domain)
+    await server.start()
+
+    try:
+        resolver = executor_resolver(server.port)
+        wall, latencies = await timed(lambda d: executor_lookup(resolver, d), domains)
+        report("executor (MX then A)", wall, latencies, count)
+
+        server.queries.clear()
+        checker = DNSChecker(timeout=5, retries=0, nameservers=["127.0.0.1"], port=server.port)
+        wall, latencies = await timed(checker.lookup, domains)
+        report("asyncresolver (MX+A+AAAA)", wall, latencies, count)
+        print(f"{server.total_queries} queries answered by the stub, {delay_ms:g} ms each")
+
+        server.queries.clear()
+        wall, latencies = await timed(checker.lookup, domains)
+        report("repeat, from DNS cache", wall, latencies, count)
+        print(f"{server.total_queries} queries reached the stub; cache {checker.cache.stats()}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.domains, args.delay_ms))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Batch validation of 1,000 domains, one after another the way /validate-batch
+runs them, against local stand-ins: a stub DNS server and a web server that
+answers for every host (https:// is refused, so each probe falls back to
+http://). Before: HTTPChecker opened a fresh ClientSession (connector, DNS
+cache, TLS contexts) per domain. After: one pooled session for the
+validator's lifetime.
+
+Usage: python -m benchmarks.bench_http_batch [--domains 1000]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from app.models.schemas import ValidationProfile
+from app.services.dns_checker import DNSChecker
+from app.services.domain_validator import DomainValidator
+from app.services.http_checker import HTTPChecker
+from tests.stub_servers import DNSServer, LoopbackResolver, WebServer, closed_port
+
+
+class SessionPerProbeHTTPChecker(HTTPChecker):
+    """The previous behaviour: a new session and connector for every domain"""
+
+    async def check_website_accessibility(self, domain, read_certificate=False):
+        results = {'accessible': False, 'has_ssl': False, 'status_code': None, 'redirects': 0, 'final_url': None,
+                   'ssl_valid': False, 'ssl_issuer': None, 'ssl_expiry_date': None}
+        connector = aiohttp.TCPConnector(resolver=self.resolver)
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout) as session:
+            for url in (f"https://{domain}", f"http://{domain}"):
+                try:
+                    async with session.get(url, allow_redirects=True) as response:
+                        results.update(accessible=True, status_code=response.status, final_url=str(response.url),
+                                       has_ssl=str(response.url).startswith('https://'),
+                                       redirects=len(response.history))
+                        return results
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    continue
+        return results
+
+
+async def batch(validator: DomainValidator, domains):
+    timings = []
+    start, cpu_start = time.perf_counter(), time.process_time()
+    accessible = 0
+    for domain in domains:
+        domain_start = time.perf_counter()
+        result = await validator.validate_domain(domain, profile=ValidationProfile.STANDARD)
+        timings.append((time.perf_counter() - domain_start) * 1000)
+        accessible += bool(result.metadata.website_accessible)
+    return time.perf_counter() - start, time.process_time() - cpu_start, timings, accessible
+
+
+async def main(count: int):
+    dns_server, web_server = DNSServer(), WebServer()
+    domains = [f"company-{i}.test" for i in range(count)]
+    for domain in domains:
+        dns_server.add_domain(domain)
+    await dns_server.start()
+    await web_server.start()
+    resolver = LoopbackResolver({443: closed_port(), 80: web_server.port})
+
+    try:
+        for label, checker_class in (("before: session per domain", SessionPerProbeHTTPChecker),
+                                     ("after: one pooled session", HTTPChecker)):
+            validator = DomainValidator()
+            validator.dns_checker = DNSChecker(timeout=2, retries=0, nameservers=["127.0.0.1"], port=dns_server.port)
+            validator.http_checker = checker_class(timeout=5, resolver=resolver)
+            requests_before = web_server.total_requests
+            wall, cpu, timings, accessible = await batch(validator, domains)
+            await validator.http_checker.close()
+            await validator.dns_checker.close()
+            print(f"{label:28s} {count} domains in {wall:6.2f} s   mean {statistics.mean(timings):6.2f} ms   "
+                  f"p50 {statistics.median(timings):6.2f} ms   CPU {cpu / count * 1000:5.2f} ms/domain   "
+                  f"{accessible} with website, {web_server.total_requests - requests_before} requests")
+    finally:
+        await web_server.stop()
+        await dns_server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--domains", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.domains))
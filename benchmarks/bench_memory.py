@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-worker memory and lookup cost of the domain lists: Python sets built
+from the lists (the previous representation) versus CompactDomainSet views
+over one memory-mapped snapshot shared by every worker.
+
+Each worker is a fresh interpreter, like a uvicorn worker. RssAnon is the
+private heap a worker pays for; RssFile is mapped file pages, which the
+kernel shares between all workers mapping the same snapshot.
+
+Usage: python -m benchmarks.bench_memory [--workers 4] [--domains 150000]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from app.services.domain_snapshot import write_snapshot, DomainSnapshot, CompactDomainSet
+
+LOOKUPS = 200000
+
+
+def rss_kib():
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(value.split()[0])
+    return values
+
+
+def lookup_ns(disposable, public, queries):
+    start = time.perf_counter()
+    for domain in queries:
+        if domain in disposable:
+            continue
+        domain in public
+    return (time.perf_counter() - start) / len(queries) * 1e9
+
+
+def worker(mode: str, snapshot_path: str, queries, results):
+    before = rss_kib()
+    snapshot = DomainSnapshot(snapshot_path)
+    disposable_mask = snapshot.category_mask('disposable')
+    public_mask = snapshot.category_mask('public_provider')
+    if mode == "sets":
+        disposable, public = set(), set()
+        for domain, mask in snapshot.entries():
+            if mask & disposable_mask:
+                disposable.add(domain)
+            if mask & public_mask:
+                public.add(domain)
+        snapshot.close()
+    else:
+        disposable = CompactDomainSet(snapshot, disposable_mask)
+        public = CompactDomainSet(snapshot, public_mask)
+    
+    ns = lookup_ns(disposable, public, queries)
+    after = rss_kib()
+    results.put((mode, os.getpid(), after["RssAnon"] - before["RssAnon"], after["RssFile"] - before["RssFile"], ns))
+
+
+def main(workers: int, domain_count: int):
+    hubspot = []
+    if os.path.exists("PUBLIC_EMAIL_DOMAINS.csv"):
+        with open("PUBLIC_EMAIL_DOMAINS.csv", encoding="utf-8") as f:
+            hubspot = [row[0].strip().lower() for row in csv.reader(f) if row and '.' in row[0]]
+    
+    per_source = domain_count // 4
+    sources = [
+        {'name': f'source-{n}', 'category': 'disposable',
+         'domains': [f"mailbox{(i * (n + 3)) % domain_count}-{n % 2}.disposable-example.com" for i in range(per_source)]}
+        for n in range(4)
+    ]
+    sources.append({'name': 'hubspot_list', 'category': 'public_provider', 'domains': hubspot})
+    
+    rng = random.Random(7)
+    known = sources[1]['domains'] + hubspot
+    queries = [rng.choice(known) if i % 2 else f"unlisted{i}.example.org" for i in range(LOOKUPS)]
+    
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "domain_lists.snapshot")
+        count = write_snapshot(snapshot_path, sources)
+        print(f"{count} domains, snapshot {os.path.getsize(snapshot_path) / 1024:.0f} KiB, {workers} workers\n")
+        print(f"{'mode':<8} {'RssAnon/worker':>16} {'RssFile/worker':>16} {'lookup':>12}")
+        
+        for mode in ("sets", "mmap"):
+            results = ctx.Queue()
+            procs = [ctx.Process(target=worker, args=(mode, snapshot_path, queries, results)) for _ in range(workers)]
+            for proc in procs:
+                proc.start()
+            rows = [results.get() for _ in procs]
+            for proc in procs:
+                proc.join()
+            anon = sum(r[2] for r in rows) / len(rows)
+            mapped = sum(r[3] for r in rows) / len(rows)
+            ns = sum(r[4] for r in rows) / len(rows)
+            print(f"{mode:<8} {anon / 1024:13.1f} MiB {mapped / 1024:13.1f} MiB {ns:9.0f} ns")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--domains", type=int, default=150000)
+    args = parser.parse_args()
+    main(args.workers, args.domains)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Cold-boot time of DomainListsManager.initialize(): fetching and parsing the
+disposable lists (served by a local stand-in instead of GitHub) plus the
+HubSpot CSV, versus loading the compiled on-disk snapshot.
+
+Usage: python -m benchmarks.bench_startup [--runs 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.config import settings
+from app.services.domain_lists_manager import DomainListsManager
+from tests.stub_servers import ListServer
+
+# Roughly the sizes of the four upstream lists
+LIST_SIZES = [4000, 55000, 27000, 10000]
+
+
+async def boot(sources, snapshot_path: str) -> DomainListsManager:
+    settings.lists_snapshot_path = snapshot_path
+    manager = DomainListsManager()
+    manager.disposable_sources = sources
+    await manager.initialize()
+    return manager
+
+
+async def time_boots(runs: int, sources, snapshot_path: str, keep_snapshot: bool):
+    timings = []
+    for _ in range(runs):
+        if not keep_snapshot and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        start = time.perf_counter()
+        manager = await boot(sources, snapshot_path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, manager
+
+
+async def main(runs: int):
+    server = ListServer()
+    for n, size in enumerate(LIST_SIZES):
+        # Overlap the lists a little, as the real ones do
+        server.set_list(f"/list{n}.txt", (f"disposable-{(i * (n + 1)) % 80000}.test" for i in range(size)))
+    await server.start()
+    sources = [server.url(f"/list{n}.txt") for n in range(len(LIST_SIZES))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "domain_lists.snapshot")
+        try:
+            fetch_timings, fetched = await time_boots(runs, sources, snapshot_path, keep_snapshot=False)
+            snapshot_timings, loaded = await time_boots(runs, sources, snapshot_path, keep_snapshot=True)
+        finally:
+            await server.stop()
+
+        assert loaded.loaded_from_snapshot
+        assert loaded.disposable_domains == fetched.disposable_domains
+        print(f"{len(fetched.disposable_domains)} disposable, {len(fetched.public_provider_domains)} public provider domains, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1024:.0f} KiB")
+        print(f"fetch and parse   median {statistics.median(fetch_timings):8.2f} ms   min {min(fetch_timings):8.2f} ms")
+        print(f"snapshot load     median {statistics.median(snapshot_timings):8.2f} ms   min {min(snapshot_timings):8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
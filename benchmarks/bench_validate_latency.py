@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Latency of POST /api/v1/domain/validate with a per-request validator
+(the old get_validator dependency) versus the process-wide validator
+created by the lifespan hook.
+
+DNS and HTTP probes are replaced with constant results so that only the
+per-request setup cost is measured. The disposable lists are served by a
+local HTTP stand-in instead of GitHub, MX learning is off and the shared
+validator's list snapshot goes to a temporary directory.
+
+Usage: python -m benchmarks.bench_validate_latency [--requests 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+from app.main import app
+from app.core.config import settings
+from app.api.dependencies import get_validator
+from app.services.domain_validator import DomainValidator
+from tests.stub_servers import ListServer
+
+# Everything DNSChecker.lookup and _perform_http_checks return, since the pipeline reads all of it
+DNS_RESULT = {
+    'has_mx': True, 'has_a': True, 'has_aaaa': False, 'mx_servers': ['mx.example.com'], 'domain_exists': True,
+    'dns_status': 'noerror', 'dns_ttl': 300, 'resolver_trouble': False
+}
+HTTP_RESULT = {
+    'accessible': True, 'has_ssl': True, 'status_code': 200, 'ssl_valid': True,
+    'ssl_issuer': "Let's Encrypt", 'ssl_expiry_date': None, 'parked': False
+}
+
+
+def make_validator(sources, snapshot_path: Optional[str] = None) -> DomainValidator:
+    validator = DomainValidator()
+    validator.domain_lists.disposable_sources = sources
+    validator.domain_lists.snapshot_path = snapshot_path
+
+    async def dns_checks(domain):
+        return DNS_RESULT
+
+    async def http_checks(domain, check_ssl=True):
+        return HTTP_RESULT
+
+    validator._perform_dns_checks = dns_checks
+    validator._perform_http_checks = http_checks
+    return validator
+
+
+async def run_requests(count: int):
+    timings = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for i in range(count):
+            start = time.perf_counter()
+            response = await client.post("/api/v1/domain/validate", json={"domain": f"bench{i}.example.com"})
+            timings.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+    return timings
+
+
+def report(label: str, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<24} mean {statistics.mean(timings):8.2f} ms   "
+          f"p50 {statistics.median(timings):8.2f} ms   p99 {p99:8.2f} ms")
+
+
+async def main(count: int, list_size: int):
+    server = ListServer()
+    for n in range(4):
+        server.set_list(f"/list{n}.txt", (f"disposable{n}-{i}.test" for i in range(list_size)))
+    await server.start()
+    sources = [server.url(f"/list{n}.txt") for n in range(4)]
+
+    # Learning would resolve the lists' MX records against real DNS
+    settings.mx_index_learn_limit = 0
+    snapshot_dir = tempfile.TemporaryDirectory()
+    try:
+        # Before: what the old dependency did per request, a Redis connect and a full list download
+        async def per_request_validator():
+            validator = make_validator(sources)
+            await validator.cache_service.connect()
+            await validator.domain_lists.update_disposable_lists()
+            try:
+                yield validator
+            finally:
+                await validator.shutdown()
+
+        app.dependency_overrides[get_validator] = per_request_validator
+        report("per-request validator", await run_requests(count))
+
+        # After: one validator created at startup and shared by every request
+        shared = make_validator(sources, f"{snapshot_dir.name}/lists.snapshot")
+        await shared.startup()
+        app.dependency_overrides[get_validator] = lambda: shared
+        report("shared validator", await run_requests(count))
+        await shared.shutdown()
+    finally:
+        app.dependency_overrides.pop(get_validator, None)
+        await server.stop()
+        snapshot_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--list-size", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.list_size))
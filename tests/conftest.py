@@ -0,0 +1,7 @@
+import pytest
+from app.core.config import settings
+
+@pytest.fixture(autouse=True)
+def isolated_snapshot(tmp_path, monkeypatch):
+    # Keep list snapshots written during tests out of the working directory
+    monkeypatch.setattr(settings, "lists_snapshot_path", str(tmp_path / "domain_lists.snapshot"))
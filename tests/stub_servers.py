@@ -0,0 +1,518 @@
+"""
+Local stand-ins for the remote services the validator talks to.
+Used by the test suite and by the scripts in benchmarks/.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import os
+import socket
+import ssl
+import tempfile
+from email.utils import formatdate
+from typing import Dict, List, Optional, Set, Tuple
+import dns.flags
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+from yarl import URL
+
+
+class ListServer:
+    """Serves plain-text domain lists with ETag / Last-Modified support"""
+    
+    def __init__(self):
+        self.lists: Dict[str, str] = {}
+        self.failing: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.not_modified: Dict[str, int] = {}
+        self._modified_at: Dict[str, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+    
+    def set_list(self, path: str, domains, modified_at: float = 1700000000.0):
+        self.lists[path] = "\n".join(domains) + "\n"
+        self._modified_at[path] = modified_at
+    
+    def fail(self, path: str, status: int = 500):
+        self.failing[path] = status
+    
+    def recover(self, path: str):
+        self.failing.pop(path, None)
+    
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+    
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        self.requests[path] = self.requests.get(path, 0) + 1
+        
+        if path in self.failing:
+            return web.Response(status=self.failing[path])
+        if path not in self.lists:
+            return web.Response(status=404)
+        
+        body = self.lists[path]
+        etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+        last_modified = formatdate(self._modified_at[path], usegmt=True)
+        
+        if request.headers.get("If-None-Match") == etag or \
+           (request.headers.get("If-None-Match") is None and
+            request.headers.get("If-Modified-Since") == last_modified):
+            self.not_modified[path] = self.not_modified.get(path, 0) + 1
+            return web.Response(status=304, headers={"ETag": etag})
+        
+        return web.Response(text=body, headers={"ETag": etag, "Last-Modified": last_modified})
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def make_certificate(hosts: List[str], expired: bool = False,
+                     organization: str = "Stub Issuing CA") -> Tuple[bytes, bytes]:
+    """Self-signed certificate and key (PEM) valid for ``hosts``, or expired yesterday"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, organization),
+        x509.NameAttribute(NameOID.COMMON_NAME, hosts[0]),
+    ])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    not_after = now - datetime.timedelta(days=1) if expired else now + datetime.timedelta(days=30)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=60))
+        .not_valid_after(not_after)
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(host) for host in hosts]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return cert.public_bytes(serialization.Encoding.PEM), key_pem
+
+
+class WebServer:
+    """
+    A website for every host name: answers any GET with a small page and
+    counts requests per Host header and the TCP connections they came over.
+    ``body_size`` streams that many bytes instead (ignoring Range) and counts
+    what actually went out in ``bytes_sent``; ``redirect_loop`` bounces every
+    request between two paths; ``head_allowed=False`` answers HEAD with 405;
+    ``delay`` holds every answer back that many seconds, tracking how many
+    requests are held at once in ``peak_in_flight``; ``redirect_to`` sends
+    every other host to that URL, and ``headers`` go out with every page.
+    With ``tls_hosts`` it also serves HTTPS on ``ssl_port`` under a
+    self-signed certificate for those names; ``client_ssl_context()`` trusts
+    it. Pair it with LoopbackResolver so probes of arbitrary domains land here.
+    """
+    
+    def __init__(self, status: int = 200, body: str = "<html><body>ok</body></html>",
+                 tls_hosts: Optional[List[str]] = None, expired: bool = False, body_size: int = 0,
+                 redirect_loop: bool = False, head_allowed: bool = True, delay: float = 0.0,
+                 redirect_to: Optional[str] = None, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.delay = delay
+        self.redirect_to = redirect_to
+        self.headers = headers or {}
+        self.body = body
+        self.body_size = body_size
+        self.redirect_loop = redirect_loop
+        self.head_allowed = head_allowed
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.methods: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self._connections: Set[int] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+        self.ssl_port: Optional[int] = None
+        self.certificate: Optional[bytes] = None
+        self._key: Optional[bytes] = None
+        if tls_hosts:
+            self.certificate, self._key = make_certificate(tls_hosts, expired=expired)
+    
+    def client_ssl_context(self) -> ssl.SSLContext:
+        return ssl.create_default_context(cadata=self.certificate.decode())
+    
+    def _server_ssl_context(self) -> ssl.SSLContext:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        # load_cert_chain only reads files
+        with tempfile.TemporaryDirectory() as directory:
+            cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+            with open(cert_path, "wb") as f:
+                f.write(self.certificate)
+            with open(key_path, "wb") as f:
+                f.write(self._key)
+            context.load_cert_chain(cert_path, key_path)
+        return context
+    
+    @property
+    def connections(self) -> int:
+        return len(self._connections)
+    
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+    
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        host = request.host.split(":")[0]
+        self.requests[host] = self.requests.get(host, 0) + 1
+        self.methods[request.method] = self.methods.get(request.method, 0) + 1
+        self._connections.add(id(request.transport))
+        if self.delay:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.delay)
+            finally:
+                self.in_flight -= 1
+        if self.redirect_loop:
+            raise web.HTTPFound("/b" if request.path == "/a" else "/a")
+        if self.redirect_to and URL(self.redirect_to).host != host:
+            raise web.HTTPFound(self.redirect_to)
+        if not self.body_size:
+            return web.Response(status=self.status, text=self.body, content_type="text/html", headers=self.headers)
+        
+        response = web.StreamResponse(status=self.status, headers={"Content-Type": "text/html", **self.headers})
+        response.content_length = self.body_size
+        await response.prepare(request)
+        if request.method == "HEAD":
+            return response
+        chunk = b"x" * 65536
+        remaining = self.body_size
+        try:
+            while remaining > 0:
+                piece = chunk[:remaining]
+                await response.write(piece)
+                self.bytes_sent += len(piece)
+                remaining -= len(piece)
+        except (ConnectionError, RuntimeError):
+            # The client hung up once it had the headers
+            pass
+        return response
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle, allow_head=self.head_allowed)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        if self.certificate:
+            tls_site = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=self._server_ssl_context())
+            await tls_site.start()
+            self.ssl_port = tls_site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class StalledServer:
+    """Accepts TCP connections and never says a word, like a host behind a dropping firewall"""
+    
+    def __init__(self):
+        self.connections = 0
+        self._server = None
+        self.port: Optional[int] = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        if self._server:
+            self._server.close()
+
+
+def closed_port() -> int:
+    """A loopback port nothing listens on, so connecting is refused at once"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoopbackResolver(AbstractResolver):
+    """aiohttp resolver sending every host to 127.0.0.1, with the port swapped per ``ports``"""
+    
+    def __init__(self, ports: Dict[int, int]):
+        self.ports = ports
+        self.lookups = 0
+    
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET):
+        self.lookups += 1
+        return [{
+            "hostname": host, "host": "127.0.0.1", "port": self.ports.get(port, port),
+            "family": socket.AF_INET, "proto": 0, "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+        }]
+    
+    async def close(self):
+        pass
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "DNSServer"):
+        self.server = server
+        self.transport = None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data: bytes, addr):
+        # Past its capacity the server sheds load the way a busy resolver does
+        capacity = self.server.capacity
+        overloaded = capacity is not None and self.server.outstanding >= capacity
+        reply = self.server.answer(data, overloaded=overloaded)
+        if reply is None:
+            return
+        if self.server.delay and not overloaded:
+            self.server.outstanding += 1
+            self.server.peak_outstanding = max(self.server.peak_outstanding, self.server.outstanding)
+            asyncio.get_running_loop().call_later(self.server.delay, self._send_delayed, reply, addr)
+        else:
+            self.transport.sendto(reply, addr)
+    
+    def _send_delayed(self, reply: bytes, addr):
+        self.server.outstanding -= 1
+        self.transport.sendto(reply, addr)
+
+
+class DNSServer:
+    """
+    Answers DNS queries over UDP from an in-memory zone. Names that were never
+    added get NXDOMAIN; known names without the asked type get NODATA. Both
+    carry the zone SOA so resolvers can cache them. Names in ``servfail`` get
+    SERVFAIL, (name, type) pairs in ``drop`` are never answered, and names in
+    ``truncate`` get an empty truncated answer over UDP and the full one over
+    TCP on the same port. ``flaky`` maps names to a number of SERVFAILs to
+    give before answering, and with ``capacity`` set, queries arriving while
+    that many are still being delayed get SERVFAIL. ``host`` may be an IPv6
+    address.
+    """
+    
+    def __init__(self, ttl: int = 300, negative_ttl: int = 60, delay: float = 0.0, host: str = "127.0.0.1"):
+        self.host = host
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.delay = delay
+        self.records: Dict[Tuple[str, str], List[str]] = {}
+        self.ttls: Dict[Tuple[str, str], int] = {}
+        self.names: Set[str] = set()
+        self.servfail: Set[str] = set()
+        self.drop: Set[Tuple[str, str]] = set()
+        self.truncate: Set[str] = set()
+        self.flaky: Dict[str, int] = {}
+        self.capacity: Optional[int] = None
+        self.servfails = 0
+        self.tcp_queries = 0
+        self.outstanding = 0
+        self.peak_outstanding = 0
+        self._tcp_server = None
+        self.queries: Dict[Tuple[str, str], int] = {}
+        self._transport = None
+        self.port: Optional[int] = None
+    
+    def add(self, name: str, rdtype: str, *values: str, ttl: Optional[int] = None):
+        name = name.rstrip(".").lower()
+        self.names.add(name)
+        self.records.setdefault((name, rdtype), []).extend(values)
+        if ttl is not None:
+            self.ttls[(name, rdtype)] = ttl
+    
+    def add_domain(self, name: str, mx: bool = True, a: bool = True, aaaa: bool = False):
+        if mx:
+            self.add(name, "MX", f"10 mx.{name}.")
+        if a:
+            self.add(name, "A", "192.0.2.1")
+        if aaaa:
+            self.add(name, "AAAA", "2001:db8::1")
+        self.names.add(name.lower())
+    
+    @property
+    def total_queries(self) -> int:
+        return sum(self.queries.values())
+    
+    def answer(self, wire: bytes, tcp: bool = False, overloaded: bool = False) -> Optional[bytes]:
+        try:
+            query = dns.message.from_wire(wire)
+        except Exception:
+            return None
+        question = query.question[0]
+        name = question.name.to_text().rstrip(".").lower()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        key = (name, rdtype)
+        self.queries[key] = self.queries.get(key, 0) + 1
+        if key in self.drop:
+            return None
+        
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        if overloaded or name in self.servfail or self.flaky.get(name, 0) > 0:
+            if self.flaky.get(name, 0) > 0:
+                self.flaky[name] -= 1
+            self.servfails += 1
+            response.set_rcode(dns.rcode.SERVFAIL)
+            return response.to_wire()
+        elif name in self.truncate and not tcp:
+            response.flags |= dns.flags.TC
+        elif key in self.records:
+            response.answer.append(dns.rrset.from_text_list(
+                question.name, self.ttls.get(key, self.ttl), dns.rdataclass.IN, rdtype, self.records[key]
+            ))
+        else:
+            if name not in self.names:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            zone = dns.name.from_text(".".join(name.split(".")[-2:]))
+            response.authority.append(dns.rrset.from_text(
+                zone, self.negative_ttl, dns.rdataclass.IN, "SOA",
+                f"ns.{zone} hostmaster.{zone} 1 3600 600 86400 {self.negative_ttl}"
+            ))
+        return response.to_wire()
+    
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                length = int.from_bytes(await reader.readexactly(2), "big")
+                reply = self.answer(await reader.readexactly(length), tcp=True)
+                if reply is None:
+                    continue
+                self.tcp_queries += 1
+                writer.write(len(reply).to_bytes(2, "big") + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._tcp_server = await asyncio.start_server(self._handle_tcp, self.host, 0)
+        tcp_port = self._tcp_server.sockets[0].getsockname()[1]
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DNSProtocol(self), local_addr=(self.host, tcp_port)
+        )
+        sock = self._transport.get_extra_info("socket")
+        try:
+            # Room for a burst of thousands of queries instead of dropping them
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+        self.port = self._transport.get_extra_info("sockname")[1]
+    
+    async def stop(self):
+        if self._transport:
+            self._transport.close()
+        if self._tcp_server:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+
+
+class InMemoryPubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = asyncio.Queue()
+        self.closed = False
+    
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.redis.subscribers.setdefault(channel, []).append(self)
+    
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+    
+    async def aclose(self):
+        self.closed = True
+
+
+class InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+    
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+    
+    async def execute(self):
+        self.redis.pipelines_executed += 1
+        for key, ttl, value in self.commands:
+            self.redis.data[key] = value
+            self.redis.ttls[key] = ttl
+        return [True] * len(self.commands)
+
+
+class InMemoryRedis:
+    """The slice of redis.asyncio.Redis the cache service uses: MGET, SETEX pipelines and pub/sub"""
+    
+    def __init__(self):
+        self.data = {}
+        self.mget_calls = 0
+        self.pipelines_executed = 0
+        self.ttls = {}
+        self.subscribers = {}
+        self.published = []
+    
+    async def mget(self, keys):
+        self.mget_calls += 1
+        return [self.data.get(key) for key in keys]
+    
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        for pubsub in self.subscribers.get(channel, []):
+            pubsub.messages.put_nowait({'type': 'message', 'channel': channel, 'data': message.encode()})
+    
+    def pubsub(self, ignore_subscribe_messages=False):
+        return InMemoryPubSub(self)
+    
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+    
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+    
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
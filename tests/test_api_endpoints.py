@@ -1,8 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from app.main import app
-from app.models.schemas import DomainValidationResponse, DomainType, ValidationStatus, Recommendation, DomainMetadata
+from app.api.dependencies import get_validator
+from app.models.schemas import DomainValidationResponse, DomainType, ValidationStatus, Recommendation, DomainMetadata, ValidationProfile
 from datetime import datetime
 
 client = TestClient(app)
@@ -25,13 +26,17 @@ def mock_validation_response():
         checked_at=datetime.utcnow()
     )
 
+@pytest.fixture
+def mock_validator():
+    validator = AsyncMock()
+    app.dependency_overrides[get_validator] = lambda: validator
+    yield validator
+    app.dependency_overrides.pop(get_validator, None)
+
 class TestDomainEndpoints:
     
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_validate_single_domain_success(self, mock_get_validator, mock_validation_response):
-        mock_validator = AsyncMock()
+    def test_validate_single_domain_success(self, mock_validator, mock_validation_response):
         mock_validator.validate_domain.return_value = mock_validation_response
-        mock_get_validator.return_value = mock_validator
         
         response = client.post("/api/v1/domain/validate", json={"domain": "example.com"})
         
@@ -42,23 +47,17 @@ class TestDomainEndpoints:
         assert data["validation_status"] == "valid"
         assert data["recommendation"] == "accept"
 
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_validate_single_domain_with_email(self, mock_get_validator, mock_validation_response):
-        mock_validator = AsyncMock()
+    def test_validate_single_domain_with_email(self, mock_validator, mock_validation_response):
         mock_validator.validate_domain.return_value = mock_validation_response
-        mock_get_validator.return_value = mock_validator
         
         response = client.post("/api/v1/domain/validate", json={"domain": "user@example.com"})
         
         assert response.status_code == 200
         # Should extract domain from email
-        mock_validator.validate_domain.assert_called_with("example.com")
+        mock_validator.validate_domain.assert_called_with("example.com", profile=ValidationProfile.FULL, deadline_ms=None)
 
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_validate_batch_domains(self, mock_get_validator, mock_validation_response):
-        mock_validator = AsyncMock()
-        mock_validator.validate_domain.return_value = mock_validation_response
-        mock_get_validator.return_value = mock_validator
+    def test_validate_batch_domains(self, mock_validator, mock_validation_response):
+        mock_validator.validate_many.return_value = [mock_validation_response, mock_validation_response]
         
         domains = ["example.com", "test.com"]
         response = client.post("/api/v1/domain/validate-batch", json={"domains": domains})
@@ -68,12 +67,18 @@ class TestDomainEndpoints:
         assert data["total_processed"] == 2
         assert len(data["results"]) == 2
         assert "processing_time_seconds" in data
+        mock_validator.validate_many.assert_called_once_with(domains, profile=ValidationProfile.FULL, deadline_ms=None)
+
+    def test_validate_batch_skips_failed_domains(self, mock_validator, mock_validation_response):
+        mock_validator.validate_many.return_value = [None, mock_validation_response]
+        
+        response = client.post("/api/v1/domain/validate-batch", json={"domains": ["broken.com", "example.com"]})
+        
+        assert response.status_code == 200
+        assert response.json()["total_processed"] == 1
 
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_validate_domain_error_handling(self, mock_get_validator):
-        mock_validator = AsyncMock()
+    def test_validate_domain_error_handling(self, mock_validator):
         mock_validator.validate_domain.side_effect = Exception("DNS lookup failed")
-        mock_get_validator.return_value = mock_validator
         
         response = client.post("/api/v1/domain/validate", json={"domain": "invalid.domain"})
         
@@ -87,27 +92,25 @@ class TestDomainEndpoints:
         assert data["status"] == "healthy"
         assert data["service"] == "domain-validator"
 
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_cache_stats(self, mock_get_validator):
-        mock_validator = AsyncMock()
+    def test_cache_stats(self, mock_validator):
         mock_validator.cache_service.get_cache_stats.return_value = {
             "status": "connected",
             "used_memory": "1MB",
             "connected_clients": 1
         }
-        mock_get_validator.return_value = mock_validator
+        mock_validator.dns_checker.cache.stats = MagicMock(return_value={"hits": 3, "misses": 1})
+        mock_validator.http_checker.stats = MagicMock(return_value={"probes": 2, "bytes_downloaded": 0})
         
         response = client.get("/api/v1/domain/cache/stats")
         
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "connected"
+        assert data["dns_cache"]["hits"] == 3
+        assert data["http_probes"]["probes"] == 2
 
-    @patch('app.api.endpoints.domain.get_validator')
-    def test_invalidate_cache(self, mock_get_validator):
-        mock_validator = AsyncMock()
+    def test_invalidate_cache(self, mock_validator):
         mock_validator.cache_service.invalidate_domain_cache.return_value = None
-        mock_get_validator.return_value = mock_validator
         
         response = client.delete("/api/v1/domain/cache/example.com")
         
@@ -133,4 +136,24 @@ class TestAppHealth:
         response = client.get("/health")
         assert response.status_code == 200
         data = response.json()
-        assert data["status"] == "healthy"
\ No newline at end of file
+        assert data["status"] == "healthy"
+
+class TestAppLifespan:
+    
+    def test_validator_shared_across_requests(self, mock_validation_response):
+        with patch('app.main.DomainValidator') as mock_validator_cls:
+            validator = mock_validator_cls.return_value
+            validator.startup = AsyncMock()
+            validator.shutdown = AsyncMock()
+            validator.validate_domain = AsyncMock(return_value=mock_validation_response)
+            
+            with TestClient(app) as lifespan_client:
+                for _ in range(3):
+                    response = lifespan_client.post("/api/v1/domain/validate", json={"domain": "example.com"})
+                    assert response.status_code == 200
+                
+                assert mock_validator_cls.call_count == 1
+                validator.startup.assert_awaited_once()
+                assert validator.validate_domain.await_count == 3
+            
+            validator.shutdown.assert_awaited_once()
@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime
+from app.services.cache_policy import CacheTTLPolicy
+from app.models.schemas import (
+    DomainValidationResponse, DomainType, ValidationStatus, Recommendation, DomainMetadata
+)
+
+def make_result(domain_type=DomainType.CORPORATE, status=ValidationStatus.VALID,
+                stages=('normalize', 'overrides', 'lists', 'cache', 'dns', 'http'), **metadata):
+    metadata.setdefault('website_accessible', True)
+    return DomainValidationResponse(
+        domain='example.com',
+        domain_type=domain_type,
+        validation_status=status,
+        quality_score=8.0,
+        recommendation=Recommendation.ACCEPT,
+        metadata=DomainMetadata(**metadata),
+        stages=list(stages),
+        checked_at=datetime.utcnow()
+    )
+
+@pytest.fixture
+def policy():
+    return CacheTTLPolicy(
+        default_ttl=3600, list_decided_ttl=86400, nxdomain_ttl=300, no_records_ttl=900,
+        probe_failure_ttl=600, dns_ttl_floor=300
+    )
+
+class TestCacheTTLPolicy:
+    
+    def test_reachable_corporate_domain_keeps_default(self, policy):
+        assert policy.ttl(make_result()) == 3600
+
+    def test_nxdomain_is_short_and_follows_negative_ttl(self, policy):
+        result = make_result(DomainType.UNREACHABLE, ValidationStatus.INVALID, dns_status='nxdomain')
+        
+        assert policy.ttl(result) == 300
+        assert policy.ttl(result, dns_ttl=60) == 60
+
+    def test_name_without_records(self, policy):
+        result = make_result(DomainType.UNREACHABLE, ValidationStatus.INVALID, dns_status='nodata')
+        
+        assert policy.ttl(result) == 900
+
+    def test_failed_website_probe_recovers_quickly(self, policy):
+        result = make_result(DomainType.SUSPICIOUS, ValidationStatus.VALID, website_accessible=False)
+        
+        assert policy.ttl(result) == 600
+
+    def test_skipped_probe_is_not_a_failure(self, policy):
+        result = make_result(stages=('normalize', 'overrides', 'lists', 'cache', 'dns'), website_accessible=False)
+        
+        assert policy.ttl(result) == 3600
+
+    def test_list_decided_results_keep_for_a_day(self, policy):
+        result = make_result(DomainType.EDUCATIONAL, stages=('normalize', 'overrides', 'lists', 'cache', 'dns'))
+        
+        assert policy.ttl(result, dns_ttl=60) == 86400
+
+    def test_dns_ttl_caps_with_a_floor(self, policy):
+        assert policy.ttl(make_result(), dns_ttl=1200) == 1200
+        assert policy.ttl(make_result(), dns_ttl=30) == 300
+        assert policy.ttl(make_result(), dns_ttl=86400) == 3600
+
+    def test_decisions_are_counted(self, policy):
+        policy.ttl(make_result())
+        policy.ttl(make_result(DomainType.UNREACHABLE, ValidationStatus.INVALID, dns_status='nxdomain'))
+        
+        decisions = policy.stats()['decisions']
+        
+        assert decisions['default'] == 1
+        assert decisions['nxdomain'] == 1
@@ -0,0 +1,315 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.services.cache_service import CacheService, INVALIDATION_CHANNEL
+from app.services.local_cache import LocalCache
+from app.models.schemas import (
+    DomainValidationResponse, DomainType, ValidationStatus, Recommendation,
+    DomainMetadata, ValidationProfile
+)
+from tests.stub_servers import InMemoryRedis
+
+def make_result(profile):
+    return DomainValidationResponse(
+        domain='example.com',
+        domain_type=DomainType.CORPORATE,
+        validation_status=ValidationStatus.VALID,
+        quality_score=8.0,
+        recommendation=Recommendation.ACCEPT,
+        metadata=DomainMetadata(),
+        profile=profile,
+        checked_at=datetime.utcnow()
+    )
+
+class TestCacheService:
+    
+    @pytest.fixture
+    def cache_service(self):
+        return CacheService()
+
+    @pytest.fixture
+    def connected_cache(self, cache_service):
+        cache_service.redis_client = InMemoryRedis()
+        return cache_service
+
+    def test_cache_key_uses_registrable_domain(self, cache_service):
+        assert cache_service._generate_cache_key('Mail.Corp.Example.co.uk') == 'domain_validation:full:example.co.uk'
+        assert cache_service._generate_cache_key('example.com') == 'domain_validation:full:example.com'
+        assert cache_service._generate_cache_key('co.uk') == 'domain_validation:full:co.uk'
+
+    def test_cache_key_includes_profile(self, cache_service):
+        assert cache_service._generate_cache_key('example.com', ValidationProfile.FAST) == 'domain_validation:fast:example.com'
+
+    @pytest.mark.asyncio
+    async def test_full_result_serves_fast_request(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        cached = await connected_cache.get_cached_validation('example.com', ValidationProfile.FAST)
+        
+        assert cached is not None
+        assert cached.profile == ValidationProfile.FULL
+
+    @pytest.mark.asyncio
+    async def test_fast_result_does_not_serve_full_request(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FAST))
+        
+        assert await connected_cache.get_cached_validation('example.com', ValidationProfile.FULL) is None
+        assert await connected_cache.get_cached_validation('example.com', ValidationProfile.STANDARD) is None
+        assert await connected_cache.get_cached_validation('example.com', ValidationProfile.FAST) is not None
+
+    @pytest.mark.asyncio
+    async def test_most_complete_entry_wins(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FAST))
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.STANDARD))
+        
+        cached = await connected_cache.get_cached_validation('example.com', ValidationProfile.FAST)
+        
+        assert cached.profile == ValidationProfile.STANDARD
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_every_profile(self, connected_cache):
+        for profile in ValidationProfile:
+            await connected_cache.cache_validation_result('example.com', make_result(profile))
+        
+        await connected_cache.invalidate_domain_cache('example.com')
+        
+        assert connected_cache.redis_client.data == {}
+
+    @pytest.mark.asyncio
+    async def test_ttl_follows_outcome_and_dns(self, connected_cache):
+        dead = make_result(ValidationProfile.FULL)
+        dead.domain_type, dead.validation_status = DomainType.UNREACHABLE, ValidationStatus.INVALID
+        dead.metadata.dns_status = 'nxdomain'
+        
+        await connected_cache.cache_validation_result('dead.com', dead, dns_ttl=120)
+        await connected_cache.set_many([('live.com', make_result(ValidationProfile.FULL), None, 86400 * 7)])
+        
+        # Redis keeps entries past the policy TTL so they can be served stale
+        ttls = connected_cache.redis_client.ttls
+        assert ttls['domain_validation:full:dead.com'] == 120 * 2
+        assert ttls['domain_validation:full:live.com'] == connected_cache.ttl_policy.ttls['default'] * 2
+
+    @pytest.mark.asyncio
+    async def test_entries_are_stored_in_compact_form(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        stored = connected_cache.redis_client.data['domain_validation:full:example.com']
+        
+        assert isinstance(stored, bytes)
+        assert len(stored) < len(make_result(ValidationProfile.FULL).model_dump_json())
+
+    @pytest.mark.asyncio
+    async def test_json_entries_from_before_the_codec_still_read(self, connected_cache):
+        connected_cache.redis_client.data['domain_validation:full:example.com'] = \
+            make_result(ValidationProfile.FULL).model_dump_json().encode()
+        
+        cached = await connected_cache.get_cached_validation('example.com')
+        
+        assert cached.domain_type == DomainType.CORPORATE
+
+    @pytest.mark.asyncio
+    async def test_get_many_uses_one_round_trip(self, connected_cache):
+        await connected_cache.set_many([
+            ('a.com', make_result(ValidationProfile.FULL), None, None),
+            ('b.com', make_result(ValidationProfile.FAST), None, None)
+        ])
+        connected_cache.local.clear()
+        
+        found = await connected_cache.get_many(['a.com', 'b.com', 'c.com'], ValidationProfile.STANDARD)
+        
+        assert list(found) == ['a.com']
+        assert connected_cache.redis_client.mget_calls == 1
+        assert connected_cache.redis_client.pipelines_executed == 1
+
+    @pytest.mark.asyncio
+    async def test_get_many_skips_redis_when_local_tier_answers(self, connected_cache):
+        await connected_cache.set_many([('a.com', make_result(ValidationProfile.FULL), ValidationProfile.FULL, None)])
+        
+        found = await connected_cache.get_many(['a.com'], ValidationProfile.FAST)
+        
+        assert found['a.com'].profile == ValidationProfile.FULL
+        assert connected_cache.redis_client.mget_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_set_many_without_redis_is_a_no_op(self, cache_service):
+        await cache_service.set_many([('a.com', make_result(ValidationProfile.FULL), None, None)])
+        
+        assert await cache_service.get_many(['a.com']) == {}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class TestLocalCache:
+    
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LocalCache(clock=clock)
+        cache.set('key', 'value', ttl=10)
+        
+        assert cache.get('key') == 'value'
+        clock.now = 10
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LocalCache(max_entries=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_zero_size_disables(self):
+        cache = LocalCache(max_entries=0)
+        cache.set('key', 'value', ttl=60)
+        
+        assert cache.get('key') is None
+
+class TestLocalTier:
+    
+    @pytest.fixture
+    def connected_cache(self):
+        cache_service = CacheService()
+        cache_service.redis_client = InMemoryRedis()
+        return cache_service
+
+    @pytest.mark.asyncio
+    async def test_local_hit_skips_redis(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        cached = await connected_cache.get_cached_validation('example.com', ValidationProfile.FAST)
+        
+        assert cached.profile == ValidationProfile.FULL
+        assert connected_cache.redis_client.mget_calls == 0
+        assert connected_cache.tier_stats()['l1']['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_fills_local_tier(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        connected_cache.local.clear()
+        
+        await connected_cache.get_cached_validation('example.com')
+        await connected_cache.get_cached_validation('example.com')
+        
+        assert connected_cache.redis_client.mget_calls == 1
+        stats = connected_cache.tier_stats()
+        assert (stats['l1']['hits'], stats['l2']['hits'], stats['miss']['count']) == (1, 1, 0)
+        assert stats['l2']['hit_ratio'] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_local_entries_expire(self, connected_cache):
+        clock = FakeClock()
+        connected_cache.local.clock = clock
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        clock.now = connected_cache.local_ttl
+        
+        assert await connected_cache.get_cached_validation('example.com') is not None
+        assert connected_cache.redis_client.mget_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_clears_local_tier_and_announces(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        await connected_cache.invalidate_domain_cache('example.com')
+        
+        assert await connected_cache.get_cached_validation('example.com') is None
+        channel, message = connected_cache.redis_client.published[0]
+        assert channel == INVALIDATION_CHANNEL
+        assert 'domain_validation:full:example.com' in message.split()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_from_another_worker_drops_local_entry(self, connected_cache):
+        redis = connected_cache.redis_client
+        listener = asyncio.create_task(connected_cache._listen_for_invalidations())
+        await asyncio.sleep(0)
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        # Another worker deletes the Redis entry and announces it
+        redis.data.clear()
+        await redis.publish(INVALIDATION_CHANNEL, 'domain_validation:full:example.com')
+        await asyncio.sleep(0)
+        
+        assert await connected_cache.get_cached_validation('example.com') is None
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+        assert redis.subscribers[INVALIDATION_CHANNEL][0].closed
+
+    @pytest.mark.asyncio
+    async def test_override_changes_reach_every_worker(self, connected_cache):
+        redis = connected_cache.redis_client
+        changed = []
+        connected_cache.override_listener = changed.append
+        listener = asyncio.create_task(connected_cache._listen_for_invalidations())
+        await asyncio.sleep(0)
+        
+        # Another worker sharing the same Redis changes an override
+        other = CacheService()
+        other.redis_client = redis
+        await other.announce_override('example.com')
+        await asyncio.sleep(0)
+        
+        assert changed == ['example.com']
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+class TestStaleEntries:
+    
+    @pytest.fixture
+    def connected_cache(self):
+        cache_service = CacheService()
+        cache_service.redis_client = InMemoryRedis()
+        cache_service.clock = FakeClock()
+        cache_service.clock.now = 1_700_000_000
+        cache_service.stale_window = 600
+        return cache_service
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_is_not_stale(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        
+        assert not (await connected_cache.get_cached_validation('example.com')).stale
+
+    @pytest.mark.asyncio
+    async def test_entry_past_soft_expiry_is_served_stale(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        connected_cache.local.clear()
+        connected_cache.clock.now += connected_cache.ttl_policy.ttls['default']
+        
+        cached = await connected_cache.get_cached_validation('example.com')
+        
+        assert cached.stale
+        assert connected_cache.tier_stats()['stale_served'] == 1
+        assert connected_cache.redis_client.ttls['domain_validation:full:example.com'] == \
+            connected_cache.ttl_policy.ttls['default'] + 600
+
+    @pytest.mark.asyncio
+    async def test_local_tier_also_marks_stale(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        connected_cache.clock.now += connected_cache.ttl_policy.ttls['default'] + 1
+        
+        cached = await connected_cache.get_cached_validation('example.com')
+        
+        assert cached.stale
+        assert connected_cache.redis_client.mget_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_wins_over_a_more_complete_stale_one(self, connected_cache):
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FULL))
+        connected_cache.clock.now += connected_cache.ttl_policy.ttls['default'] + 1
+        await connected_cache.cache_validation_result('example.com', make_result(ValidationProfile.FAST))
+        
+        cached = await connected_cache.get_cached_validation('example.com', ValidationProfile.FAST)
+        
+        assert not cached.stale
+        assert cached.profile == ValidationProfile.FAST
+        assert (await connected_cache.get_cached_validation('example.com')).stale
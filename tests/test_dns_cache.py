@@ -0,0 +1,89 @@
+import pytest
+import dns.message
+import dns.rrset
+from app.services.dns_cache import DNSCache, negative_ttl
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+class TestDNSCache:
+    
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def cache(self, clock):
+        return DNSCache(max_entries=3, clock=clock)
+
+    def test_entry_expires_with_its_ttl(self, cache, clock):
+        cache.set('example.com', 'A', ('192.0.2.1',), 60)
+        
+        clock.now += 59
+        assert cache.get('example.com', 'A') == ('192.0.2.1',)
+        clock.now += 1
+        assert cache.get('example.com', 'A') is None
+        assert len(cache) == 0
+
+    def test_keyed_by_name_and_type(self, cache):
+        cache.set('example.com', 'A', ('192.0.2.1',), 60)
+        
+        assert cache.get('example.com', 'MX') is None
+        assert cache.get('example.com', 'A') is not None
+
+    def test_negative_answers_are_cached(self, cache):
+        cache.set('missing.com', 'MX', (), 30)
+        
+        assert cache.get('missing.com', 'MX') == ()
+
+    def test_answers_without_ttl_are_not_cached(self, cache):
+        cache.set('example.com', 'A', (), None)
+        cache.set('example.org', 'A', ('192.0.2.1',), 0)
+        
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self, cache):
+        for name in ('a.com', 'b.com', 'c.com'):
+            cache.set(name, 'A', ('192.0.2.1',), 60)
+        cache.get('a.com', 'A')
+        cache.set('d.com', 'A', ('192.0.2.1',), 60)
+        
+        assert cache.get('b.com', 'A') is None
+        assert cache.get('a.com', 'A') is not None
+        assert cache.evictions == 1
+
+    def test_hit_and_miss_counters(self, cache):
+        cache.set('example.com', 'A', ('192.0.2.1',), 60)
+        cache.get('example.com', 'A')
+        cache.get('example.com', 'A')
+        cache.get('other.com', 'A')
+        
+        stats = cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['hit_ratio'] == pytest.approx(2 / 3)
+
+    def test_negative_ttl_uses_soa_minimum(self):
+        response = dns.message.make_response(dns.message.make_query('missing.example.com', 'MX'))
+        response.authority.append(dns.rrset.from_text(
+            'example.com.', 3600, 'IN', 'SOA', 'ns.example.com. hostmaster.example.com. 1 3600 600 86400 300'
+        ))
+        
+        assert negative_ttl(response) == 300
+
+    def test_negative_ttl_capped_by_soa_ttl(self):
+        response = dns.message.make_response(dns.message.make_query('missing.example.com', 'MX'))
+        response.authority.append(dns.rrset.from_text(
+            'example.com.', 60, 'IN', 'SOA', 'ns.example.com. hostmaster.example.com. 1 3600 600 86400 300'
+        ))
+        
+        assert negative_ttl(response) == 60
+
+    def test_no_soa_means_no_negative_caching(self):
+        response = dns.message.make_response(dns.message.make_query('missing.example.com', 'MX'))
+        
+        assert negative_ttl(response) is None
@@ -1,72 +1,537 @@
 import pytest
+import pytest_asyncio
 import asyncio
-from unittest.mock import patch, MagicMock
-import dns.resolver
-import dns.exception
-from app.services.dns_checker import DNSChecker
+import socket
+import time
+from unittest.mock import MagicMock, patch
+import dns.message
+from app.services.dns_checker import DNSChecker, DNSAnswer, DNSStatus, AdaptiveLimiter, DNSCheckerResolver, _DNSChannel
+from app.services.dns_cache import DNSCache
+from tests.stub_servers import DNSServer
+
+@pytest_asyncio.fixture
+async def dns_server():
+    server = DNSServer()
+    server.add('example.com', 'MX', '10 mail.example.com.')
+    server.add('example.com', 'A', '192.0.2.10')
+    server.add('webonly.com', 'A', '192.0.2.20')
+    server.add('norecords.com', 'TXT', '"v=spf1 -all"')
+    server.add('ipv6only.com', 'AAAA', '2001:db8::10')
+    await server.start()
+    yield server
+    await server.stop()
 
 class TestDNSChecker:
-    
+
     @pytest.fixture
-    def dns_checker(self):
-        return DNSChecker()
+    def dns_checker(self, dns_server):
+        return DNSChecker(timeout=0.5, retries=1, nameservers=['127.0.0.1'], port=dns_server.port)
 
     @pytest.mark.asyncio
     async def test_check_mx_records_success(self, dns_checker):
-        mock_records = [MagicMock()]
-        mock_records[0].exchange = "mail.example.com"
-        
-        with patch('dns.resolver.resolve', return_value=mock_records):
-            has_mx, mx_servers = await dns_checker.check_mx_records('example.com')
-            
-            assert has_mx == True
-            assert mx_servers == ['mail.example.com']
+        has_mx, mx_servers = await dns_checker.check_mx_records('example.com')
+
+        assert has_mx == True
+        assert mx_servers == ['mail.example.com.']
 
     @pytest.mark.asyncio
     async def test_check_mx_records_no_records(self, dns_checker):
-        with patch('dns.resolver.resolve', side_effect=dns.exception.DNSException()):
-            has_mx, mx_servers = await dns_checker.check_mx_records('norecords.com')
-            
-            assert has_mx == False
-            assert mx_servers == []
+        has_mx, mx_servers = await dns_checker.check_mx_records('norecords.com')
+
+        assert has_mx == False
+        assert mx_servers == []
 
     @pytest.mark.asyncio
     async def test_check_a_records_success(self, dns_checker):
-        mock_records = [MagicMock()]
-        mock_records[0].__str__ = lambda x: "192.168.1.1"
-        
-        with patch('dns.resolver.resolve', return_value=mock_records):
-            has_a = await dns_checker.check_a_records('example.com')
-            
-            assert has_a == True
+        has_a = await dns_checker.check_a_records('example.com')
+
+        assert has_a == True
 
     @pytest.mark.asyncio
     async def test_check_a_records_no_records(self, dns_checker):
-        with patch('dns.resolver.resolve', side_effect=dns.exception.DNSException()):
-            has_a = await dns_checker.check_a_records('norecords.com')
-            
-            assert has_a == False
+        has_a = await dns_checker.check_a_records('norecords.com')
+
+        assert has_a == False
 
     @pytest.mark.asyncio
     async def test_check_domain_exists_with_mx(self, dns_checker):
-        with patch.object(dns_checker, 'check_mx_records', return_value=(True, ['mail.example.com'])), \
-             patch.object(dns_checker, 'check_a_records', return_value=False):
-            
-            exists = await dns_checker.check_domain_exists('example.com')
-            assert exists == True
+        exists = await dns_checker.check_domain_exists('example.com')
+        assert exists == True
 
     @pytest.mark.asyncio
     async def test_check_domain_exists_with_a_record(self, dns_checker):
-        with patch.object(dns_checker, 'check_mx_records', return_value=(False, [])), \
-             patch.object(dns_checker, 'check_a_records', return_value=True):
-            
-            exists = await dns_checker.check_domain_exists('example.com')
-            assert exists == True
+        exists = await dns_checker.check_domain_exists('webonly.com')
+        assert exists == True
+
+    @pytest.mark.asyncio
+    async def test_check_domain_exists_with_aaaa_only(self, dns_checker):
+        exists = await dns_checker.check_domain_exists('ipv6only.com')
+        assert exists == True
 
     @pytest.mark.asyncio
     async def test_check_domain_not_exists(self, dns_checker):
-        with patch.object(dns_checker, 'check_mx_records', return_value=(False, [])), \
-             patch.object(dns_checker, 'check_a_records', return_value=False):
-            
-            exists = await dns_checker.check_domain_exists('nonexistent.com')
-            assert exists == False
\ No newline at end of file
+        exists = await dns_checker.check_domain_exists('nonexistent.com')
+        assert exists == False
+
+    @pytest.mark.asyncio
+    async def test_lookup_queries_every_type(self, dns_checker, dns_server):
+        result = await dns_checker.lookup('example.com')
+
+        assert result == {
+            'has_mx': True,
+            'has_a': True,
+            'has_aaaa': False,
+            'mx_servers': ['mail.example.com.'],
+            'domain_exists': True,
+            'dns_status': 'noerror',
+            # The AAAA NODATA carries the zone's negative TTL, shorter than the records'
+            'dns_ttl': 60,
+            'resolver_trouble': False
+        }
+        assert dns_server.queries == {('example.com', 'MX'): 1, ('example.com', 'A'): 1, ('example.com', 'AAAA'): 1}
+
+    @pytest.mark.asyncio
+    async def test_cached_answers_report_remaining_ttl(self, dns_checker, dns_server):
+        clock = [0.0]
+        dns_checker.cache.clock = lambda: clock[0]
+        assert (await dns_checker.query('example.com', 'MX')).ttl == 300
+        
+        clock[0] = 100.5
+        
+        assert (await dns_checker.query('example.com', 'MX')).ttl == 199
+
+    @pytest.mark.asyncio
+    async def test_lookup_runs_queries_concurrently(self, dns_checker, dns_server):
+        dns_server.delay = 0.2
+
+        start = time.perf_counter()
+        await asyncio.gather(*(dns_checker.lookup('example.com') for _ in range(20)))
+
+        # 60 queries of 200ms each: well under a second only if none of them wait for another
+        assert time.perf_counter() - start < 0.6
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_retried(self, dns_checker, dns_server):
+        dns_server.delay = 0.7
+
+        has_a = await dns_checker.check_a_records('example.com')
+
+        assert has_a == False
+        assert dns_server.queries[('example.com', 'A')] == 2
+
+class TestDNSOutcomes:
+
+    @pytest.fixture
+    def dns_checker(self, dns_server):
+        return DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=dns_server.port)
+
+    @pytest.mark.asyncio
+    async def test_outcomes_are_distinct(self, dns_checker, dns_server):
+        dns_server.add('broken.com', 'A', '192.0.2.30')
+        dns_server.servfail.add('broken.com')
+        dns_server.add('slow.com', 'A', '192.0.2.40')
+        dns_server.drop.add(('slow.com', 'A'))
+
+        assert await dns_checker.query('example.com', 'A') == DNSAnswer(DNSStatus.NOERROR, ('192.0.2.10',))
+        assert (await dns_checker.query('norecords.com', 'MX')).status == DNSStatus.NODATA
+        assert (await dns_checker.query('missing.com', 'MX')).status == DNSStatus.NXDOMAIN
+        assert (await dns_checker.query('broken.com', 'A')).status == DNSStatus.SERVFAIL
+        assert (await dns_checker.query('slow.com', 'A')).status == DNSStatus.TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_lookup_reports_overall_status(self, dns_checker, dns_server):
+        assert (await dns_checker.lookup('missing.com'))['dns_status'] == 'nxdomain'
+        assert (await dns_checker.lookup('norecords.com'))['dns_status'] == 'nodata'
+        assert (await dns_checker.lookup('ipv6only.com'))['dns_status'] == 'noerror'
+
+    @pytest.mark.asyncio
+    async def test_nxdomain_cancels_sibling_queries(self, dns_checker, dns_server):
+        dns_server.drop.update({('missing.com', 'A'), ('missing.com', 'AAAA')})
+
+        start = time.perf_counter()
+        result = await dns_checker.lookup('missing.com')
+
+        assert result['dns_status'] == 'nxdomain'
+        assert not result['domain_exists']
+        assert time.perf_counter() - start < 0.4
+
+    @pytest.mark.asyncio
+    async def test_nxdomain_answers_every_type_from_cache(self, dns_checker, dns_server):
+        await dns_checker.query('missing.com', 'MX')
+
+        assert (await dns_checker.query('missing.com', 'A')).status == DNSStatus.NXDOMAIN
+        assert ('missing.com', 'A') not in dns_server.queries
+
+class TestDNSCaching:
+
+    @pytest.fixture
+    def clock(self):
+        return [1000.0]
+
+    @pytest.fixture
+    def dns_checker(self, dns_server, clock):
+        cache = DNSCache(max_entries=100, clock=lambda: clock[0])
+        return DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=dns_server.port, cache=cache)
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_is_served_from_cache(self, dns_checker, dns_server):
+        first = await dns_checker.lookup('Example.com')
+        second = await dns_checker.lookup('example.com.')
+
+        assert first == second
+        assert dns_server.queries[('example.com', 'MX')] == 1
+        assert dns_checker.cache.hits == 3
+
+    @pytest.mark.asyncio
+    async def test_answer_is_not_served_past_its_ttl(self, dns_checker, dns_server, clock):
+        dns_server.add('short.com', 'A', '192.0.2.20', ttl=30)
+
+        await dns_checker.check_a_records('short.com')
+        clock[0] += 29
+        await dns_checker.check_a_records('short.com')
+        assert dns_server.queries[('short.com', 'A')] == 1
+
+        clock[0] += 1
+        await dns_checker.check_a_records('short.com')
+        assert dns_server.queries[('short.com', 'A')] == 2
+
+    @pytest.mark.asyncio
+    async def test_nxdomain_is_cached_for_soa_minimum(self, dns_checker, dns_server, clock):
+        dns_server.negative_ttl = 60
+
+        assert await dns_checker.check_mx_records('missing.com') == (False, [])
+        clock[0] += 59
+        assert await dns_checker.check_mx_records('missing.com') == (False, [])
+        assert dns_server.queries[('missing.com', 'MX')] == 1
+
+        clock[0] += 1
+        await dns_checker.check_mx_records('missing.com')
+        assert dns_server.queries[('missing.com', 'MX')] == 2
+
+    @pytest.mark.asyncio
+    async def test_nodata_is_cached(self, dns_checker, dns_server):
+        await dns_checker.check_mx_records('norecords.com')
+        await dns_checker.check_mx_records('norecords.com')
+
+        assert dns_server.queries[('norecords.com', 'MX')] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeouts_are_not_cached(self, dns_checker, dns_server):
+        dns_server.delay = 0.7
+        await dns_checker.check_a_records('example.com')
+        dns_server.delay = 0
+
+        assert await dns_checker.check_a_records('example.com') == True
+
+class TestBulkDNSEngine:
+
+    @pytest_asyncio.fixture
+    async def dns_checker(self, dns_server):
+        checker = DNSChecker(
+            timeout=0.5, retries=1, nameservers=['127.0.0.1'], port=dns_server.port,
+            cache=DNSCache(0), bulk_sockets=2, max_in_flight=16
+        )
+        yield checker
+        await checker.close()
+
+    @pytest.mark.asyncio
+    async def test_answers_match_their_queries(self, dns_checker, dns_server):
+        for i in range(200):
+            dns_server.add(f'host-{i}.com', 'A', f'192.0.2.{i}')
+
+        results = {}
+        async for name, rdtype, answer in dns_checker.resolve_many((f'host-{i}.com', 'A') for i in range(200)):
+            results[name] = answer
+
+        assert len(results) == 200
+        assert all(results[f'host-{i}.com'].records == (f'192.0.2.{i}',) for i in range(200))
+        assert dns_checker.bulk.stats()['sockets'] == 2
+
+    @pytest.mark.asyncio
+    async def test_reports_every_outcome(self, dns_checker, dns_server):
+        dns_server.servfail.add('broken.com')
+        dns_server.add('broken.com', 'A', '192.0.2.30')
+
+        assert (await dns_checker.query('example.com', 'MX')).records == ('mail.example.com.',)
+        assert (await dns_checker.query('norecords.com', 'MX')).status == DNSStatus.NODATA
+        assert (await dns_checker.query('missing.com', 'MX')).status == DNSStatus.NXDOMAIN
+        assert (await dns_checker.query('broken.com', 'A')).status == DNSStatus.SERVFAIL
+
+    @pytest.mark.asyncio
+    async def test_truncated_answer_is_retried_over_tcp(self, dns_checker, dns_server):
+        dns_server.truncate.add('example.com')
+
+        answer = await dns_checker.query('example.com', 'MX')
+
+        assert answer.records == ('mail.example.com.',)
+        assert dns_server.tcp_queries == 1
+        assert dns_checker.bulk.tcp_fallbacks == 1
+
+    @pytest.mark.asyncio
+    async def test_in_flight_queries_are_capped_per_upstream(self, dns_checker, dns_server):
+        dns_server.delay = 0.02
+
+        names = [(f'host-{i}.com', 'A') for i in range(100)]
+        answers = [answer async for _, _, answer in dns_checker.resolve_many(names)]
+
+        assert len(answers) == 100
+        assert dns_server.peak_outstanding <= 16
+
+    @pytest.mark.asyncio
+    async def test_unanswered_query_times_out_and_retries(self, dns_checker, dns_server):
+        dns_server.drop.add(('example.com', 'A'))
+
+        answer = await dns_checker.query('example.com', 'A')
+
+        assert answer.status == DNSStatus.TIMEOUT
+        assert dns_server.queries[('example.com', 'A')] == 2
+        assert dns_checker.bulk.stats()['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_send_error_is_a_servfail_answer(self, dns_checker):
+        await dns_checker.query('example.com', 'A')
+        channels = [channel for family in dns_checker.bulk._channels.values() for channel in family]
+        for channel in channels:
+            channel.transport.sendto = MagicMock(side_effect=OSError("Network is unreachable"))
+
+        answer = await dns_checker.query('example.com', 'MX')
+
+        assert answer.status == DNSStatus.SERVFAIL
+        assert dns_checker.bulk.send_errors == 2
+        assert dns_checker.bulk.stats()['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_ipv6_nameserver_gets_its_own_sockets(self, dns_server):
+        ipv6_server = DNSServer(host='::1')
+        ipv6_server.add('v6.com', 'A', '192.0.2.6')
+        await ipv6_server.start()
+        checker = DNSChecker(
+            timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=dns_server.port,
+            cache=DNSCache(0), bulk_sockets=2
+        )
+        try:
+            assert (await checker.query('example.com', 'A')).records == ('192.0.2.10',)
+            answer, _ = await checker.bulk.query('v6.com', 'A', ('::1', ipv6_server.port))
+            assert checker.bulk.stats()['sockets'] == 4
+        finally:
+            await checker.close()
+            await ipv6_server.stop()
+
+        assert answer.records == ('192.0.2.6',)
+        assert checker.bulk.send_errors == 0
+
+    @pytest.mark.asyncio
+    async def test_lookup_many_yields_each_domain(self, dns_checker):
+        results = dict([item async for item in dns_checker.lookup_many(['example.com', 'missing.com', 'ipv6only.com'])])
+
+        assert results['example.com']['has_mx']
+        assert results['missing.com']['dns_status'] == 'nxdomain'
+        assert results['ipv6only.com']['has_aaaa']
+
+    @pytest.mark.asyncio
+    async def test_answer_for_another_question_is_ignored(self):
+        channel = _DNSChannel()
+        channel.transport = MagicMock()
+        query = dns.message.make_query('example.com', 'A')
+        future = channel.send(query, ('127.0.0.1', 53))
+
+        spoofed = dns.message.make_response(dns.message.make_query('evil.com', 'A'))
+        spoofed.id = query.id
+        channel.datagram_received(spoofed.to_wire(), ('127.0.0.1', 53))
+        channel.datagram_received(dns.message.make_response(query).to_wire(), ('127.0.0.2', 53))
+        assert not future.done()
+
+        channel.datagram_received(dns.message.make_response(query).to_wire(), ('127.0.0.1', 53))
+        assert future.done()
+
+class TestAdaptiveLimiter:
+
+    def test_grows_by_one_per_limits_worth_of_answers(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=10)
+        for _ in range(4):
+            limiter.in_flight += 1
+            limiter.release(limiter.generation, failed=False)
+
+        assert int(limiter.limit) == 4
+        limiter.in_flight += 1
+        limiter.release(limiter.generation, failed=False)
+        assert int(limiter.limit) == 5
+
+    def test_halves_once_per_overload(self):
+        limiter = AdaptiveLimiter(initial=32)
+        generations = [limiter.generation] * 10
+        for generation in generations:
+            limiter.in_flight += 1
+            limiter.release(generation, failed=True)
+
+        assert limiter.limit == 16
+        assert limiter.decreases == 1
+        assert limiter.failures == 10
+
+    def test_never_drops_below_minimum(self):
+        limiter = AdaptiveLimiter(initial=2, minimum=1)
+        for _ in range(50):
+            limiter.in_flight += 1
+            limiter.release(limiter.generation, failed=True)
+
+        assert limiter.limit == 1
+
+    def test_occasional_failures_do_not_cut(self):
+        limiter = AdaptiveLimiter(initial=32)
+        for i in range(100):
+            limiter.in_flight += 1
+            # One broken domain in every ten answers, the rest clean
+            limiter.release(limiter.generation, failed=i % 10 == 0)
+
+        assert limiter.decreases == 0
+        assert limiter.limit >= 32
+
+    def test_retries_of_a_failing_domain_do_not_cut(self):
+        limiter = AdaptiveLimiter(initial=32)
+        for _ in range(20):
+            limiter.in_flight += 1
+            limiter.release(limiter.generation, failed=False)
+        for attempt in range(4):
+            limiter.in_flight += 1
+            limiter.release(limiter.generation, failed=True, retry=attempt > 0)
+        for _ in range(10):
+            limiter.in_flight += 1
+            limiter.release(limiter.generation, failed=False)
+
+        assert limiter.decreases == 0
+        assert limiter.failures == 4
+
+    def test_abandoned_queries_do_not_move_the_limit(self):
+        limiter = AdaptiveLimiter(initial=8)
+        limiter.in_flight += 1
+        limiter.release(limiter.generation, failed=None)
+
+        assert limiter.limit == 8
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_a_free_slot(self):
+        limiter = AdaptiveLimiter(initial=1)
+        generation = await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        limiter.release(generation, failed=False)
+        await asyncio.wait_for(waiting, 1)
+        assert limiter.in_flight == 1
+
+class TestResolverTrouble:
+
+    @pytest_asyncio.fixture(params=[0, 2], ids=['resolver', 'bulk'])
+    async def dns_checker(self, request, dns_server):
+        checker = DNSChecker(
+            timeout=0.3, retries=3, nameservers=['127.0.0.1'], port=dns_server.port,
+            bulk_sockets=request.param, max_in_flight=64, retry_backoff=0.01
+        )
+        yield checker
+        await checker.close()
+
+    @pytest.mark.asyncio
+    async def test_transient_servfail_is_retried(self, dns_checker, dns_server):
+        dns_server.flaky['example.com'] = 2
+
+        answer = await dns_checker.query('example.com', 'A')
+
+        assert answer.status == DNSStatus.NOERROR
+        assert dns_server.queries[('example.com', 'A')] == 3
+
+    @pytest.mark.asyncio
+    async def test_persistent_servfail_is_not_no_records(self, dns_checker, dns_server):
+        dns_server.servfail.add('example.com')
+
+        result = await dns_checker.lookup('example.com')
+
+        assert result['dns_status'] == 'servfail'
+        assert result['resolver_trouble']
+        assert not result['domain_exists']
+
+        dns_server.servfail.clear()
+        assert (await dns_checker.lookup('example.com'))['domain_exists']
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('name', ['.com', 'a..com', 'x' * 64 + '.com'])
+    async def test_malformed_name_is_invalid_not_resolver_trouble(self, dns_checker, dns_server, name):
+        result = await dns_checker.lookup(name)
+
+        assert result['dns_status'] == 'invalid'
+        assert not result['resolver_trouble']
+        assert not result['domain_exists']
+        assert not dns_server.queries
+
+    @pytest.mark.asyncio
+    async def test_lost_aaaa_does_not_matter_when_mx_and_a_answered(self, dns_checker):
+        answers = {
+            'MX': DNSAnswer(DNSStatus.NOERROR, ('mail.example.com.',)),
+            'A': DNSAnswer(DNSStatus.NOERROR, ('192.0.2.1',)),
+            'AAAA': DNSAnswer(DNSStatus.TIMEOUT)
+        }
+        with patch.object(dns_checker, 'query', side_effect=lambda name, rdtype: answers[rdtype]):
+            result = await dns_checker.lookup('example.com')
+
+        assert result['domain_exists']
+        assert not result['resolver_trouble']
+
+    @pytest.mark.asyncio
+    async def test_lost_aaaa_matters_without_mx_or_a(self, dns_checker):
+        answers = {
+            'MX': DNSAnswer(DNSStatus.NODATA),
+            'A': DNSAnswer(DNSStatus.NODATA),
+            'AAAA': DNSAnswer(DNSStatus.SERVFAIL)
+        }
+        with patch.object(dns_checker, 'query', side_effect=lambda name, rdtype: answers[rdtype]):
+            result = await dns_checker.lookup('example.com')
+
+        assert result['resolver_trouble']
+
+    @pytest.mark.asyncio
+    async def test_concurrency_backs_off_under_overload(self, dns_checker, dns_server):
+        dns_server.delay = 0.05
+        dns_server.capacity = 8
+        names = [(f'host-{i}.com', 'A') for i in range(300)]
+        for name, _ in names:
+            dns_server.add(name, 'A', '192.0.2.1')
+
+        statuses = [answer.status async for _, _, answer in dns_checker.resolve_many(names)]
+
+        limiter = dns_checker.upstreams[0].limiter
+        assert limiter.decreases >= 1
+        assert limiter.limit < 32
+        assert statuses.count(DNSStatus.NOERROR) >= 0.95 * len(names)
+
+class TestDNSCheckerResolver:
+
+    @pytest.fixture
+    def resolver(self, dns_server):
+        return DNSCheckerResolver(DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=dns_server.port))
+
+    @pytest.mark.asyncio
+    async def test_resolves_from_checker_cache(self, resolver, dns_server):
+        hosts = await resolver.resolve('example.com', 443, socket.AF_INET)
+        await resolver.resolve('example.com', 443, socket.AF_INET)
+
+        assert [(host['host'], host['port']) for host in hosts] == [('192.0.2.10', 443)]
+        assert dns_server.queries[('example.com', 'A')] == 1
+
+    @pytest.mark.asyncio
+    async def test_unspecified_family_includes_ipv6(self, resolver):
+        hosts = await resolver.resolve('ipv6only.com', 80, socket.AF_UNSPEC)
+
+        assert [(host['host'], host['family']) for host in hosts] == [('2001:db8::10', socket.AF_INET6)]
+
+    @pytest.mark.asyncio
+    async def test_literal_address_is_not_looked_up(self, resolver, dns_server):
+        hosts = await resolver.resolve('127.0.0.1', 80)
+
+        assert hosts[0]['host'] == '127.0.0.1'
+        assert dns_server.total_queries == 0
+
+    @pytest.mark.asyncio
+    async def test_no_address_raises_oserror(self, resolver):
+        with pytest.raises(OSError):
+            await resolver.resolve('norecords.com', 443, socket.AF_INET)
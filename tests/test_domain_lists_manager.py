@@ -1,8 +1,21 @@
 import pytest
+import pytest_asyncio
 import asyncio
-from unittest.mock import patch, AsyncMock, mock_open
+import os
+from unittest.mock import patch, AsyncMock, MagicMock, mock_open
 import aiohttp
+from app.core.config import settings
 from app.services.domain_lists_manager import DomainListsManager
+from tests.stub_servers import ListServer
+
+@pytest_asyncio.fixture
+async def list_server():
+    server = ListServer()
+    server.set_list("/a.txt", ["temp-a.com", "shared.com", "gone-soon.com"])
+    server.set_list("/b.txt", ["temp-b.com", "shared.com"])
+    await server.start()
+    yield server
+    await server.stop()
 
 class TestDomainListsManager:
     
@@ -12,9 +25,10 @@ class TestDomainListsManager:
 
     @pytest.mark.asyncio
     async def test_fetch_domain_list_success(self, domain_lists_manager):
-        mock_session = AsyncMock()
+        mock_session = MagicMock()
         mock_response = AsyncMock()
         mock_response.status = 200
+        mock_response.headers = {}
         mock_response.text.return_value = "example.com\ntest.com\n# Comment\ninvalid_line"
         mock_session.get.return_value.__aenter__.return_value = mock_response
         
@@ -97,8 +111,256 @@ class TestDomainListsManager:
         assert domain_lists_manager.get_domain_category('gmail.com') == 'public_provider'
         assert domain_lists_manager.get_domain_category('example.com') == 'unknown'
 
+    def test_subdomains_of_listed_domains(self, domain_lists_manager):
+        domain_lists_manager.disposable_domains.add('mailinator.com')
+        
+        assert domain_lists_manager.is_disposable_domain('x7f.mailinator.com') == True
+        assert domain_lists_manager.is_disposable_domain('a.b.mailinator.com') == True
+        assert domain_lists_manager.is_disposable_domain('notmailinator.com') == False
+        assert domain_lists_manager.is_public_provider('eu.gmail.com') == True
+
+    def test_match_category(self, domain_lists_manager):
+        domain_lists_manager.disposable_domains.add('temp.edu')
+        
+        assert domain_lists_manager.match_category('cs.stanford.edu') == 'educational'
+        assert domain_lists_manager.match_category('parliament.gov.uk') == 'government'
+        # A listed domain is more telling than the suffix it sits under
+        assert domain_lists_manager.match_category('x.temp.edu') == 'disposable'
+        assert domain_lists_manager.match_category('example.com') is None
+
+    def test_private_section_suffixes_are_not_academic_or_governmental(self, domain_lists_manager):
+        # ac.ru, edu.ru and gov.ru are privately run registrations in the suffix list
+        assert domain_lists_manager.match_category('msu.ac.ru') is None
+        assert domain_lists_manager.suffix_category('school.edu.ru') is None
+        assert domain_lists_manager.suffix_category('kremlin.gov.ru') is None
+        assert domain_lists_manager.suffix_category('tsinghua.edu.cn') == 'educational'
+
+    def test_tld_entries_do_not_match_everything(self, domain_lists_manager):
+        domain_lists_manager.disposable_domains.add('com')
+        
+        assert domain_lists_manager.is_disposable_domain('example.com') == False
+
+    def test_public_suffix_entries_do_not_match_registrations(self, domain_lists_manager):
+        domain_lists_manager.disposable_domains.add('github.io')
+        domain_lists_manager.disposable_domains.add('burner.co.uk')
+        
+        assert domain_lists_manager.is_disposable_domain('someone.github.io') == False
+        assert domain_lists_manager.is_disposable_domain('x.burner.co.uk') == True
+
     @pytest.mark.asyncio
     async def test_initialize(self, domain_lists_manager):
         with patch.object(domain_lists_manager, 'update_disposable_lists', return_value={}):
             await domain_lists_manager.initialize()
-            # Should complete without error
\ No newline at end of file
+            # Should complete without error
+
+class TestDomainListsRefresh:
+    
+    @pytest.fixture
+    def manager(self, list_server):
+        manager = DomainListsManager()
+        manager.disposable_sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_refresh_uses_conditional_requests(self, manager, list_server):
+        await manager.update_disposable_lists()
+        first = manager.disposable_domains
+        
+        results = await manager.update_disposable_lists()
+        
+        assert list_server.requests["/a.txt"] == 2
+        assert list_server.not_modified["/a.txt"] == 1
+        assert list_server.not_modified["/b.txt"] == 1
+        assert manager.disposable_domains == first
+        assert results[list_server.url("/a.txt")] == 3
+
+    @pytest.mark.asyncio
+    async def test_refresh_uses_owner_session(self, manager, list_server):
+        session = aiohttp.ClientSession()
+        manager.http_session = session
+        try:
+            with patch('aiohttp.ClientSession') as mock_session_class:
+                await manager.update_disposable_lists()
+                await manager.update_disposable_lists()
+            
+            mock_session_class.assert_not_called()
+            assert not session.closed
+            assert manager.is_disposable_domain("temp-a.com")
+        finally:
+            await session.close()
+
+    @pytest.mark.asyncio
+    async def test_refresh_picks_up_removals(self, manager, list_server):
+        await manager.update_disposable_lists()
+        assert manager.is_disposable_domain("gone-soon.com")
+        
+        list_server.set_list("/a.txt", ["temp-a.com", "shared.com"], modified_at=1800000000.0)
+        await manager.update_disposable_lists()
+        
+        assert not manager.is_disposable_domain("gone-soon.com")
+        assert manager.is_disposable_domain("temp-a.com")
+
+    @pytest.mark.asyncio
+    async def test_refresh_swaps_in_new_set(self, manager, list_server):
+        await manager.update_disposable_lists()
+        previous = manager.disposable_domains
+        
+        list_server.set_list("/b.txt", ["temp-b.com", "new.com"], modified_at=1800000000.0)
+        await manager.update_disposable_lists()
+        
+        # The old set object is left untouched for readers still holding it
+        assert "new.com" not in previous
+        assert manager.disposable_domains is not previous
+        assert "new.com" in manager.disposable_domains
+
+    @pytest.mark.asyncio
+    async def test_failed_source_keeps_last_good_snapshot(self, manager, list_server):
+        await manager.update_disposable_lists()
+        
+        list_server.fail("/a.txt")
+        results = await manager.update_disposable_lists()
+        
+        assert manager.is_disposable_domain("temp-a.com")
+        assert manager.is_disposable_domain("gone-soon.com")
+        assert results[list_server.url("/a.txt")] == 3
+
+    @pytest.mark.asyncio
+    async def test_background_refresh(self, manager, list_server):
+        manager.start_background_refresh(interval=0.05)
+        try:
+            for _ in range(100):
+                if list_server.requests.get("/a.txt", 0) >= 2:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await manager.stop_background_refresh()
+        
+        assert list_server.requests["/a.txt"] >= 2
+        assert manager.is_disposable_domain("temp-b.com")
+        assert manager._refresh_task is None
+
+class TestDomainListsSnapshot:
+    
+    @pytest.mark.asyncio
+    async def test_refresh_writes_snapshot_and_boot_loads_it(self, list_server):
+        sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+        manager = DomainListsManager()
+        manager.disposable_sources = sources
+        await manager.update_disposable_lists()
+        
+        booted = DomainListsManager()
+        booted.disposable_sources = sources
+        with patch.object(booted, 'update_disposable_lists') as mock_update:
+            await booted.initialize()
+            mock_update.assert_not_called()
+        
+        assert booted.loaded_from_snapshot
+        assert booted.disposable_domains == manager.disposable_domains
+        assert booted.public_provider_domains == manager.public_provider_domains
+
+    @pytest.mark.asyncio
+    async def test_snapshot_restores_conditional_request_state(self, list_server):
+        sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+        manager = DomainListsManager()
+        manager.disposable_sources = sources
+        await manager.update_disposable_lists()
+        
+        booted = DomainListsManager()
+        booted.disposable_sources = sources
+        await booted.initialize()
+        
+        list_server.fail("/b.txt")
+        await booted.update_disposable_lists()
+        
+        assert list_server.not_modified["/a.txt"] == 1
+        # The failing source is still served from the snapshot copy
+        assert booted.is_disposable_domain("temp-b.com")
+
+    @pytest.mark.asyncio
+    async def test_initialize_without_snapshot_fetches(self):
+        domain_lists_manager = DomainListsManager()
+        with patch.object(domain_lists_manager, 'update_disposable_lists', return_value={}) as mock_update:
+            await domain_lists_manager.initialize()
+            mock_update.assert_called_once()
+        
+        assert not domain_lists_manager.loaded_from_snapshot
+
+    @pytest.mark.asyncio
+    async def test_refresh_serves_lists_from_mapped_snapshot(self, list_server):
+        manager = DomainListsManager()
+        manager.disposable_sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+        await manager.update_disposable_lists()
+        
+        assert manager._compiled is not None
+        assert manager._source_snapshots == {}
+        assert manager.is_disposable_domain("temp-a.com")
+        assert manager.get_domain_category("shared.com") == "disposable"
+        assert len(manager.disposable_domains) == 4
+
+    @pytest.mark.asyncio
+    async def test_refresh_without_snapshot_path_keeps_heap_lists(self, list_server):
+        manager = DomainListsManager()
+        manager.snapshot_path = ""
+        manager.disposable_sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+        await manager.update_disposable_lists()
+        
+        assert manager._compiled is None
+        assert manager.is_disposable_domain("temp-b.com")
+        assert len(manager.disposable_domains) == 4
+
+class TestSharedSnapshot:
+    
+    @pytest.fixture
+    def make_manager(self, list_server):
+        def make():
+            manager = DomainListsManager()
+            manager.disposable_sources = [list_server.url("/a.txt"), list_server.url("/b.txt")]
+            return manager
+        return make
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_refresh_keeps_lists_off_the_heap(self, make_manager, list_server):
+        await make_manager().update_disposable_lists()
+        written = os.stat(settings.lists_snapshot_path)
+        
+        booted = make_manager()
+        await booted.initialize()
+        await booted.update_disposable_lists()
+        
+        assert list_server.not_modified["/a.txt"] == 1
+        assert list_server.not_modified["/b.txt"] == 1
+        assert booted._source_snapshots == {}
+        assert os.stat(settings.lists_snapshot_path).st_ino == written.st_ino
+    
+    @pytest.mark.asyncio
+    async def test_one_worker_refreshes_and_the_others_remap(self, make_manager, list_server):
+        writer, reader = make_manager(), make_manager()
+        await writer.update_disposable_lists()
+        await reader.initialize()
+        
+        list_server.set_list("/b.txt", ["temp-b.com", "new.com"], modified_at=1800000000.0)
+        async with writer._snapshot_writer() as owner:
+            assert owner
+            await reader.update_disposable_lists()
+            assert list_server.requests["/b.txt"] == 1
+            await writer._refresh_lists()
+        
+        assert not reader.is_disposable_domain("new.com")
+        assert reader.remap_if_changed()
+        assert reader.is_disposable_domain("new.com")
+        assert reader._source_snapshots == {}
+        assert not reader.remap_if_changed()
+    
+    @pytest.mark.asyncio
+    async def test_starting_workers_wait_for_the_first_snapshot(self, make_manager, list_server):
+        writer, waiting = make_manager(), make_manager()
+        async with writer._snapshot_writer() as owner:
+            assert owner
+            started = asyncio.ensure_future(waiting.initialize())
+            await asyncio.sleep(0.05)
+            assert not started.done()
+            await writer._refresh_lists()
+        await asyncio.wait_for(started, 2)
+        
+        assert waiting.is_disposable_domain("temp-a.com")
+        assert list_server.requests["/a.txt"] == 1
@@ -0,0 +1,129 @@
+import pytest
+from app.services.domain_snapshot import (
+    write_snapshot, open_snapshot, DomainSnapshot, SnapshotError, CompactDomainSet
+)
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "lists.snapshot")
+
+@pytest.fixture
+def sources():
+    return [
+        {'name': 'list-a', 'category': 'disposable', 'domains': ['b.com', 'a.com', 'shared.com', 'a.com'],
+         'etag': '"abc"', 'last_modified': 'Tue, 14 Nov 2023 22:13:20 GMT'},
+        {'name': 'list-b', 'category': 'disposable', 'domains': ['shared.com', 'c.com']},
+        {'name': 'hubspot_list', 'category': 'public_provider', 'domains': ['gmail.com']}
+    ]
+
+class TestDomainSnapshot:
+    
+    def test_round_trip_sorted_and_deduplicated(self, snapshot_path, sources):
+        count = write_snapshot(snapshot_path, sources)
+        snapshot = DomainSnapshot(snapshot_path)
+        
+        assert count == 5
+        assert len(snapshot) == 5
+        assert [domain for domain, _ in snapshot.entries()] == ['a.com', 'b.com', 'c.com', 'gmail.com', 'shared.com']
+        snapshot.close()
+
+    def test_lookup_returns_provenance(self, snapshot_path, sources):
+        write_snapshot(snapshot_path, sources)
+        snapshot = DomainSnapshot(snapshot_path)
+        
+        assert snapshot.lookup('a.com') == 0b001
+        assert snapshot.lookup('shared.com') == 0b011
+        assert snapshot.lookup('gmail.com') == 0b100
+        assert snapshot.lookup('missing.com') == 0
+        assert 'c.com' in snapshot
+        assert 'zzz.com' not in snapshot
+        assert snapshot.category_mask('disposable') == 0b011
+        snapshot.close()
+
+    def test_non_ascii_domains_are_stored_as_idna(self, snapshot_path):
+        write_snapshot(snapshot_path, [
+            {'name': 'list-a', 'category': 'disposable', 'domains': ['münchen.de', 'bad..ü.de']}
+        ])
+        snapshot = DomainSnapshot(snapshot_path)
+
+        assert 'münchen.de' in snapshot
+        assert 'xn--mnchen-3ya.de' in snapshot
+        assert 'mnchen.de' not in snapshot
+        assert [domain for domain, _ in snapshot.entries()] == ['xn--mnchen-3ya.de']
+        snapshot.close()
+
+    def test_source_metadata(self, snapshot_path, sources):
+        write_snapshot(snapshot_path, sources)
+        snapshot = DomainSnapshot(snapshot_path)
+        
+        assert snapshot.sources[0]['etag'] == '"abc"'
+        assert snapshot.sources[0]['count'] == 3
+        assert snapshot.domains_by_source() == {
+            'list-a': ['a.com', 'b.com', 'shared.com'],
+            'list-b': ['c.com', 'shared.com'],
+            'hubspot_list': ['gmail.com']
+        }
+        snapshot.close()
+
+    def test_empty_snapshot(self, snapshot_path):
+        write_snapshot(snapshot_path, [{'name': 'empty', 'category': 'disposable', 'domains': []}])
+        snapshot = DomainSnapshot(snapshot_path)
+        
+        assert len(snapshot) == 0
+        assert 'a.com' not in snapshot
+        assert list(snapshot.entries()) == []
+        snapshot.close()
+
+    def test_rejects_foreign_file(self, snapshot_path):
+        with open(snapshot_path, 'wb') as f:
+            f.write(b"not a snapshot at all, just some bytes")
+        
+        with pytest.raises(SnapshotError):
+            DomainSnapshot(snapshot_path)
+
+    def test_rejects_truncated_file(self, snapshot_path, sources):
+        write_snapshot(snapshot_path, sources)
+        with open(snapshot_path, 'rb') as f:
+            data = f.read()
+        with open(snapshot_path, 'wb') as f:
+            f.write(data[:-4])
+        
+        with pytest.raises(SnapshotError):
+            DomainSnapshot(snapshot_path)
+
+    def test_open_missing_snapshot(self, snapshot_path):
+        assert open_snapshot(snapshot_path) is None
+
+class TestCompactDomainSet:
+    
+    @pytest.fixture
+    def snapshot(self, snapshot_path, sources):
+        write_snapshot(snapshot_path, sources)
+        snapshot = DomainSnapshot(snapshot_path)
+        yield snapshot
+        snapshot.close()
+
+    def test_membership_by_category(self, snapshot):
+        disposable = CompactDomainSet(snapshot, snapshot.category_mask('disposable'))
+        public = CompactDomainSet(snapshot, snapshot.category_mask('public_provider'), ['yahoo.com'])
+        
+        assert 'shared.com' in disposable
+        assert 'gmail.com' not in disposable
+        assert 'gmail.com' in public
+        assert 'yahoo.com' in public
+        assert 'a.com' not in public
+
+    def test_len_iter_and_equality(self, snapshot):
+        disposable = CompactDomainSet(snapshot, snapshot.category_mask('disposable'), ['a.com', 'extra.com'])
+        
+        assert len(disposable) == 5
+        assert sorted(disposable) == ['a.com', 'b.com', 'c.com', 'extra.com', 'shared.com']
+        assert disposable == {'a.com', 'b.com', 'c.com', 'extra.com', 'shared.com'}
+
+    def test_overlay_additions(self):
+        domains = CompactDomainSet()
+        domains.add('tempmail.com')
+        domains.update(['other.com'])
+        
+        assert 'tempmail.com' in domains
+        assert len(domains) == 2
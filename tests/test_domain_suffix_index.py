@@ -0,0 +1,31 @@
+import pytest
+from app.services.domain_suffix_index import SuffixTrie, default_suffix_rules
+
+class TestSuffixTrie:
+    
+    @pytest.fixture
+    def trie(self):
+        return SuffixTrie({'edu': 'educational', 'ac.uk': 'educational', 'gov.uk': 'government'})
+
+    def test_walk_yields_parents_from_tld_inwards(self, trie):
+        assert list(trie.walk('www.ox.ac.uk')) == [
+            ('uk', None),
+            ('ac.uk', 'educational'),
+            ('ox.ac.uk', None),
+            ('www.ox.ac.uk', None)
+        ]
+
+    def test_match_requires_a_label_below_the_rule(self, trie):
+        assert trie.match('ox.ac.uk') == 'educational'
+        assert trie.match('dept.ox.ac.uk') == 'educational'
+        assert trie.match('ac.uk') is None
+        assert trie.match('parliament.gov.uk') == 'government'
+        assert trie.match('example.co.uk') is None
+
+    def test_default_rules(self):
+        rules = default_suffix_rules()
+        
+        assert rules.match('harvard.edu') == 'educational'
+        assert rules.match('whitehouse.gov') == 'government'
+        assert rules.match('interieur.gouv.fr') == 'government'
+        assert rules.match('google.com') is None
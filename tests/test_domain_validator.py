@@ -1,10 +1,11 @@
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
-from app.services.domain_validator import DomainValidator
+from unittest.mock import patch, MagicMock
+from app.services.domain_validator import DomainValidator, ValidationContext
 from app.services.dns_checker import DNSChecker
-from app.services.http_checker import HTTPChecker
-from app.models.schemas import DomainType, ValidationStatus, Recommendation
+from app.services.mx_index import MailProvider
+from tests.stub_servers import DNSServer, InMemoryRedis
+from app.models.schemas import DomainType, ValidationStatus, Recommendation, ValidationProfile
 
 @pytest.fixture
 def domain_validator():
@@ -65,6 +66,49 @@ class TestDomainValidator:
             assert result.domain_type == DomainType.DISPOSABLE
             assert result.recommendation == Recommendation.REJECT
 
+    @pytest.mark.asyncio
+    async def test_validate_subdomain_of_disposable_domain(self, domain_validator, mock_dns_results, mock_http_results):
+        domain_validator.domain_lists.disposable_domains.add('mailinator.com')
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('x7f.mailinator.com')
+            
+            assert result.domain_type == DomainType.DISPOSABLE
+            assert result.recommendation == Recommendation.REJECT
+
+    @pytest.mark.asyncio
+    async def test_subdomains_share_registrable_domain_probes(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results) as mock_dns, \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None) as mock_get, \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('mail.corp.example.co.uk')
+            
+            mock_get.assert_called_with('example.co.uk', ValidationProfile.FULL)
+            mock_dns.assert_called_with('example.co.uk')
+            assert mock_set.call_args[0][0] == 'example.co.uk'
+            assert result.domain == 'mail.corp.example.co.uk'
+            assert result.registrable_domain == 'example.co.uk'
+
+    @pytest.mark.asyncio
+    async def test_cached_result_keeps_requested_domain(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            cached = await domain_validator.validate_domain('example.co.uk')
+        
+        with patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=cached):
+            result = await domain_validator.validate_domain('www.example.co.uk')
+        
+        assert result.domain == 'www.example.co.uk'
+        assert result.domain_type == cached.domain_type
+
     @pytest.mark.asyncio
     async def test_validate_unreachable_domain(self, domain_validator):
         mock_dns = {'has_mx': False, 'has_a': False, 'mx_servers': [], 'domain_exists': False}
@@ -126,14 +170,20 @@ class TestDomainValidator:
             assert result.recommendation == Recommendation.MANUAL_REVIEW
 
     def test_is_educational_domain(self, domain_validator):
-        assert domain_validator._is_educational_domain('harvard.edu') == True
-        assert domain_validator._is_educational_domain('oxford.ac.uk') == True
-        assert domain_validator._is_educational_domain('google.com') == False
+        assert domain_validator.domain_lists.suffix_category('harvard.edu') == 'educational'
+        assert domain_validator.domain_lists.suffix_category('oxford.ac.uk') == 'educational'
+        assert domain_validator.domain_lists.suffix_category('google.com') is None
 
     def test_is_government_domain(self, domain_validator):
-        assert domain_validator._is_government_domain('whitehouse.gov') == True
-        assert domain_validator._is_government_domain('parliament.gov.uk') == True
-        assert domain_validator._is_government_domain('google.com') == False
+        assert domain_validator.domain_lists.suffix_category('whitehouse.gov') == 'government'
+        assert domain_validator.domain_lists.suffix_category('parliament.gov.uk') == 'government'
+        assert domain_validator.domain_lists.suffix_category('google.com') is None
+
+    def test_academic_and_government_public_suffixes(self, domain_validator):
+        assert domain_validator.domain_lists.suffix_category('tsinghua.edu.cn') == 'educational'
+        assert domain_validator.domain_lists.suffix_category('iitb.ac.in') == 'educational'
+        assert domain_validator.domain_lists.suffix_category('sat.gob.mx') == 'government'
+        assert domain_validator.domain_lists.suffix_category('ac.uk') is None
 
     def test_is_suspicious_domain(self, domain_validator):
         mock_dns = {'has_mx': False, 'has_a': True, 'mx_servers': [], 'domain_exists': True}
@@ -181,4 +231,549 @@ class TestDomainValidator:
         
         # Medium quality domain
         rec = domain_validator._generate_recommendation(DomainType.CORPORATE, 5.0)
-        assert rec == Recommendation.MANUAL_REVIEW
\ No newline at end of file
+        assert rec == Recommendation.MANUAL_REVIEW
+
+class TestValidationPipeline:
+    
+    @pytest.mark.asyncio
+    async def test_public_provider_skips_network_stages(self, domain_validator):
+        with patch.object(domain_validator, '_perform_dns_checks') as mock_dns, \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None) as mock_get:
+            
+            result = await domain_validator.validate_domain('gmail.com')
+            
+            assert result.domain_type == DomainType.PUBLIC_PROVIDER
+            assert result.validation_status == ValidationStatus.VALID
+            assert result.stages == ['normalize', 'overrides', 'lists']
+            mock_get.assert_not_called()
+            mock_dns.assert_not_called()
+            mock_http.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_list_hits_score_without_record_metadata(self, domain_validator):
+        domain_validator.domain_lists.disposable_domains.add('tempmail.com')
+
+        with patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None):
+            provider = await domain_validator.validate_domain('gmail.com')
+            disposable = await domain_validator.validate_domain('tempmail.com')
+
+        # Nothing was looked up, so only the type's base score counts
+        assert provider.quality_score == 5.0
+        assert provider.recommendation == Recommendation.MANUAL_REVIEW
+        assert disposable.quality_score == 1.0
+        assert disposable.recommendation == Recommendation.REJECT
+        for result in (provider, disposable):
+            assert result.metadata.dns_status is None
+            assert not result.metadata.has_mx_record
+            assert not result.metadata.website_accessible
+
+    @pytest.mark.asyncio
+    async def test_educational_domain_skips_http(self, domain_validator, mock_dns_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('cs.stanford.edu')
+            
+            assert result.domain_type == DomainType.EDUCATIONAL
+            assert result.stages == ['normalize', 'overrides', 'lists', 'cache', 'dns']
+            mock_http.assert_not_called()
+            mock_set.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_missing_domain_skips_http(self, domain_validator):
+        mock_dns = {'has_mx': False, 'has_a': False, 'mx_servers': [], 'domain_exists': False}
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns), \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('nonexistent-example.com')
+            
+            assert result.domain_type == DomainType.UNREACHABLE
+            assert result.stages[-1] == 'dns'
+            mock_http.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_corporate_domain_runs_every_stage(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('example.com')
+            
+            assert result.stages == ['normalize', 'overrides', 'lists', 'cache', 'dns', 'http']
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_records_stages(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            cached = await domain_validator.validate_domain('example.com')
+        
+        with patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=cached), \
+             patch.object(domain_validator, '_perform_dns_checks') as mock_dns:
+            result = await domain_validator.validate_domain('example.com')
+        
+        assert result.stages == ['normalize', 'overrides', 'lists', 'cache']
+        mock_dns.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_blacklist_override_wins(self, domain_validator):
+        record = MagicMock(is_blacklisted=True, is_whitelisted=False, manual_classification=True)
+        domain_validator.update_override('gmail.com', record)
+        
+        result = await domain_validator.validate_domain('GMAIL.com')
+        
+        assert result.domain_type == DomainType.SUSPICIOUS
+        assert result.recommendation == Recommendation.REJECT
+        assert result.stages == ['normalize', 'overrides']
+
+    @pytest.mark.asyncio
+    async def test_override_applies_to_subdomains_and_can_be_removed(self, domain_validator):
+        record = MagicMock(is_blacklisted=False, is_whitelisted=True, manual_classification=True, quality_score=10.0)
+        record.domain_type.value = 'corporate'
+        domain_validator.update_override('example.com', record)
+        
+        result = await domain_validator.validate_domain('mail.example.com')
+        assert result.domain_type == DomainType.CORPORATE
+        assert result.recommendation == Recommendation.ACCEPT
+        
+        record.is_whitelisted = False
+        record.manual_classification = False
+        domain_validator.update_override('example.com', record)
+        assert 'example.com' not in domain_validator.overrides
+
+    @pytest.mark.asyncio
+    async def test_override_changed_by_another_worker_is_reloaded(self, domain_validator):
+        record = MagicMock(is_blacklisted=True, is_whitelisted=False, manual_classification=True)
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = record
+        
+        with patch('app.services.domain_validator.SessionLocal', return_value=db):
+            domain_validator.reload_override('example.com')
+        
+        result = await domain_validator.validate_domain('example.com')
+        assert result.recommendation == Recommendation.REJECT
+        db.close.assert_called_once()
+        
+        db.query.return_value.filter.return_value.first.return_value = None
+        with patch('app.services.domain_validator.SessionLocal', return_value=db):
+            domain_validator.reload_override('example.com')
+        assert 'example.com' not in domain_validator.overrides
+
+class TestBatchValidation:
+    
+    @pytest.mark.asyncio
+    async def test_cached_domains_resolved_before_probing(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            cached = await domain_validator.validate_domain('cached.com')
+        
+        with patch.object(domain_validator.cache_service, 'get_many', return_value={'cached.com': cached}) as mock_get, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation') as mock_get_one, \
+             patch.object(domain_validator.cache_service, 'set_many') as mock_set, \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set_one, \
+             patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results) as mock_dns, \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results):
+            results = await domain_validator.validate_many(['www.cached.com', 'fresh.com', 'mail.fresh.com'])
+        
+        mock_get.assert_called_once_with(['cached.com', 'fresh.com', 'fresh.com'], ValidationProfile.FULL)
+        mock_get_one.assert_not_called()
+        mock_set_one.assert_not_called()
+        # fresh.com was probed once; its subdomain took the result written by the batch
+        mock_dns.assert_called_once_with('fresh.com')
+        assert [result.domain for result in results] == ['www.cached.com', 'fresh.com', 'mail.fresh.com']
+        assert results[0].stages == ['normalize', 'overrides', 'lists', 'cache']
+        assert results[2].stages == ['normalize', 'overrides', 'lists', 'cache']
+        (entries,), _ = mock_set.call_args
+        assert [(domain, profile) for domain, _, profile, _ in entries] == [('fresh.com', None)]
+
+    @pytest.mark.asyncio
+    async def test_failed_domain_does_not_stop_batch(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator.cache_service, 'get_many', return_value={}), \
+             patch.object(domain_validator.cache_service, 'set_many'), \
+             patch.object(domain_validator, '_perform_dns_checks', side_effect=[RuntimeError('boom'), mock_dns_results]), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results):
+            results = await domain_validator.validate_many(['broken.com', 'example.com'])
+        
+        assert results[0] is None
+        assert results[1].domain == 'example.com'
+
+class TestSharedCacheEntries:
+    
+    @pytest.fixture
+    def cached_validator(self, domain_validator):
+        domain_validator.cache_service.redis_client = InMemoryRedis()
+        return domain_validator
+
+    @pytest.mark.asyncio
+    async def test_name_specific_verdict_does_not_leak_to_registrable(self, cached_validator, mock_dns_results, mock_http_results):
+        with patch.object(cached_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(cached_validator, '_perform_http_checks', return_value=mock_http_results):
+            subdomain = await cached_validator.validate_domain('test.acme.com')
+            registrable = await cached_validator.validate_domain('acme.com')
+        
+        assert subdomain.domain_type == DomainType.SUSPICIOUS
+        assert registrable.domain_type == DomainType.CORPORATE
+        assert registrable.stages[-1] == 'http'
+
+    @pytest.mark.asyncio
+    async def test_name_specific_verdict_does_not_leak_within_batch(self, cached_validator, mock_dns_results, mock_http_results):
+        with patch.object(cached_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(cached_validator, '_perform_http_checks', return_value=mock_http_results):
+            results = await cached_validator.validate_many(['test.acme.com', 'acme.com', 'www.acme.com'])
+        
+        assert [result.domain_type for result in results] == \
+            [DomainType.SUSPICIOUS, DomainType.CORPORATE, DomainType.CORPORATE]
+        # www adds nothing to the name, so it takes the entry acme.com left
+        assert results[2].stages[-1] == 'cache'
+
+class TestStaleWhileRevalidate:
+    
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_and_refreshed_once(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            stale = (await domain_validator.validate_domain('example.com')).model_copy(update={'stale': True})
+        
+        with patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=stale) as mock_get, \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set, \
+             patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results) as mock_dns, \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results):
+            results = await asyncio.gather(*(domain_validator.validate_domain('www.example.com') for _ in range(5)))
+            assert all(result.stale for result in results)
+            await asyncio.gather(*domain_validator._refreshes.values())
+        
+        # Five stale answers, one refresh, which skipped the cache and wrote a fresh entry
+        assert mock_get.call_count == 5
+        mock_dns.assert_called_once_with('example.com')
+        mock_set.assert_called_once()
+        assert not mock_set.call_args.args[1].stale
+        assert domain_validator._refreshes == {}
+
+    @pytest.mark.asyncio
+    async def test_stale_full_entry_is_refreshed_as_full_for_fast_requests(
+        self, domain_validator, mock_dns_results, mock_http_results
+    ):
+        cache_service = domain_validator.cache_service
+        cache_service.redis_client = InMemoryRedis()
+        now = [1_000_000.0]
+        cache_service.clock = lambda: now[0]
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results) as mock_dns, \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results):
+            await domain_validator.validate_domain('example.com', profile=ValidationProfile.FULL)
+            now[0] += cache_service.ttl_policy.ttls['default'] + 1
+            
+            stale = await asyncio.gather(*(
+                domain_validator.validate_domain('example.com', profile=ValidationProfile.FAST) for _ in range(3)
+            ))
+            await asyncio.gather(*domain_validator._refreshes.values())
+            fresh = await domain_validator.validate_domain('example.com', profile=ValidationProfile.FAST)
+        
+        assert all(result.stale for result in stale)
+        # One refresh, run as the full profile the entry was cached under
+        assert mock_dns.call_count == 2
+        assert not fresh.stale
+        assert fresh.profile == ValidationProfile.FULL
+        assert fresh.stages[-1] == 'cache'
+
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_refreshes(self, domain_validator):
+        started = asyncio.Event()
+        
+        async def slow_dns(domain):
+            started.set()
+            await asyncio.sleep(10)
+        
+        with patch.object(domain_validator, '_perform_dns_checks', side_effect=slow_dns), \
+             patch.object(domain_validator.domain_lists, 'stop_background_refresh'), \
+             patch.object(domain_validator.cache_service, 'disconnect'):
+            domain_validator._schedule_refresh('example.com', ValidationProfile.FULL)
+            await started.wait()
+            await domain_validator.shutdown()
+        
+        assert domain_validator._refreshes == {}
+
+class TestParkedDomains:
+    
+    @pytest.mark.asyncio
+    async def test_parked_domain_is_suspicious(self, domain_validator, mock_dns_results):
+        mock_http = {'accessible': True, 'has_ssl': False, 'status_code': 200, 'ssl_valid': False, 'parked': True}
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('example.com')
+            
+            assert result.domain_type == DomainType.SUSPICIOUS
+            assert result.validation_status == ValidationStatus.SUSPICIOUS
+            assert result.metadata.parked
+            assert result.recommendation != Recommendation.ACCEPT
+
+class TestValidationProfiles:
+    
+    @pytest.mark.asyncio
+    async def test_fast_profile_skips_http(self, domain_validator, mock_dns_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None) as mock_get, \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('example.com', profile=ValidationProfile.FAST, deadline_ms=5000)
+            
+            assert result.domain_type == DomainType.CORPORATE
+            assert result.profile == ValidationProfile.FAST
+            assert not result.partial
+            assert result.stages == ['normalize', 'overrides', 'lists', 'cache', 'dns']
+            mock_http.assert_not_called()
+            mock_get.assert_called_with('example.com', ValidationProfile.FAST)
+            mock_set.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_standard_profile_skips_certificate_check(self, domain_validator, mock_dns_results):
+        website = {'accessible': True, 'has_ssl': True, 'status_code': 200,
+                   'ssl_valid': False, 'ssl_issuer': None, 'ssl_expiry_date': None}
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator.http_checker, 'check_website_accessibility', return_value=website) as mock_probe, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('example.com', profile=ValidationProfile.STANDARD)
+            
+            assert result.metadata.website_accessible
+            assert result.stages[-1] == 'http'
+            mock_probe.assert_called_once_with('example.com', read_certificate=False)
+
+    @pytest.mark.asyncio
+    async def test_full_profile_reads_certificate_from_probe(self, domain_validator, mock_dns_results):
+        website = {'accessible': True, 'has_ssl': True, 'status_code': 200, 'ssl_valid': True,
+                   'ssl_issuer': "Let's Encrypt", 'ssl_expiry_date': None}
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator.http_checker, 'check_website_accessibility', return_value=website) as mock_probe, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('example.com')
+            
+            mock_probe.assert_called_once_with('example.com', read_certificate=True)
+            assert result.metadata.ssl_issuer == "Let's Encrypt"
+
+    @pytest.mark.asyncio
+    async def test_slow_dns_returns_partial_result(self, domain_validator):
+        async def slow_dns(domain):
+            await asyncio.sleep(1)
+        
+        with patch.object(domain_validator, '_perform_dns_checks', side_effect=slow_dns), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('example.com', deadline_ms=50)
+            
+            assert result.partial
+            assert result.validation_status == ValidationStatus.UNKNOWN
+            assert result.recommendation == Recommendation.MANUAL_REVIEW
+            assert result.stages == ['normalize', 'overrides', 'lists', 'cache', 'dns']
+            mock_set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_slow_http_keeps_dns_findings(self, domain_validator, mock_dns_results):
+        async def slow_http(domain, check_ssl=True):
+            await asyncio.sleep(1)
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', side_effect=slow_http), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('example.com', deadline_ms=50)
+            
+            assert result.partial
+            assert result.domain_type == DomainType.CORPORATE
+            assert result.metadata.has_mx_record
+            assert not result.metadata.website_accessible
+            mock_set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deadline_is_split_by_stage_weight(self, domain_validator):
+        context = ValidationContext(domain='example.com', deadline=asyncio.get_running_loop().time() + 4)
+        
+        assert domain_validator._stage_budget(context, 'dns', ['dns', 'http']) == pytest.approx(1.0, abs=0.05)
+        assert domain_validator._stage_budget(context, 'dns', ['dns']) == pytest.approx(4.0, abs=0.05)
+        assert domain_validator._stage_budget(context, 'cache', ['cache', 'dns', 'http']) is None
+
+    @pytest.mark.asyncio
+    async def test_early_exit_is_cached_for_every_profile(self, domain_validator):
+        mock_dns = {'has_mx': False, 'has_a': False, 'mx_servers': [], 'domain_exists': False}
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns), \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            await domain_validator.validate_domain('nonexistent-example.com', profile=ValidationProfile.FAST)
+            
+            assert mock_set.call_args[0][2] == ValidationProfile.FULL
+
+class TestDeadDomains:
+    
+    @pytest.mark.asyncio
+    async def test_nxdomain_stops_all_probing(self, domain_validator):
+        server = DNSServer()
+        await server.start()
+        try:
+            domain_validator.dns_checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            with patch.object(domain_validator, '_perform_http_checks') as mock_http:
+                result = await domain_validator.validate_domain('tpyo-example.com')
+        finally:
+            await server.stop()
+        
+        assert result.domain_type == DomainType.UNREACHABLE
+        assert result.validation_status == ValidationStatus.INVALID
+        assert result.metadata.dns_status == 'nxdomain'
+        assert result.stages[-1] == 'dns'
+        mock_http.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_resolver_failure_is_not_unreachable(self, domain_validator):
+        server = DNSServer()
+        server.add_domain('example.com')
+        server.servfail.add('example.com')
+        await server.start()
+        try:
+            domain_validator.dns_checker = DNSChecker(
+                timeout=0.5, retries=1, nameservers=['127.0.0.1'], port=server.port, retry_backoff=0.01
+            )
+            with patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+                 patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+                 patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+                result = await domain_validator.validate_domain('example.com')
+        finally:
+            await server.stop()
+        
+        assert result.partial
+        assert result.validation_status == ValidationStatus.UNKNOWN
+        assert result.recommendation == Recommendation.MANUAL_REVIEW
+        assert result.metadata.dns_status == 'servfail'
+        mock_http.assert_not_called()
+        mock_set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_nxdomain_is_cached_for_the_negative_ttl(self, domain_validator):
+        server = DNSServer(negative_ttl=45)
+        await server.start()
+        try:
+            domain_validator.dns_checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            with patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+                 patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+                await domain_validator.validate_domain('tpyo-example.com')
+        finally:
+            await server.stop()
+        
+        assert mock_set.call_args.kwargs['dns_ttl'] == 45
+
+class TestMailProviders:
+    
+    @pytest.mark.asyncio
+    async def test_disposable_mx_marks_unlisted_domain(self, domain_validator):
+        domain_validator.mx_index._hosts = {'mx.trashmail.test': MailProvider('trashmail.test', 'disposable')}
+        mock_dns = {'has_mx': True, 'has_a': True, 'mx_servers': ['mx.trashmail.test.'], 'domain_exists': True}
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns), \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('fresh-burner.com')
+            
+            assert result.domain_type == DomainType.DISPOSABLE
+            assert result.metadata.mail_provider == 'trashmail.test'
+            assert result.stages[-1] == 'dns'
+            mock_http.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_hosted_mail_is_corporate_without_http(self, domain_validator):
+        mock_dns = {'has_mx': True, 'has_a': True, 'mx_servers': ['aspmx.l.google.com.'], 'domain_exists': True}
+        
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns), \
+             patch.object(domain_validator, '_perform_http_checks') as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result') as mock_set:
+            
+            result = await domain_validator.validate_domain('example.com')
+            
+            assert result.domain_type == DomainType.CORPORATE
+            assert result.validation_status == ValidationStatus.VALID
+            assert result.metadata.mail_provider == 'google_workspace'
+            mock_http.assert_not_called()
+            assert mock_set.call_args[0][2] == ValidationProfile.FULL
+
+    @pytest.mark.asyncio
+    async def test_unknown_mx_still_probes_http(self, domain_validator, mock_dns_results, mock_http_results):
+        with patch.object(domain_validator, '_perform_dns_checks', return_value=mock_dns_results), \
+             patch.object(domain_validator, '_perform_http_checks', return_value=mock_http_results) as mock_http, \
+             patch.object(domain_validator.cache_service, 'get_cached_validation', return_value=None), \
+             patch.object(domain_validator.cache_service, 'cache_validation_result'):
+            
+            result = await domain_validator.validate_domain('example.com')
+            
+            assert result.metadata.mail_provider is None
+            mock_http.assert_called_once()
+
+class TestLifecycle:
+    
+    @pytest.mark.asyncio
+    async def test_startup_shares_http_session_and_shutdown_closes_it(self, domain_validator):
+        with patch.object(domain_validator.cache_service, 'connect'), \
+             patch.object(domain_validator.cache_service, 'disconnect'), \
+             patch.object(domain_validator.domain_lists, 'initialize'), \
+             patch.object(domain_validator.domain_lists, 'start_background_refresh'), \
+             patch.object(domain_validator, 'load_overrides'), \
+             patch('app.services.domain_validator.settings.mx_index_learn_limit', 0):
+            await domain_validator.startup()
+            session = domain_validator.http_checker.session
+            
+            assert domain_validator.domain_lists.http_session is session
+            
+            await domain_validator.shutdown()
+        
+        assert session.closed
+        assert domain_validator.domain_lists.http_session is None
+
+    @pytest.mark.asyncio
+    async def test_mx_learning_runs_on_its_own_uncached_checker(self, domain_validator):
+        learned = asyncio.Event()
+
+        async def learn(dns_checker, domains, limit):
+            learned.set()
+            return 0
+
+        with patch.object(domain_validator.cache_service, 'connect'), \
+             patch.object(domain_validator.cache_service, 'disconnect'), \
+             patch.object(domain_validator.domain_lists, 'initialize'), \
+             patch.object(domain_validator.domain_lists, 'start_background_refresh'), \
+             patch.object(domain_validator, 'load_overrides'), \
+             patch.object(domain_validator.mx_index, 'learn_disposable', side_effect=learn) as mock_learn, \
+             patch('app.services.domain_validator.settings.mx_index_learn_limit', 10), \
+             patch('app.services.domain_validator.settings.mx_index_learn_max_in_flight', 4):
+            await domain_validator.startup()
+            await asyncio.wait_for(learned.wait(), 1)
+            checker = mock_learn.call_args[0][0]
+
+            assert checker is not domain_validator.dns_checker
+            assert checker.max_in_flight == 4
+            assert checker.cache.max_entries == 0
+
+            await domain_validator.shutdown()
+
+        assert domain_validator._mx_learning_dns is None
@@ -0,0 +1,287 @@
+import pytest
+import asyncio
+import time
+import pytest_asyncio
+from datetime import datetime, timezone
+from app.services.http_checker import HTTPChecker
+from app.services.probe_scheduler import ProbeScheduler
+from tests.stub_servers import WebServer, StalledServer, LoopbackResolver, closed_port
+
+@pytest_asyncio.fixture
+async def web_server():
+    server = WebServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+@pytest_asyncio.fixture
+async def http_checker(web_server):
+    # https:// is refused, http:// lands on the stand-in
+    resolver = LoopbackResolver({443: closed_port(), 80: web_server.port})
+    checker = HTTPChecker(timeout=2, resolver=resolver)
+    yield checker
+    await checker.close()
+
+class TestHTTPCheckerSession:
+
+    @pytest.mark.asyncio
+    async def test_probe_falls_back_to_http(self, http_checker, web_server):
+        results = await http_checker.check_website_accessibility('example.com')
+
+        assert results['accessible']
+        assert results['status_code'] == 200
+        assert not results['has_ssl']
+        assert web_server.requests == {'example.com': 1}
+
+    @pytest.mark.asyncio
+    async def test_probes_share_one_session(self, http_checker, web_server):
+        session = http_checker.session
+        for _ in range(3):
+            await http_checker.check_website_accessibility('example.com')
+
+        assert http_checker.session is session
+        # Keep-alive: repeat probes of a host reuse the pooled connection
+        assert web_server.total_requests == 3
+        assert web_server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_host_lookups_are_cached(self, http_checker):
+        for _ in range(3):
+            await http_checker.check_website_accessibility('example.com')
+
+        # The connector asks once per (host, port): the refused https:// attempt and the http:// one.
+        # The scheduler asks once per probe for the destination IP.
+        assert http_checker.resolver.lookups == 2 + 3
+
+    @pytest.mark.asyncio
+    async def test_connector_limits(self, http_checker):
+        connector = http_checker.session.connector
+
+        assert connector.limit == http_checker.connection_limit
+        assert connector.limit_per_host == http_checker.per_host_limit
+
+    @pytest.mark.asyncio
+    async def test_close_reopens_on_next_use(self, http_checker):
+        session = http_checker.session
+        await http_checker.close()
+
+        assert session.closed
+        assert http_checker.session is not session
+
+async def https_checker(server):
+    resolver = LoopbackResolver({443: server.ssl_port, 80: server.port})
+    return HTTPChecker(timeout=2, resolver=resolver, ssl_context=server.client_ssl_context())
+
+class TestCertificateFromProbe:
+
+    @pytest.mark.asyncio
+    async def test_certificate_read_from_probe_connection(self):
+        server = WebServer(tls_hosts=['example.com'])
+        await server.start()
+        checker = await https_checker(server)
+        try:
+            results = await checker.check_website_accessibility('example.com', read_certificate=True)
+        finally:
+            await checker.close()
+            await server.stop()
+
+        assert results['has_ssl']
+        assert results['ssl_valid']
+        assert results['ssl_issuer'] == 'Stub Issuing CA'
+        assert results['ssl_expiry_date'] > datetime.now(timezone.utc)
+        # No second handshake for the certificate
+        assert server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_certificate_not_read_unless_asked(self):
+        server = WebServer(tls_hosts=['example.com'])
+        await server.start()
+        checker = await https_checker(server)
+        try:
+            results = await checker.check_website_accessibility('example.com')
+        finally:
+            await checker.close()
+            await server.stop()
+
+        assert results['has_ssl']
+        assert results['ssl_issuer'] is None
+
+    @pytest.mark.asyncio
+    async def test_expired_certificate_falls_back_to_http(self):
+        server = WebServer(tls_hosts=['example.com'], expired=True)
+        await server.start()
+        checker = await https_checker(server)
+        try:
+            results = await checker.check_website_accessibility('example.com', read_certificate=True)
+        finally:
+            await checker.close()
+            await server.stop()
+
+        assert results['accessible']
+        assert not results['has_ssl']
+        assert not results['ssl_valid']
+        assert results['final_url'] == 'http://example.com'
+
+class TestByteCappedProbe:
+
+    async def probe(self, server, probe_mode='head'):
+        await server.start()
+        resolver = LoopbackResolver({443: closed_port(), 80: server.port})
+        checker = HTTPChecker(timeout=5, resolver=resolver, probe_mode=probe_mode)
+        try:
+            results = await checker.check_website_accessibility('example.com')
+        finally:
+            await checker.close()
+            await server.stop()
+        return checker, results
+
+    @pytest.mark.asyncio
+    async def test_head_skips_huge_body(self):
+        server = WebServer(body_size=50 * 1024 * 1024)
+        checker, results = await self.probe(server)
+
+        assert results['accessible']
+        assert results['status_code'] == 200
+        assert results['bytes_downloaded'] == 0
+        assert server.methods == {'HEAD': 1}
+        assert checker.stats()['probes'] == 1
+
+    @pytest.mark.asyncio
+    async def test_ranged_get_hangs_up_after_headers(self):
+        server = WebServer(body_size=50 * 1024 * 1024, head_allowed=False)
+        checker, results = await self.probe(server)
+
+        assert results['accessible']
+        assert results['status_code'] == 200
+        # HEAD was turned away with 405 before reaching the handler
+        assert server.methods == {'GET': 1}
+        assert checker.stats()['head_fallbacks'] == 1
+        # The server ignored Range; the client still hung up after the first socket reads
+        assert 0 < results['bytes_downloaded'] < 1024 * 1024
+        assert checker.stats()['max_bytes_per_probe'] == results['bytes_downloaded']
+        assert server.bytes_sent < 8 * 1024 * 1024
+
+    @pytest.mark.asyncio
+    async def test_get_mode_skips_head(self):
+        server = WebServer()
+        checker, results = await self.probe(server, probe_mode='get')
+
+        assert results['accessible']
+        assert server.methods == {'GET': 1}
+
+    @pytest.mark.asyncio
+    async def test_redirect_loop_is_capped(self):
+        server = WebServer(redirect_loop=True)
+        checker, results = await self.probe(server)
+
+        assert results['accessible']
+        assert results['status_code'] == 302
+        assert results['redirects'] == checker.max_redirects
+        # Settled on the capped chain instead of trying another scheme
+        assert server.total_requests == checker.max_redirects
+
+class TestSchemeRace:
+
+    @pytest_asyncio.fixture
+    async def stalled(self):
+        server = StalledServer()
+        await server.start()
+        yield server
+        await server.stop()
+
+    async def race(self, ports, timeout=1, ssl_context=None):
+        checker = HTTPChecker(timeout=timeout, resolver=LoopbackResolver(ports), ssl_context=ssl_context)
+        checker.scheme_stagger = 0.05
+        start = time.perf_counter()
+        try:
+            results = await checker.check_website_accessibility('example.com')
+        finally:
+            await checker.close()
+        return checker, results, time.perf_counter() - start
+
+    @pytest.mark.asyncio
+    async def test_both_schemes_stalled_costs_one_timeout(self, stalled):
+        checker, results, elapsed = await self.race({443: stalled.port, 80: stalled.port})
+
+        assert not results['accessible']
+        assert stalled.connections == 2
+        # Sequential probing took two full timeouts
+        assert elapsed < 1.5
+
+    @pytest.mark.asyncio
+    async def test_http_only_site_behind_stalled_https(self, stalled, web_server):
+        checker, results, elapsed = await self.race({443: stalled.port, 80: web_server.port})
+
+        assert results['accessible']
+        assert results['final_url'] == 'http://example.com'
+        assert checker.stats()['http_wins'] == 1
+        assert elapsed < 1.5
+
+    @pytest.mark.asyncio
+    async def test_refused_https_starts_http_without_stagger(self, web_server):
+        checker = HTTPChecker(timeout=1, resolver=LoopbackResolver({443: closed_port(), 80: web_server.port}))
+        checker.scheme_stagger = 5
+        try:
+            start = time.perf_counter()
+            results = await checker.check_website_accessibility('example.com')
+            elapsed = time.perf_counter() - start
+        finally:
+            await checker.close()
+
+        assert results['accessible']
+        assert elapsed < 1
+
+    @pytest.mark.asyncio
+    async def test_https_wins_over_faster_http(self, web_server):
+        slow_tls = WebServer(tls_hosts=['example.com'], delay=0.3)
+        await slow_tls.start()
+        try:
+            checker, results, _ = await self.race(
+                {443: slow_tls.ssl_port, 80: web_server.port}, ssl_context=slow_tls.client_ssl_context()
+            )
+        finally:
+            await slow_tls.stop()
+
+        assert results['has_ssl']
+        assert results['final_url'] == 'https://example.com'
+        assert checker.stats()['https_wins'] == 1
+        # http:// answered first but lost
+        assert web_server.total_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_quick_https_never_starts_http(self, web_server):
+        tls = WebServer(tls_hosts=['example.com'])
+        await tls.start()
+        try:
+            checker, results, _ = await self.race(
+                {443: tls.ssl_port, 80: web_server.port}, ssl_context=tls.client_ssl_context()
+            )
+        finally:
+            await tls.stop()
+
+        assert results['has_ssl']
+        assert web_server.total_requests == 0
+
+class TestProbeAdmission:
+
+    @pytest.mark.asyncio
+    async def test_domains_on_one_ip_share_its_cap(self):
+        server = WebServer(delay=0.05)
+        await server.start()
+        checker = HTTPChecker(timeout=5, resolver=LoopbackResolver({443: closed_port(), 80: server.port}),
+                              scheduler=ProbeScheduler(max_in_flight=64, max_per_destination=3))
+        checker.scheme_stagger = 0
+        try:
+            results = await asyncio.gather(*(
+                checker.check_website_accessibility(f'parked-{i}.test') for i in range(12)
+            ))
+        finally:
+            await checker.close()
+            await server.stop()
+
+        assert all(result['accessible'] for result in results)
+        assert server.peak_in_flight == 3
+        stats = checker.stats()['scheduler']
+        assert stats['peak_queue_depth'] == 9
+        assert stats['waited'] == 9
+        assert stats['max_wait_ms'] > 0
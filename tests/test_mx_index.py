@@ -0,0 +1,132 @@
+import random
+import pytest
+from app.services.dns_checker import DNSChecker
+from app.services.mx_index import DISPOSABLE_MX_MIN_DOMAINS, MXProviderIndex, MailProvider, _sample
+from tests.stub_servers import DNSServer
+
+class TestMXProviderIndex:
+
+    def test_matches_curated_suffixes(self):
+        index = MXProviderIndex()
+
+        assert index.match('aspmx.l.google.com.').name == 'google_workspace'
+        assert index.match('example-com.mail.protection.outlook.com').category == 'hosted'
+        assert index.match('mx1-us1.ppe-hosted.com').category == 'gateway'
+        assert index.match('mail.example.com') is None
+        assert index.match('com') is None
+
+    def test_most_specific_suffix_wins(self):
+        index = MXProviderIndex({
+            'example.net': MailProvider('hosting_co', 'hosting'),
+            'mail.example.net': MailProvider('mail_co', 'hosted'),
+        })
+
+        assert index.match('mx1.mail.example.net').name == 'mail_co'
+        assert index.match('mx1.example.net').name == 'hosting_co'
+
+    def test_disposable_host_outweighs_other_mx(self):
+        index = MXProviderIndex()
+        index._hosts = {'mx.trashmail.test': MailProvider('trashmail.test', 'disposable')}
+
+        provider = index.classify(['aspmx.l.google.com.', 'mx.trashmail.test.'])
+
+        assert provider.category == 'disposable'
+        assert index.classify([]) is None
+        assert index.classify(None) is None
+
+    @pytest.mark.asyncio
+    async def test_learns_hosts_of_listed_domains(self):
+        server = DNSServer()
+        for domain in ('trashmail.test', 'trash-a.test', 'trash-b.test'):
+            server.add(domain, 'MX', '10 mx.trashmail.test.')
+        server.add('trash-a.test', 'MX', '20 alt.trash-a.test.')
+        server.add('trash-b.test', 'MX', '20 mx.sharedhost.test.')
+        server.add('trash-c.test', 'MX', '10 mx.sharedhost.test.')
+        server.add('trash-d.test', 'MX', '10 aspmx.l.google.com.')
+        server.add('trash-e.test', 'MX', '10 aspmx.l.google.com.')
+        await server.start()
+        try:
+            checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            index = MXProviderIndex()
+            domains = [
+                'trashmail.test', 'trash-a.test', 'trash-b.test', 'trash-c.test', 'trash-d.test', 'trash-e.test',
+                'gone.test'
+            ]
+            learned = await index.learn_disposable(checker, domains)
+            await checker.close()
+        finally:
+            await server.stop()
+
+        assert learned == 2
+        assert index.match('mx.trashmail.test') == MailProvider('trashmail.test', 'disposable')
+        assert index.match('alt.trash-a.test') == MailProvider('trash-a.test', 'disposable')
+        # Serves two listed domains but belongs to none of them
+        assert index.match('mx.sharedhost.test') is None
+        # Curated platforms are never learned as disposable
+        assert index.match('aspmx.l.google.com').category == 'hosted'
+
+    @pytest.mark.asyncio
+    async def test_learns_hosts_dedicated_to_the_list(self):
+        server = DNSServer()
+        domains = [f'trash-{i}.test' for i in range(DISPOSABLE_MX_MIN_DOMAINS)]
+        for domain in domains:
+            server.add(domain, 'MX', '10 mx.burner.test.')
+        await server.start()
+        try:
+            checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            index = MXProviderIndex()
+            learned = await index.learn_disposable(checker, domains)
+            await checker.close()
+        finally:
+            await server.stop()
+
+        assert learned == 1
+        assert index.match('mx.burner.test') == MailProvider('burner.test', 'disposable')
+
+    @pytest.mark.asyncio
+    async def test_shared_forwarders_are_never_learned(self):
+        server = DNSServer()
+        domains = [f'trash-{i}.test' for i in range(DISPOSABLE_MX_MIN_DOMAINS * 2)]
+        for domain in domains:
+            server.add(domain, 'MX', '10 route1.mx.cloudflare.net.', '20 eforward1.registrar-servers.com.')
+        await server.start()
+        try:
+            checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            index = MXProviderIndex()
+            learned = await index.learn_disposable(checker, domains)
+            await checker.close()
+        finally:
+            await server.stop()
+
+        assert learned == 0
+        assert index.match('route1.mx.cloudflare.net').category == 'forwarding'
+        # A real business forwarding its mail through the same hosts is not flagged
+        assert index.classify(['route1.mx.cloudflare.net.', 'route2.mx.cloudflare.net.']).category != 'disposable'
+
+    @pytest.mark.asyncio
+    async def test_learning_respects_limit(self):
+        server = DNSServer()
+        for domain in ('trash-a.test', 'trash-b.test'):
+            server.add(domain, 'MX', '10 mx.trashmail.test.')
+        await server.start()
+        try:
+            checker = DNSChecker(timeout=0.5, retries=0, nameservers=['127.0.0.1'], port=server.port)
+            index = MXProviderIndex()
+            learned = await index.learn_disposable(checker, ['trash-a.test', 'trash-b.test'], limit=1)
+            await checker.close()
+        finally:
+            await server.stop()
+
+        assert learned == 0
+        assert index.learned_hosts == 0
+
+    def test_limit_samples_the_whole_list(self):
+        random.seed(1)
+        domains = [f'trash-{i:04}.test' for i in range(1000)]
+
+        sample = _sample(domains, 100)
+
+        assert len(set(sample)) == 100
+        # Not the same alphabetical prefix on every refresh
+        assert sum(domain > domains[499] for domain in sample) > 25
+        assert _sample(domains[:10], 100) == domains[:10]
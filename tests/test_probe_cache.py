@@ -0,0 +1,124 @@
+import pytest
+from app.services.http_checker import HTTPChecker
+from app.services.probe_cache import ProbeOutcomeCache
+from tests.stub_servers import WebServer, LoopbackResolver, closed_port
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+PARKED = {'accessible': True, 'has_ssl': False, 'status_code': 200, 'redirects': 1,
+          'final_url': 'http://www.sedoparking.com/?d=example.com', 'parked': True,
+          'ssl_valid': False, 'ssl_issuer': None, 'ssl_expiry_date': None, 'bytes_downloaded': 512}
+PAGE = (200, 'nginx', 'text/html', '512', 1, 'http://www.sedoparking.com/?d={domain}')
+
+class TestProbeOutcomeCache:
+
+    def test_ip_becomes_parking_host_after_min_domains(self):
+        cache = ProbeOutcomeCache(ttl=60, min_domains=2)
+
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+        assert cache.parking_outcome('192.0.2.1', 'other.com') is None
+
+        cache.record('192.0.2.1', PAGE, 'another.com', PARKED)
+        outcome = cache.parking_outcome('192.0.2.1', 'other.com')
+
+        assert outcome['parked']
+        assert outcome['final_url'] == 'http://www.sedoparking.com/?d=other.com'
+        assert outcome['bytes_downloaded'] == 0
+        assert cache.stats()['parking_hosts'] == 1
+
+    def test_same_domain_twice_is_one_sighting(self):
+        cache = ProbeOutcomeCache(ttl=60, min_domains=2)
+
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+        cache.record('192.0.2.1', PAGE, 'EXAMPLE.com', PARKED)
+
+        assert cache.parking_outcome('192.0.2.1', 'other.com') is None
+
+    def test_different_pages_do_not_add_up(self):
+        cache = ProbeOutcomeCache(ttl=60, min_domains=2)
+
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+        cache.record('192.0.2.1', PAGE[:5] + ('http://parkingcrew.net/{domain}',), 'another.com', PARKED)
+
+        assert cache.parking_outcome('192.0.2.1', 'other.com') is None
+
+    def test_parking_host_expires(self):
+        clock = FakeClock()
+        cache = ProbeOutcomeCache(ttl=60, min_domains=1, clock=clock)
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+
+        clock.now += 61
+
+        assert cache.parking_outcome('192.0.2.1', 'other.com') is None
+        assert cache.stats()['parking_hosts'] == 0
+
+    def test_cdn_edges_are_never_parking_hosts(self):
+        cache = ProbeOutcomeCache(ttl=60, min_domains=2)
+
+        for domain in ('example.com', 'another.com', 'third.com'):
+            cache.record('104.16.1.1', PAGE, domain, PARKED)
+            cache.record('2606:4700::1', PAGE, domain, PARKED)
+
+        assert cache.parking_outcome('104.16.1.1', 'other.com') is None
+        assert cache.parking_outcome('2606:4700::1', 'other.com') is None
+        assert cache.stats()['sightings'] == 0
+
+    def test_default_needs_more_than_a_couple_of_domains(self):
+        cache = ProbeOutcomeCache(ttl=60)
+
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+        cache.record('192.0.2.1', PAGE, 'another.com', PARKED)
+
+        assert cache.parking_outcome('192.0.2.1', 'other.com') is None
+
+    def test_zero_ttl_disables(self):
+        cache = ProbeOutcomeCache(ttl=0, min_domains=1)
+        cache.record('192.0.2.1', PAGE, 'example.com', PARKED)
+
+        assert cache.parking_outcome('192.0.2.1', 'example.com') is None
+
+class TestParkingDetection:
+
+    async def probe_all(self, server, domains):
+        await server.start()
+        checker = HTTPChecker(
+            timeout=2, resolver=LoopbackResolver({443: closed_port(), 80: server.port}),
+            probe_cache=ProbeOutcomeCache(ttl=60, min_domains=2)
+        )
+        try:
+            return checker, [await checker.check_website_accessibility(domain) for domain in domains]
+        finally:
+            await checker.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_parking_redirect_is_detected_and_shared(self):
+        server = WebServer(redirect_to='http://www.sedoparking.com/landing')
+        checker, results = await self.probe_all(server, ['parked-1.test', 'parked-2.test', 'parked-3.test'])
+
+        assert all(result['parked'] for result in results)
+        # Only the first two were probed; the third came off the known parking host
+        assert 'parked-3.test' not in server.requests
+        assert checker.stats()['parking']['hits'] == 1
+        assert checker.stats()['probes'] == 2
+
+    @pytest.mark.asyncio
+    async def test_parking_header_is_detected(self):
+        server = WebServer(headers={'X-Adblock-Key': 'MFwwDQYJKoZIhvcNAQEBBQADSwAwSAJBAKX74'})
+        checker, results = await self.probe_all(server, ['parked.test'])
+
+        assert results[0]['parked']
+
+    @pytest.mark.asyncio
+    async def test_ordinary_sites_are_always_probed(self):
+        server = WebServer()
+        checker, results = await self.probe_all(server, ['site-1.test', 'site-2.test', 'site-3.test'])
+
+        assert not any(result['parked'] for result in results)
+        assert server.total_requests == 3
+        assert checker.stats()['parking']['parking_hosts'] == 0
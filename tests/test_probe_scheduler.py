@@ -0,0 +1,89 @@
+import pytest
+import asyncio
+from app.services.probe_scheduler import ProbeScheduler
+
+async def hold(scheduler, destination, started, release):
+    async with scheduler.slot(destination):
+        started.append(destination)
+        await release.wait()
+
+class TestProbeScheduler:
+
+    @pytest.mark.asyncio
+    async def test_caps_total_and_per_destination(self):
+        scheduler = ProbeScheduler(max_in_flight=3, max_per_destination=2)
+        started, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, ip, started, release))
+                 for ip in ('10.0.0.1', '10.0.0.1', '10.0.0.1', '10.0.0.2', '10.0.0.3')]
+        await asyncio.sleep(0)
+
+        assert sorted(started) == ['10.0.0.1', '10.0.0.1', '10.0.0.2']
+        assert scheduler.stats()['queue_depth'] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(started) == 5
+        assert scheduler.in_flight == 0
+        assert scheduler.stats()['queue_depth'] == 0
+
+    @pytest.mark.asyncio
+    async def test_freed_slots_rotate_across_destinations(self):
+        scheduler = ProbeScheduler(max_in_flight=1, max_per_destination=1)
+        await scheduler.acquire('busy')
+        order = []
+
+        async def probe(destination):
+            await scheduler.acquire(destination)
+            order.append(destination)
+            scheduler.release(destination)
+
+        # The hot destination queued first, yet the others are not stuck behind all of it
+        tasks = [asyncio.create_task(probe('hot')) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(probe('cold-a')), asyncio.create_task(probe('cold-b'))]
+        await asyncio.sleep(0)
+        scheduler.release('busy')
+        await asyncio.gather(*tasks)
+
+        assert order[:3] == ['hot', 'cold-a', 'cold-b']
+
+    @pytest.mark.asyncio
+    async def test_destination_at_cap_does_not_block_others(self):
+        scheduler = ProbeScheduler(max_in_flight=10, max_per_destination=1)
+        await scheduler.acquire('10.0.0.1')
+        waiting = asyncio.create_task(scheduler.acquire('10.0.0.1'))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(scheduler.acquire('10.0.0.2'), 1)
+
+        assert not waiting.done()
+        scheduler.release('10.0.0.1')
+        await asyncio.wait_for(waiting, 1)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = ProbeScheduler(max_in_flight=1, max_per_destination=1)
+        await scheduler.acquire('10.0.0.1')
+        waiting = asyncio.create_task(scheduler.acquire('10.0.0.2'))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert scheduler.stats()['queue_depth'] == 0
+        scheduler.release('10.0.0.1')
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_reports_wait_time(self):
+        scheduler = ProbeScheduler(max_in_flight=1, max_per_destination=1)
+        await scheduler.acquire('10.0.0.1')
+        waiting = asyncio.create_task(scheduler.acquire('10.0.0.1'))
+        await asyncio.sleep(0.02)
+        scheduler.release('10.0.0.1')
+        await waiting
+
+        stats = scheduler.stats()
+        assert stats['waited'] == 1
+        assert stats['max_wait_ms'] >= 15
+        assert stats['peak_queue_depth'] == 1
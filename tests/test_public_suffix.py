@@ -0,0 +1,63 @@
+import pytest
+from app.services.public_suffix import PublicSuffixList, get_public_suffix_list
+
+@pytest.fixture(scope="module")
+def psl():
+    return get_public_suffix_list()
+
+class TestPublicSuffixList:
+    
+    @pytest.mark.parametrize("domain,public_suffix,registrable", [
+        ("example.com", "com", "example.com"),
+        ("mail.corp.example.co.uk", "co.uk", "example.co.uk"),
+        ("ox.ac.uk", "ac.uk", "ox.ac.uk"),
+        ("co.uk", "co.uk", None),
+        ("com", "com", None),
+        ("example.unknowntld", "unknowntld", "example.unknowntld"),
+        ("user.github.io", "github.io", "user.github.io"),
+    ])
+    def test_split(self, psl, domain, public_suffix, registrable):
+        assert psl.public_suffix(domain) == public_suffix
+        assert psl.registrable_domain(domain) == registrable
+
+    def test_wildcard_and_exception_rules(self, psl):
+        # *.kawasaki.jp with !city.kawasaki.jp
+        assert psl.public_suffix("www.b.kawasaki.jp") == "b.kawasaki.jp"
+        assert psl.registrable_domain("www.b.kawasaki.jp") == "www.b.kawasaki.jp"
+        assert psl.public_suffix("www.city.kawasaki.jp") == "kawasaki.jp"
+        assert psl.registrable_domain("www.city.kawasaki.jp") == "city.kawasaki.jp"
+
+    def test_private_section(self, psl):
+        assert psl.is_private("github.io")
+        assert psl.is_private("ac.ru")
+        assert not psl.is_private("ac.uk")
+        assert not psl.is_private("b.kawasaki.jp")
+        assert not psl.is_private("unknowntld")
+
+    def test_normalizes_input(self, psl):
+        assert psl.registrable_domain(" Mail.Example.COM. ") == "example.com"
+
+    def test_answers_are_cached(self, psl):
+        psl.split.cache_clear()
+        psl.registrable_domain("a.example.org")
+        psl.registrable_domain("a.example.org")
+        
+        assert psl.split.cache_info().hits == 1
+
+    def test_custom_rules_file(self, tmp_path):
+        path = tmp_path / "psl.dat"
+        path.write_text("// comment\ncom\n*.example\n!keep.example\n")
+        psl = PublicSuffixList(str(path))
+        
+        assert psl.rule_count == 3
+        assert psl.registrable_domain("a.b.example") == "a.b.example"
+        assert psl.registrable_domain("x.keep.example") == "keep.example"
+
+    def test_custom_rules_file_private_section(self, tmp_path):
+        path = tmp_path / "psl.dat"
+        path.write_text("com\n// ===BEGIN PRIVATE DOMAINS===\nedu.example\n")
+        psl = PublicSuffixList(str(path))
+
+        assert psl.public_suffix("school.edu.example") == "edu.example"
+        assert psl.is_private("edu.example")
+        assert not psl.is_private("com")
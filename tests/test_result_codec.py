@@ -0,0 +1,97 @@
+import pytest
+from datetime import datetime, timezone
+from app.services.result_codec import encode_result, decode_result, decode_entry, MX_COMPRESSED, HEADER, HEADER_V1
+from app.models.schemas import (
+    DomainValidationResponse, DomainType, ValidationStatus, Recommendation,
+    DomainMetadata, ValidationProfile
+)
+
+def make_result(**metadata):
+    return DomainValidationResponse(
+        domain='mail.example.com',
+        registrable_domain='example.com',
+        domain_type=DomainType.CORPORATE,
+        validation_status=ValidationStatus.VALID,
+        quality_score=8.3,
+        recommendation=Recommendation.ACCEPT,
+        metadata=DomainMetadata(**metadata),
+        stages=['normalize', 'overrides', 'lists', 'cache', 'dns', 'http'],
+        profile=ValidationProfile.STANDARD,
+        checked_at=datetime(2024, 5, 1, 12, 30, 15)
+    )
+
+class TestResultCodec:
+    
+    def test_round_trip(self):
+        result = make_result(
+            has_mx_record=True, has_a_record=True, mx_servers=['mx1.example.com', 'mx2.example.com'],
+            dns_status='noerror', mail_provider='google_workspace', website_accessible=True,
+            has_ssl_certificate=True, ssl_issuer="Let's Encrypt",
+            ssl_expiry_date=datetime(2025, 1, 1, tzinfo=timezone.utc), parked=False
+        )
+        
+        decoded = decode_result(encode_result(result))
+        
+        assert decoded.model_dump() == result.model_dump()
+        assert decoded.model_dump_json() == result.model_dump_json()
+
+    def test_empty_and_missing_fields(self):
+        result = make_result(mx_servers=[])
+        result.partial = True
+        
+        decoded = decode_result(encode_result(result))
+        
+        assert decoded.metadata.mx_servers == []
+        assert decoded.metadata.ssl_expiry_date is None
+        assert decoded.partial
+        assert decode_result(encode_result(make_result())).metadata.mx_servers is None
+
+    def test_checked_at_keeps_whole_seconds(self):
+        result = make_result()
+        result.checked_at = datetime(2024, 5, 1, 12, 30, 15, 999999)
+        
+        assert decode_result(encode_result(result)).checked_at == datetime(2024, 5, 1, 12, 30, 15)
+
+    def test_long_mx_list_is_compressed(self):
+        mx_servers = [f'mx{i}.mail.protection.example.com' for i in range(10)]
+        
+        compressed = encode_result(make_result(mx_servers=mx_servers))
+        plain = encode_result(make_result(mx_servers=mx_servers), compress_mx=False)
+        
+        assert len(compressed) < len(plain)
+        assert HEADER.unpack_from(compressed)[1] & MX_COMPRESSED
+        assert decode_result(compressed).metadata.mx_servers == mx_servers
+
+    def test_smaller_than_json(self):
+        result = make_result(has_mx_record=True, mx_servers=['mx.example.com'], dns_status='noerror')
+        
+        assert len(encode_result(result)) * 3 < len(result.model_dump_json())
+
+    def test_legacy_json_entry(self):
+        result = make_result(mx_servers=['mx.example.com'])
+        
+        assert decode_result(result.model_dump_json().encode()) == result
+
+    def test_soft_expiry_round_trip(self):
+        result, fresh_until = decode_entry(encode_result(make_result(), fresh_until=1_700_000_000))
+        
+        assert fresh_until == 1_700_000_000
+        assert not result.stale
+        assert decode_entry(encode_result(make_result()))[1] is None
+
+    def test_version_1_entry(self):
+        data = encode_result(make_result(mx_servers=['mx.example.com']))
+        # Version 1 had no soft expiry at the end of the header
+        v1 = bytes([1]) + data[1:HEADER_V1.size] + data[HEADER.size:]
+        
+        result, fresh_until = decode_entry(v1)
+        
+        assert fresh_until is None
+        assert result.metadata.mx_servers == ['mx.example.com']
+
+    def test_unknown_version_is_rejected(self):
+        data = bytearray(encode_result(make_result()))
+        data[0] = 99
+        
+        with pytest.raises(ValueError):
+            decode_result(bytes(data))